@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Agregados por IP em baldes de tempo (1 s, 1 min e 1 h), calculados durante a ingestão
+Cada (resolução, balde, IP) guarda pacotes, portas de destino distintas e destinos distintos.
+Os distintos são esboços HyperLogLog de 2**10 registradores guardados de forma esparsa: só os
+registradores não nulos, 2 bytes cada (índice de 10 bits + rho de 6 bits). Um IP com 3 portas
+ocupa 6 bytes e o pior caso são 2 KB. Esboços se juntam pelo máximo de cada registrador, então
+os agregados de várias execuções (e os de 1 s dentro de 1 min) somam sem reler o tráfego.
+"""
+
+import math
+import sys
+from array import array
+
+import detector_hll
+import ingestao
+from armazem_colunar import ip_para_int
+
+# nome -> largura do balde em segundos
+RESOLUCOES = {'1s': 1, '1m': 60, '1h': 3600}
+
+# Por quanto tempo cada resolução fica no histórico, contado do balde mais recente (None = sempre)
+RETENCAO_S = {'1s': 2 * 3600, '1m': 7 * 86400, '1h': None}
+
+PRECISAO = 10
+REGISTRADORES = 1 << PRECISAO
+_ALFA_M2 = detector_hll._alfa(REGISTRADORES) * REGISTRADORES ** 2
+
+# Linhas emitidas acumuladas antes de chamar ao_emitir
+LOTE_EMISSAO = 20000
+
+# Destinos com hash em cache (acima disso o cache recomeça)
+MAXIMO_CACHE_DESTINOS = 1 << 20
+
+_MICROS = ingestao.MICROS
+
+
+def _hash_ip(ip):
+    """(registrador, rho) do IP de destino"""
+    h = detector_hll._misturar(ip_para_int(ip))
+    return h & (REGISTRADORES - 1), 64 - PRECISAO - (h >> PRECISAO).bit_length() + 1
+
+
+def codificar(registros):
+    """{registrador: rho} -> bytes (uint16 little-endian ordenados, registrador << 6 | rho)"""
+    if len(registros) == 1:
+        # Caso mais comum no balde de 1 s (uma porta, um destino)
+        (indice, rho), = registros.items()
+        return (indice << 6 | rho).to_bytes(2, 'little')
+    valores = array('H', sorted(indice << 6 | rho for indice, rho in registros.items()))
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def decodificar(dados):
+    valores = array('H')
+    valores.frombytes(dados)
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    return {valor >> 6: valor & 63 for valor in valores}
+
+
+def mesclar(registros, outros):
+    """União de esboços: máximo de cada registrador (altera 'registros')"""
+    for indice, rho in outros.items():
+        if rho > registros.get(indice, 0):
+            registros[indice] = rho
+    return registros
+
+
+def mesclar_codificados(a, b):
+    """União de dois esboços codificados (função do SQLite no upsert dos agregados)"""
+    if a is None:
+        return b
+    if b is None or a == b:
+        return a
+    return codificar(mesclar(decodificar(a), decodificar(b)))
+
+
+def estimar(registros):
+    """Quantidade estimada de valores distintos (HLL; linear counting na faixa pequena)"""
+    zeros = REGISTRADORES - len(registros)
+    soma = zeros + sum(2.0 ** -rho for rho in registros.values())
+    estimativa = _ALFA_M2 / soma
+    if estimativa <= 2.5 * REGISTRADORES and zeros:
+        estimativa = REGISTRADORES * math.log(REGISTRADORES / zeros)
+    return int(round(estimativa))
+
+
+def estimar_codificado(dados):
+    return estimar(decodificar(dados)) if dados else 0
+
+
+class UniaoEsbocos:
+    """Agregação do SQLite: união dos esboços de várias linhas (ex: um IP ao longo de várias horas)"""
+
+    def __init__(self):
+        self.registros = {}
+
+    def step(self, dados):
+        if dados:
+            mesclar(self.registros, decodificar(dados))
+
+    def finalize(self):
+        return codificar(self.registros)
+
+
+class AgregadorTempo:
+    """
+    Recebe os eventos da ingestão (em ordem de tempo; atrasados contam no segundo corrente) e
+    emite linhas (resolucao_s, balde, ip, pacotes, portas, destinos) de cada balde fechado:
+    o segundo usa conjuntos exatos, o minuto e a hora juntam os esboços dos níveis de baixo.
+    Só há estado dos baldes abertos; o que fecha vai para ao_emitir(linhas) em lotes.
+    Timestamps relativos (-ttt) não têm horário: o agregador se desliga no primeiro evento.
+    """
+
+    def __init__(self, ao_emitir, lote=LOTE_EMISSAO):
+        self.ao_emitir = ao_emitir
+        self.lote = lote
+        self.ativo = True
+        self.segundo = None
+        self.abertos = {largura: {} for largura in RESOLUCOES.values()}  # largura -> ip -> estado
+        self.baldes = dict.fromkeys(RESOLUCOES.values())                 # largura -> balde aberto
+        self.pendentes = []
+        self.emitidas = 0
+        self._segundo_aberto = self.abertos[1]
+        if PRECISAO not in detector_hll._TABELAS:
+            detector_hll._TABELAS[PRECISAO] = detector_hll._tabelas(PRECISAO)
+        self._indice, self._rho = detector_hll._TABELAS[PRECISAO]
+        self._destinos = {}
+
+    def adicionar(self, dados):
+        segundo = dados['timestamp'] // _MICROS
+        if segundo != self.segundo:
+            if self.segundo is None:
+                if segundo < ingestao.EPOCH_MINIMO_S:
+                    self.ativo = False
+                self.segundo = segundo
+            elif segundo > self.segundo:
+                self._avancar(segundo)
+        if not self.ativo:
+            return
+
+        ip = dados['ip_origem']
+        estado = self._segundo_aberto.get(ip)
+        if estado is None:
+            estado = self._segundo_aberto[ip] = [0, set(), set()]
+        estado[0] += 1
+        estado[1].add(dados['porta_destino'])
+        estado[2].add(dados['ip_destino'])
+
+    def _avancar(self, segundo):
+        """O tempo passou para 'segundo': fecha o segundo anterior e, se mudaram, o minuto e a hora"""
+        if self.ativo:
+            self._fechar_segundo()
+            for largura in (60, 3600):
+                if self.baldes[largura] is not None and segundo // largura != self.baldes[largura]:
+                    self._fechar(largura)
+        self.segundo = segundo
+
+    def _fechar_segundo(self):
+        indice, rho = self._indice, self._rho
+        destinos = self._destinos
+        if len(destinos) > MAXIMO_CACHE_DESTINOS:
+            destinos.clear()
+        minuto = self.abertos[60]
+        for largura in (60, 3600):
+            if self.baldes[largura] is None:
+                self.baldes[largura] = self.segundo // largura
+
+        for ip, (pacotes, portas, ips_destino) in self.abertos[1].items():
+            registros_portas = {}
+            for porta in portas:
+                j = indice[porta]
+                if rho[porta] > registros_portas.get(j, 0):
+                    registros_portas[j] = rho[porta]
+            registros_destinos = {}
+            for destino in ips_destino:
+                par = destinos.get(destino)
+                if par is None:
+                    par = destinos[destino] = _hash_ip(destino)
+                if par[1] > registros_destinos.get(par[0], 0):
+                    registros_destinos[par[0]] = par[1]
+            self._emitir(1, self.segundo, ip, pacotes, registros_portas, registros_destinos)
+
+            estado = minuto.get(ip)
+            if estado is None:
+                minuto[ip] = [pacotes, registros_portas, registros_destinos]
+            else:
+                estado[0] += pacotes
+                mesclar(estado[1], registros_portas)
+                mesclar(estado[2], registros_destinos)
+        self.abertos[1] = self._segundo_aberto = {}
+
+    def _fechar(self, largura):
+        """Emite os baldes abertos de 'largura' e repassa para a resolução de cima"""
+        acima = self.abertos[3600] if largura == 60 else None
+        balde = self.baldes[largura]
+        for ip, (pacotes, portas, destinos) in self.abertos[largura].items():
+            self._emitir(largura, balde, ip, pacotes, portas, destinos)
+            if acima is not None:
+                estado = acima.get(ip)
+                if estado is None:
+                    acima[ip] = [pacotes, dict(portas), dict(destinos)]
+                else:
+                    estado[0] += pacotes
+                    mesclar(estado[1], portas)
+                    mesclar(estado[2], destinos)
+        self.abertos[largura] = {}
+        self.baldes[largura] = None
+
+    def _emitir(self, largura, balde, ip, pacotes, portas, destinos):
+        self.pendentes.append((largura, balde, ip, pacotes, codificar(portas), codificar(destinos)))
+        if len(self.pendentes) >= self.lote:
+            self.descarregar()
+
+    def descarregar(self):
+        """Entrega as linhas pendentes a ao_emitir"""
+        if self.pendentes:
+            linhas, self.pendentes = self.pendentes, []
+            self.emitidas += len(linhas)
+            self.ao_emitir(linhas)
+
+    def fechar(self):
+        """Fim da entrada: emite os baldes ainda abertos (a próxima execução completa-os no histórico)"""
+        if self.ativo and self.segundo is not None:
+            self._fechar_segundo()
+            self._fechar(60)
+            self._fechar(3600)
+        self.descarregar()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Análise incremental e retomável de um arquivo de tráfego que continua crescendo
+O checkpoint (JSON compactado com gzip) guarda o offset já processado, o relógio da ingestão,
+as contagens por IP, os IPs detectados e as janelas de port scan ainda abertas.
+Cada execução processa apenas os bytes novos.
+"""
+
+import gzip
+import json
+import os
+import zlib
+from collections import defaultdict
+
+import compressao
+import leitor_pcap
+import parser_tcpdump
+from detector_portscan import DetectorJanela
+from ingestao import RelogioIngestao
+
+VERSAO_CHECKPOINT = 2
+
+# Bytes do início do arquivo usados para reconhecer que ainda é o mesmo arquivo
+TAMANHO_ASSINATURA = 4096
+
+
+def _assinatura(caminho, tamanho):
+    with open(caminho, 'rb') as f:
+        return zlib.crc32(f.read(tamanho))
+
+
+class EstadoIncremental:
+    """Estado acumulado da análise de um arquivo"""
+
+    def __init__(self, caminho, janela_us, limite, modo_tempo='auto'):
+        self.caminho = os.path.abspath(caminho)
+        self.offset = None  # None = arquivo ainda não processado
+        self.inode = None
+        self.assinatura = None
+        self.tamanho_assinatura = 0
+        self.modo_tempo = modo_tempo  # formato pedido; o resolvido (auto -> tt/ttt) fica no relógio
+        self.relogio = RelogioIngestao(modo_tempo)
+        self.detector = DetectorJanela(janela_us, limite)
+        self.eventos_por_ip = defaultdict(int)
+        self.registros = 0
+        self.parseados = 0
+
+    def exportar(self):
+        return {
+            'versao': VERSAO_CHECKPOINT,
+            'caminho': self.caminho,
+            'offset': self.offset,
+            'inode': self.inode,
+            'assinatura': self.assinatura,
+            'tamanho_assinatura': self.tamanho_assinatura,
+            'modo_tempo': self.modo_tempo,
+            'relogio': self.relogio.exportar(),
+            'detector': self.detector.exportar(),
+            'eventos_por_ip': self.eventos_por_ip,
+            'registros': self.registros,
+            'parseados': self.parseados,
+        }
+
+    @classmethod
+    def restaurar(cls, dados):
+        detector = dados['detector']
+        estado = cls(dados['caminho'], detector['janela'], detector['limite'], dados['modo_tempo'])
+        estado.offset = dados['offset']
+        estado.inode = dados['inode']
+        estado.assinatura = dados['assinatura']
+        estado.tamanho_assinatura = dados['tamanho_assinatura']
+        estado.relogio = RelogioIngestao.restaurar(dados['relogio'])
+        estado.detector = DetectorJanela.restaurar(detector)
+        estado.eventos_por_ip = defaultdict(int, dados['eventos_por_ip'])
+        estado.registros = dados['registros']
+        estado.parseados = dados['parseados']
+        return estado
+
+    def compativel(self, caminho, janela_us, limite, modo_tempo='auto'):
+        """
+        O checkpoint só vale para o mesmo arquivo (não truncado nem rotacionado), o mesmo critério
+        e o mesmo formato de timestamp (outro modo misturaria, ex: deltas do -ttt com epoch)
+        """
+        if self.caminho != os.path.abspath(caminho) or self.offset is None:
+            return False
+        if self.detector.janela != janela_us or self.detector.limite != limite:
+            return False
+        if modo_tempo != self.modo_tempo or (modo_tempo != 'auto' and self.relogio.modo != modo_tempo):
+            return False
+        info = os.stat(caminho)
+        if info.st_ino != self.inode or info.st_size < self.offset:
+            return False
+        # Só os bytes já processados entram na assinatura: eles não mudam num arquivo que só cresce
+        return _assinatura(caminho, self.tamanho_assinatura) == self.assinatura
+
+
+def carregar_checkpoint(arquivo_checkpoint):
+    """Carrega o checkpoint; retorna None se não existir ou estiver corrompido/em outra versão"""
+    try:
+        with gzip.open(arquivo_checkpoint, 'rt', encoding='utf-8') as f:
+            dados = json.load(f)
+    except (OSError, ValueError, EOFError):
+        return None
+    if dados.get('versao') != VERSAO_CHECKPOINT:
+        return None
+    return EstadoIncremental.restaurar(dados)
+
+
+def salvar_checkpoint(estado, arquivo_checkpoint):
+    """Grava o checkpoint de forma atômica (temporário + rename)"""
+    # Janelas que já expiraram não precisam ir para o disco
+    if estado.relogio.ultimo is not None:
+        estado.detector.expirar(estado.relogio.ultimo)
+
+    temporario = arquivo_checkpoint + ".tmp"
+    with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+        json.dump(estado.exportar(), f, separators=(',', ':'))
+    os.replace(temporario, arquivo_checkpoint)
+
+
+def _eventos_texto(caminho, offset):
+    """Gera (dados ou None, offset após a linha) só para linhas completas (terminadas em \\n)"""
+    parse = parser_tcpdump.parse_linha
+    with open(caminho, 'rb') as f:
+        f.seek(offset)
+        for linha in f:
+            if not linha.endswith(b'\n'):
+                break  # Linha ainda sendo escrita: fica para a próxima execução
+            offset += len(linha)
+            yield parse(linha.decode('utf-8', errors='replace')), offset
+
+
+def processar_novos(estado, caminho, agregador=None, filtro=None):
+    """
+    Processa os bytes acrescentados desde o último checkpoint; retorna quantos registros eram novos
+    Com 'agregador' (agregados_tempo.AgregadorTempo), os eventos novos também entram nos agregados
+    Com 'filtro' (redes_cidr.FiltroRedes), origens permitidas são descartadas e as demais agrupadas
+    """
+    if compressao.detectar(caminho):
+        raise ValueError(f"{caminho} está comprimido: a análise incremental precisa do arquivo sem compressão "
+                         f"(o offset só vale para o arquivo que continua crescendo)")
+    e_pcap = leitor_pcap.e_pcap(caminho)
+
+    if estado.offset is None:
+        estado.inode = os.stat(caminho).st_ino
+        estado.offset = 0
+
+    if e_pcap:
+        # offset 0 = logo após o cabeçalho global do pcap
+        eventos = leitor_pcap.ler_registros_desde(caminho, estado.offset or None)
+    else:
+        eventos = _eventos_texto(caminho, estado.offset)
+
+    relogio = estado.relogio
+    detector = estado.detector
+    eventos_por_ip = estado.eventos_por_ip
+    adicionar = agregador.adicionar if agregador is not None else None
+    aplicar = filtro.aplicar if filtro is not None else None
+    novos = 0
+
+    for dados, offset in eventos:
+        novos += 1
+        estado.offset = offset
+        if not dados:
+            continue
+        # O relógio vê todos os eventos parseados (os deltas do -ttt dos descartados também contam)
+        timestamp = dados['timestamp'] = relogio.converter(dados['timestamp'])
+        if aplicar is not None and aplicar(dados) is None:
+            continue
+        estado.parseados += 1
+
+        ip = dados['ip_origem']
+        eventos_por_ip[ip] += 1
+        detector.registrar(ip, timestamp, dados['porta_destino'])
+        if adicionar is not None:
+            adicionar(dados)
+
+    estado.registros += novos
+    estado.tamanho_assinatura = min(TAMANHO_ASSINATURA, estado.offset)
+    estado.assinatura = _assinatura(caminho, estado.tamanho_assinatura)
+    return novos
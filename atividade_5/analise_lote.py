@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Análise em lote, sem menu: arquivos, globs ou diretórios de capturas (pcap/pcapng ou texto do
+tcpdump, também comprimidos em gzip/xz/zstd) analisados em paralelo por um pool de processos,
+um arquivo por tarefa.
+Gera um relatório por arquivo (mesmo formato do relatorio.csv), um agregado por IP e um
+resumo.json, e termina com um código de saída para automação:
+  0 = todos os arquivos analisados, sem port scan
+  1 = algum arquivo falhou (ou nenhum arquivo encontrado)
+  2 = argumentos inválidos
+  3 = todos analisados e algum port scan detectado (só com --alertar)
+"""
+
+import argparse
+import csv
+import glob
+import json
+import lzma
+import os
+import sys
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import compressao
+import ingestao
+import redes_cidr
+import relatorio_csv
+from armazem_colunar import ArmazemEventos
+from contagem_topk import SpaceSaving
+from detector_hll import novo_detector
+
+# Extensões aceitas ao percorrer diretórios (pcap também é reconhecido pelo magic)
+EXTENSOES_TEXTO = ('.txt', '.log')
+
+# Extensão dos relatórios gravados com --comprimir
+EXTENSAO_COMPRIMIDA = {'gzip': '.gz', 'xz': '.xz', 'zstd': '.zst'}
+
+SAIDA_OK = 0
+SAIDA_FALHA = 1
+SAIDA_PORTSCAN = 3
+
+
+def _e_captura(caminho):
+    # trafego.txt.gz conta como texto; um pcap comprimido é reconhecido pelo magic de dentro
+    return compressao.sem_extensao(caminho).lower().endswith(EXTENSOES_TEXTO) or ingestao.e_captura_pcap(caminho)
+
+
+def expandir_entradas(entradas, recursivo=False):
+    """Arquivos, globs e diretórios -> lista ordenada de arquivos (sem repetições)"""
+    arquivos = []
+    vistos = set()
+
+    def adicionar(caminho):
+        real = os.path.realpath(caminho)
+        if real not in vistos:
+            vistos.add(real)
+            arquivos.append(caminho)
+
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            if recursivo:
+                candidatos = (os.path.join(raiz, nome) for raiz, _, nomes in os.walk(entrada) for nome in nomes)
+            else:
+                candidatos = (os.path.join(entrada, nome) for nome in os.listdir(entrada))
+            for caminho in sorted(candidatos):
+                if os.path.isfile(caminho) and _e_captura(caminho):
+                    adicionar(caminho)
+        elif os.path.isfile(entrada):
+            adicionar(entrada)  # Arquivo citado explicitamente entra mesmo sem extensão conhecida
+        else:
+            for caminho in sorted(glob.glob(entrada, recursive=True)):
+                if os.path.isfile(caminho):
+                    adicionar(caminho)
+    return arquivos
+
+
+def analisar_arquivo(caminho, janela_us, limite, modo_tempo='auto', topk=None, aproximado=False, filtro=None):
+    """
+    Analisa um arquivo (roda num processo do pool); nunca levanta exceção, o erro vai no resultado
+    Mesmo caminho do analisador: armazém colunar + NumPy, ou uma passada com top-K/HLL
+    (ou com origens agrupadas pelo filtro de redes, cujas chaves não cabem no armazém)
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        'arquivo': caminho, 'registros': 0, 'eventos': 0, 'eventos_por_ip': {},
+        'portscan_detectado': {}, 'erros': None, 'segundos': 0.0, 'erro': None, 'descartados': 0,
+    }
+    try:
+        eventos = ingestao.eventos_de_arquivo(caminho, modo_tempo)
+        if filtro is not None:
+            eventos = filtro.filtrar(eventos)
+        if topk or aproximado or (filtro is not None and filtro.agrupa):
+            contagem = SpaceSaving(topk) if topk else None
+            eventos_por_ip = defaultdict(int)
+            detector = novo_detector(janela_us, limite, aproximado)
+            for dados in eventos:
+                resultado['registros'] += 1
+                if not dados:
+                    continue
+                resultado['eventos'] += 1
+                ip = dados['ip_origem']
+                if contagem is not None:
+                    contagem.adicionar(ip)
+                else:
+                    eventos_por_ip[ip] += 1
+                detector.registrar(ip, dados['timestamp'], dados['porta_destino'])
+                if resultado['eventos'] % 100000 == 0:
+                    detector.expirar(dados['timestamp'])
+            if contagem is not None:
+                eventos_por_ip = contagem.contagens()
+                erros = contagem.erros()
+                for ip in detector.detectados:
+                    if ip not in eventos_por_ip:
+                        eventos_por_ip[ip] = erros[ip] = contagem.erro_maximo()
+                resultado['erros'] = erros
+            resultado['eventos_por_ip'] = dict(eventos_por_ip)
+            resultado['portscan_detectado'] = detector.detectados
+        else:
+            armazem = ArmazemEventos()
+            for dados in eventos:
+                resultado['registros'] += 1
+                if dados:
+                    armazem.adicionar_evento(dados)
+            resultado['eventos'] = len(armazem)
+            analise = armazem.analisar(janela_us, limite)
+            resultado['eventos_por_ip'] = analise.eventos_por_ip
+            resultado['portscan_detectado'] = analise.portscan_detectado
+        if not resultado['eventos']:
+            resultado['erro'] = "nenhum evento IPv4 TCP/UDP reconhecido"
+    except (OSError, ValueError, UnicodeDecodeError, EOFError, lzma.LZMAError, zlib.error) as e:  # EOFError: .gz truncado
+        resultado['erro'] = str(e)
+    except Exception as e:  # ex: zstandard.ZstdError; um arquivo ruim não derruba o lote
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+    if filtro is not None:
+        resultado['descartados'] = filtro.descartados
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def nome_relatorio(caminho, usados, extensao=''):
+    """
+    relatorio_<arquivo>.csv, com sufixo numérico se dois arquivos tiverem o mesmo nome
+    'extensao' (.gz, .xz, .zst) faz o relatório ser gravado comprimido
+    """
+    base = "relatorio_" + os.path.basename(caminho).replace(os.sep, '_')
+    nome = base + ".csv" + extensao
+    sufixo = 2
+    while nome in usados:
+        nome = f"{base}_{sufixo}.csv{extensao}"
+        sufixo += 1
+    usados.add(nome)
+    return nome
+
+
+class Agregado:
+    """Totais por IP somados entre os arquivos"""
+
+    def __init__(self):
+        self.eventos = defaultdict(int)
+        self.arquivos = defaultdict(int)
+        self.arquivos_portscan = defaultdict(int)
+        self.primeiro_portscan = {}
+
+    def adicionar(self, resultado):
+        for ip, total in resultado['eventos_por_ip'].items():
+            self.eventos[ip] += total
+            self.arquivos[ip] += 1
+        for ip, momento in resultado['portscan_detectado'].items():
+            self.arquivos_portscan[ip] += 1
+            if ip not in self.primeiro_portscan or momento < self.primeiro_portscan[ip]:
+                self.primeiro_portscan[ip] = momento
+
+    def escrever(self, caminho):
+        temporario = caminho + ".tmp"
+        with compressao.abrir(temporario, 'w', compressao.formato_por_extensao(caminho)) as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerow(['IP', 'Total_Eventos', 'Arquivos', 'Arquivos_PortScan', 'Primeiro_PortScan'])
+            for ip, total in sorted(self.eventos.items(), key=lambda x: x[1], reverse=True):
+                writer.writerow([ip, total, self.arquivos[ip], self.arquivos_portscan.get(ip, 0),
+                                 relatorio_csv.formatar_momento(self.primeiro_portscan.get(ip))])
+        os.replace(temporario, caminho)
+
+
+def executar_lote(arquivos, saida, processos=None, janela_s=60.0, limite=10, modo_tempo='auto',
+                  topk=None, aproximado=False, silencioso=False, comprimir=None, filtro=None):
+    """
+    Analisa os arquivos em paralelo e grava os relatórios em 'saida'; retorna o resumo (dict)
+    comprimir ('gzip', 'xz' ou 'zstd') grava os relatórios CSV comprimidos
+    filtro (redes_cidr.FiltroRedes) vai para cada processo: permitidos descartados, origens agrupadas
+    """
+    extensao = EXTENSAO_COMPRIMIDA[comprimir] if comprimir else ''
+    os.makedirs(saida, exist_ok=True)
+    processos = min(processos or os.cpu_count() or 1, len(arquivos)) or 1
+    janela_us = int(janela_s * ingestao.MICROS)
+
+    agregado = Agregado()
+    usados = set()
+    por_arquivo = []
+    inicio = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = [executor.submit(analisar_arquivo, caminho, janela_us, limite, modo_tempo, topk, aproximado,
+                                   filtro)
+                   for caminho in arquivos]
+        for concluidos, futuro in enumerate(as_completed(futuros), 1):
+            resultado = futuro.result()
+            item = {
+                'arquivo': resultado['arquivo'], 'registros': resultado['registros'],
+                'eventos': resultado['eventos'], 'descartados': resultado['descartados'],
+                'ips': len(resultado['eventos_por_ip']),
+                'portscans': len(resultado['portscan_detectado']),
+                'segundos': round(resultado['segundos'], 3), 'erro': resultado['erro'], 'relatorio': None,
+            }
+            if resultado['erro'] is None:
+                item['relatorio'] = os.path.join(saida, nome_relatorio(resultado['arquivo'], usados, extensao))
+                relatorio_csv.escrever_relatorio(item['relatorio'], resultado['eventos_por_ip'],
+                                                 resultado['portscan_detectado'], resultado['erros'])
+                agregado.adicionar(resultado)
+            por_arquivo.append(item)
+
+            if not silencioso:
+                if item['erro']:
+                    print(f"❌ [{concluidos}/{len(arquivos)}] {item['arquivo']}: {item['erro']}")
+                else:
+                    alerta = f", 🚨 {item['portscans']} port scan(s)" if item['portscans'] else ""
+                    print(f"✅ [{concluidos}/{len(arquivos)}] {item['arquivo']}: {item['eventos']} eventos, "
+                          f"{item['ips']} IPs{alerta} ({item['segundos']:.2f}s)")
+
+    caminho_agregado = os.path.join(saida, "agregado.csv" + extensao)
+    agregado.escrever(caminho_agregado)
+
+    por_arquivo.sort(key=lambda item: item['arquivo'])
+    resumo = {
+        'arquivos': len(arquivos),
+        'falhas': sum(1 for item in por_arquivo if item['erro']),
+        'eventos': sum(item['eventos'] for item in por_arquivo),
+        'descartados': sum(item['descartados'] for item in por_arquivo),
+        'ips': len(agregado.eventos),
+        'ips_portscan': len(agregado.arquivos_portscan),
+        'processos': processos,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'agregado': caminho_agregado,
+        'por_arquivo': por_arquivo,
+    }
+    temporario = os.path.join(saida, "resumo.json.tmp")
+    with open(temporario, 'w') as f:
+        json.dump(resumo, f, indent=2)
+    os.replace(temporario, os.path.join(saida, "resumo.json"))
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analisa capturas (pcap/pcapng ou texto do tcpdump) em lote e em paralelo",
+        epilog="Códigos de saída: 0 = ok, 1 = falha em algum arquivo, 2 = argumentos inválidos, "
+               "3 = port scan detectado (com --alertar)")
+    parser.add_argument('entradas', nargs='+', help="arquivos, globs (ex: 'capturas/*.pcap') ou diretórios")
+    parser.add_argument('-o', '--saida', default='relatorios_lote', help="diretório dos relatórios (padrão: relatorios_lote)")
+    parser.add_argument('-j', '--processos', type=int, default=None, help="processos do pool (padrão: núcleos)")
+    parser.add_argument('-r', '--recursivo', action='store_true', help="percorre subdiretórios")
+    parser.add_argument('--janela', type=float, default=60.0, help="janela do port scan em segundos (padrão: 60)")
+    parser.add_argument('--limite', type=int, default=10, help="portas distintas na janela (padrão: 10)")
+    parser.add_argument('--formato-tempo', choices=ingestao.MODOS, default='auto',
+                        help="timestamp dos arquivos de texto (padrão: auto)")
+    parser.add_argument('--topk', type=int, default=None, metavar='K', help="contagem aproximada: só os K maiores IPs")
+    parser.add_argument('--aproximado', action='store_true', help="detecção aproximada (HyperLogLog)")
+    parser.add_argument('--permitidos', default=None, metavar='ARQUIVO',
+                        help="arquivo de CIDRs cujo tráfego de origem é descartado antes da detecção")
+    parser.add_argument('--blocos', default=None, metavar='ARQUIVO',
+                        help="arquivo 'CIDR rótulo': origens de um bloco contam como uma só")
+    parser.add_argument('--agrupar', type=int, default=None, metavar='N',
+                        help="conta e detecta por sub-rede /N da origem em vez de por IP")
+    parser.add_argument('--alertar', action='store_true', help="sai com código 3 se algum port scan for detectado")
+    parser.add_argument('--comprimir', choices=sorted(EXTENSAO_COMPRIMIDA), default=None,
+                        help="grava os relatórios CSV comprimidos (.gz, .xz ou .zst)")
+    parser.add_argument('-q', '--silencioso', action='store_true', help="só o resumo final")
+    args = parser.parse_args(argv)
+
+    if args.processos is not None and args.processos < 1:
+        parser.error("--processos deve ser pelo menos 1")
+    try:
+        filtro = redes_cidr.montar_filtro(args.permitidos, args.blocos, args.agrupar)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    arquivos = expandir_entradas(args.entradas, args.recursivo)
+    if args.comprimir == 'zstd' and not compressao.zstd_disponivel():
+        parser.error("--comprimir zstd requer Python 3.14+ ou o pacote zstandard")
+
+    if not arquivos:
+        print("❌ Nenhum arquivo de captura encontrado", file=sys.stderr)
+        return SAIDA_FALHA
+
+    if not args.silencioso:
+        print(f"🔍 Analisando {len(arquivos)} arquivo(s) com até {args.processos or os.cpu_count()} processos...")
+    resumo = executar_lote(arquivos, args.saida, args.processos, args.janela, args.limite,
+                           args.formato_tempo, args.topk, args.aproximado, args.silencioso, args.comprimir,
+                           filtro)
+
+    print(f"📊 {resumo['arquivos'] - resumo['falhas']}/{resumo['arquivos']} arquivos analisados em "
+          f"{resumo['segundos']:.2f}s: {resumo['eventos']} eventos, {resumo['ips']} IPs, "
+          f"{resumo['ips_portscan']} com port scan")
+    if filtro is not None and filtro.permitidos is not None:
+        print(f"🛡️  Eventos de redes permitidas descartados: {resumo['descartados']}")
+    print(f"📄 Relatórios em {args.saida}/ ({os.path.basename(resumo['agregado'])}, resumo.json)")
+
+    if resumo['falhas']:
+        return SAIDA_FALHA
+    if args.alertar and resumo['ips_portscan']:
+        return SAIDA_PORTSCAN
+    return SAIDA_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
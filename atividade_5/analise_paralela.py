@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Análise paralela (multi-core) de arquivos grandes de tráfego
+1. O arquivo (texto do tcpdump ou pcap) é dividido em intervalos de bytes alinhados a linhas/registros
+2. Cada intervalo é parseado em um processo do ProcessPoolExecutor, que distribui os eventos em
+   shards pelo hash do IP de origem e grava cada shard em um arquivo binário compacto
+3. Cada shard é analisado por um processo, que é dono das janelas de port scan dos seus IPs
+4. Os resultados dos shards são unidos (os conjuntos de IPs são disjuntos)
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import zlib
+from array import array
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import compressao
+import ingestao
+import leitor_pcap
+import parser_tcpdump
+from detector_portscan import DetectorJanela
+
+# Intervalos por processo: um pouco mais que 1 para equilibrar a carga
+INTERVALOS_POR_PROCESSO = 4
+
+
+def shard_do_ip(ip, shards):
+    """Shard estável entre processos (o hash() de str muda a cada processo)"""
+    return zlib.crc32(ip.encode()) % shards
+
+
+def dividir_texto(caminho, partes):
+    """Divide um arquivo de texto em até 'partes' intervalos (inicio, fim) alinhados a quebras de linha"""
+    tamanho = os.path.getsize(caminho)
+    cortes = [0]
+    with open(caminho, 'rb') as f:
+        for i in range(1, partes):
+            alvo = tamanho * i // partes
+            if alvo <= cortes[-1]:
+                continue
+            f.seek(alvo - 1)
+            f.readline()  # Avança até o fim da linha atual
+            posicao = f.tell()
+            if cortes[-1] < posicao < tamanho:
+                cortes.append(posicao)
+    cortes.append(tamanho)
+    return list(zip(cortes[:-1], cortes[1:]))
+
+
+def detectar_modo_tempo(caminho, modo):
+    """Resolve o modo 'auto' olhando a primeira linha parseável (todos os intervalos precisam do mesmo modo)"""
+    if modo != 'auto':
+        return modo
+    with open(caminho, 'r', errors='replace') as f:
+        for linha in f:
+            dados = parser_tcpdump.parse_linha(linha)
+            if dados:
+                relogio = ingestao.RelogioIngestao('auto')
+                relogio.converter(dados['timestamp'])
+                return relogio.modo
+    return 'tt'
+
+
+def _linhas_intervalo(caminho, inicio, fim):
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        posicao = inicio
+        while posicao < fim:
+            linha = f.readline()
+            if not linha:
+                break
+            posicao += len(linha)
+            yield linha.decode('utf-8', errors='replace')
+
+
+def _mapear(caminho, e_pcap, inicio, fim, modo, shards, indice, diretorio):
+    """
+    Parseia um intervalo e grava os eventos de cada shard em diretorio/s<shard>_i<indice>.bin
+    Retorna (registros lidos, eventos parseados, soma dos deltas do intervalo)
+    """
+    colunas = [(array('q'), array('I'), array('H')) for _ in range(shards)]
+    lidos = 0
+    parseados = 0
+
+    if e_pcap:
+        eventos = leitor_pcap.ler_pacotes_intervalo(caminho, inicio, fim)
+        relogio = ingestao.RelogioIngestao('tt')
+    else:
+        parse = parser_tcpdump.parse_linha
+        eventos = (parse(linha) for linha in _linhas_intervalo(caminho, inicio, fim))
+        # Com -ttt cada intervalo acumula a partir de 0; o deslocamento é somado na etapa de shards
+        relogio = ingestao.RelogioIngestao(modo)
+
+    cache_ips = {}
+    for dados in eventos:
+        lidos += 1
+        if not dados:
+            continue
+        parseados += 1
+
+        ip = dados['ip_origem']
+        chave = cache_ips.get(ip)
+        if chave is None:
+            chave = cache_ips[ip] = (shard_do_ip(ip, shards),
+                                     int.from_bytes(socket.inet_aton(ip), 'big'))
+        shard, ip_numerico = chave
+
+        timestamps, ips, portas = colunas[shard]
+        timestamps.append(relogio.converter(dados['timestamp']))
+        ips.append(ip_numerico)
+        portas.append(dados['porta_destino'])
+
+    for shard, (timestamps, ips, portas) in enumerate(colunas):
+        with open(os.path.join(diretorio, f"s{shard}_i{indice}.bin"), 'wb') as f:
+            array('q', [len(timestamps)]).tofile(f)
+            timestamps.tofile(f)
+            ips.tofile(f)
+            portas.tofile(f)
+
+    delta_total = relogio.acumulado if relogio.modo == 'ttt' else 0
+    return lidos, parseados, delta_total
+
+
+def _reduzir(shard, intervalos, deslocamentos, janela_us, limite, diretorio):
+    """Analisa um shard: lê seus eventos intervalo por intervalo (ordem do arquivo) e roda o detector"""
+    eventos_por_ip = defaultdict(int)
+    detector = DetectorJanela(janela_us, limite)
+
+    for indice in range(intervalos):
+        caminho = os.path.join(diretorio, f"s{shard}_i{indice}.bin")
+        with open(caminho, 'rb') as f:
+            quantidade = array('q')
+            quantidade.fromfile(f, 1)
+            n = quantidade[0]
+            timestamps, ips, portas = array('q'), array('I'), array('H')
+            timestamps.fromfile(f, n)
+            ips.fromfile(f, n)
+            portas.fromfile(f, n)
+        os.remove(caminho)
+
+        deslocamento = deslocamentos[indice]
+        for timestamp, ip, porta in zip(timestamps, ips, portas):
+            eventos_por_ip[ip] += 1
+            detector.registrar(ip, timestamp + deslocamento, porta)
+
+    def texto(ip):
+        return socket.inet_ntoa(ip.to_bytes(4, 'big'))
+
+    return ({texto(ip): total for ip, total in eventos_por_ip.items()},
+            {texto(ip): momento for ip, momento in detector.detectados.items()})
+
+
+def analisar(caminho, janela_us, limite, processos=None, modo_tempo='auto'):
+    """
+    Analisa o arquivo em paralelo
+    Retorna (eventos_por_ip, portscan_detectado, registros lidos, eventos parseados)
+    """
+    if compressao.detectar(caminho):
+        raise ValueError(f"{caminho} está comprimido e não pode ser dividido em intervalos de bytes")
+    processos = processos or os.cpu_count() or 1
+    e_pcap = leitor_pcap.e_pcap(caminho)
+
+    partes = processos * INTERVALOS_POR_PROCESSO
+    if e_pcap:
+        intervalos = leitor_pcap.dividir_registros(caminho, partes)
+        modo = 'tt'
+    else:
+        intervalos = dividir_texto(caminho, partes)
+        modo = detectar_modo_tempo(caminho, modo_tempo)
+
+    eventos_por_ip = {}
+    portscan_detectado = {}
+    if not intervalos:
+        return eventos_por_ip, portscan_detectado, 0, 0
+
+    shards = processos
+    diretorio = tempfile.mkdtemp(prefix="analise_paralela_")
+    try:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            futuros = [executor.submit(_mapear, caminho, e_pcap, inicio, fim, modo, shards, indice, diretorio)
+                       for indice, (inicio, fim) in enumerate(intervalos)]
+            resultados = [futuro.result() for futuro in futuros]
+
+            # Deltas do -ttt: cada intervalo começa onde o anterior terminou
+            deslocamentos = []
+            acumulado = 0
+            for _, _, delta_total in resultados:
+                deslocamentos.append(acumulado)
+                acumulado += delta_total
+
+            futuros = [executor.submit(_reduzir, shard, len(intervalos), deslocamentos,
+                                       janela_us, limite, diretorio)
+                       for shard in range(shards)]
+            for futuro in futuros:
+                contagens, detectados = futuro.result()
+                eventos_por_ip.update(contagens)
+                portscan_detectado.update(detectados)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    lidos = sum(r[0] for r in resultados)
+    parseados = sum(r[1] for r in resultados)
+    return eventos_por_ip, portscan_detectado, lidos, parseados
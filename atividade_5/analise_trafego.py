@@ -1,149 +1,172 @@
 #!/usr/bin/env python3
+import argparse
 import subprocess
-import re
 import csv
+import heapq
 import time
 import os
+import shutil
+import sys
 import json
+import sqlite3
 from collections import defaultdict, deque
 from datetime import datetime
-import threading
+
+import agregados_tempo
+import analise_incremental
+import analise_paralela
+import compressao
+import fila_captura
+from captura_multi import CapturaMultiInterface
+from captura_rotativa import CapturaRotativa
+import ingestao
+import interfaces_rede
+import leitor_pcap
+from armazem_colunar import ArmazemEventos
+from contagem_topk import SpaceSaving
+from detector_hll import novo_detector
+import historico_relatorios
+from historico_relatorios import HistoricoRelatorios, LARGURA_BALDE_S, balde_de_timestamp
+from metricas import Metricas
+from monitor_tempo_real import MonitorTempoReal
+import perfil_captura
+import parser_tcpdump
+import pipeline_deteccao
+import redes_cidr
+import relatorio_csv
+import tabela_fluxos
 
 class AnalisadorTrafego:
     def __init__(self):
         self.interface = None
+        # Interfaces da captura simultânea (opção 9); vazio = só self.interface
+        self.interfaces = []
         self.arquivo_trafego = "trafego.txt"
+        self.arquivo_pcap = "captura.pcap"
         self.arquivo_relatorio = "relatorio.csv"
+        self.arquivo_checkpoint = "analise.checkpoint"
+        # Histórico das análises em SQLite, indexado por execução, IP, balde de tempo e port scan
+        # (ver historico_relatorios.py); o relatorio.csv continua sendo o da última análise
+        self.historico = HistoricoRelatorios("historico.db")
+        # Execuções mantidas no histórico (as mais antigas saem com os seus IPs e baldes a cada
+        # gravação; None = todas). Os agregados de tempo têm retenção própria (RETENCAO_S)
+        self.manter_execucoes = 1000
+        # Agregados por IP em baldes de 1s/1m/1h (pacotes, portas e destinos distintos) calculados
+        # durante a leitura e somados no histórico entre execuções (ver agregados_tempo.py)
+        self.agregados_tempo = True
+        # trafego.txt passa a ser apenas saída de depuração: a análise lê o pcap direto
+        self.exportar_texto = False
+        
+        # Formato do timestamp nos arquivos de texto (ver ingestao.RelogioIngestao):
+        # 'auto' trata epoch como absoluto e H:MM:SS como delta do -ttt (formato histórico)
+        self.formato_tempo = 'auto'
+        
+        # Critério de port scan: mais de limite_portas portas distintas na janela (segundos)
+        self.janela_portscan = 60.0
+        self.limite_portas = 10
+        
+        # Detectores da pipeline de uma passada (ver pipeline_deteccao.py): todos recebem os mesmos
+        # eventos parseados; os alertas dos detectores além do port scan vão para arquivo_alertas
+        self.configuracao_deteccao = pipeline_deteccao.configuracao_padrao()
+        self.arquivo_alertas = "alertas.csv"
+        
+        # Listas de redes aplicadas a cada evento antes da detecção (ver redes_cidr.py): origens
+        # permitidas são descartadas e as demais podem ser agrupadas por bloco nomeado ou sub-rede
+        self.filtro_redes = None
+        
+        # Contagem por IP: None = exata (um contador por IP); um número = top-K aproximado
+        # (Space-Saving) com essa quantidade de contadores, memória fixa mesmo sob flood forjado
+        self.topk_ips = None
+        
+        # Detecção de port scan: exata (DetectorJanela) ou aproximada (HyperLogLog por IP em
+        # baldes de tempo, memória fixa por IP; taxas de erro em benchmark_deteccao.py)
+        self.deteccao_aproximada = False
+        
+        # Agregação dos pacotes em fluxos (5-tupla, estilo NetFlow) antes da detecção e do
+        # relatório: o detector vê um registro por fluxo; timeouts em segundos (ver tabela_fluxos.py)
+        self.agregar_fluxos = False
+        self.timeout_inativo_fluxo = tabela_fluxos.TIMEOUT_INATIVO_US / ingestao.MICROS
+        self.timeout_ativo_fluxo = tabela_fluxos.TIMEOUT_ATIVO_US / ingestao.MICROS
+        self.capacidade_fluxos = tabela_fluxos.CAPACIDADE_PADRAO
+        
+        # Análise em fluxo: intervalo de escrita do relatório e teto de IPs mantidos em memória
+        self.intervalo_relatorio_fluxo = 10
+        self.limite_ips_fluxo = 100000
+        
+        # Captura ao vivo (opções 2, 5 e 9): uma thread drena o tcpdump para uma fila limitada a
+        # capacidade_fila registros e trabalhadores_captura threads parseiam; cheia, a fila bloqueia
+        # o leitor (o kernel descarta) ou descarta os lotes mais antigos (ver fila_captura.py).
+        # Profundidade e descartes (fila e kernel) vão para arquivo_captura
+        self.politica_fila = 'bloquear'
+        self.capacidade_fila = fila_captura.CAPACIDADE_PADRAO
+        self.trabalhadores_captura = 1
+        self.arquivo_captura = "captura.json"
         
-    def verificar_interfaces(self):
-        """Verifica e mostra interfaces de rede disponíveis de forma simplificada"""
+        # Captura rotativa: anel de segmentos_rotacao arquivos de tamanho_segmento_mb MB
+        # (disco limitado a tamanho_segmento_mb * segmentos_rotacao)
+        self.prefixo_rotacao = "captura_anel.pcap"
+        self.tamanho_segmento_mb = 10
+        self.segmentos_rotacao = 5
+        
+        # Filtro BPF + snaplen usados em todas as capturas (ver perfil_captura.py);
+        # 'portscan' grava só cabeçalhos de SYN sem ACK e UDP
+        self.perfil_captura = perfil_captura.PERFIS['completo']
+        
+        # Instrumentação por etapa (--profile); desativada não custa nada no caminho quente
+        self.metricas = Metricas()
+        
+    def verificar_interfaces(self, atualizar=False):
+        """
+        Verifica e mostra interfaces de rede disponíveis de forma simplificada
+        Lê /proc e /sys direto (ver interfaces_rede.py), sem depender do 'ip'; o resultado fica
+        em cache na sessão e atualizar=True relê
+        """
         print("\n" + "="*60)
         print("INTERFACES DE REDE DISPONÍVEIS")
         print("="*60)
         
         try:
-            # Executa ip addr show e captura a saída
-            resultado = subprocess.run(['ip', 'addr', 'show'], 
-                                    capture_output=True, text=True, check=True)
-            
-            linhas = resultado.stdout.split('\n')
-            interface_atual = None
-            dados_interface = {}
-            interfaces = []
-            
-            for linha in linhas:
-                linha = linha.strip()
-                
-                # Detecta nova interface (ex: "1: lo: ..." ou "2: eth0: ...")
-                match_interface = re.match(r'^\d+:\s+([^:]+):', linha)
-                if match_interface:
-                    if interface_atual and dados_interface:
-                        interfaces.append(dados_interface.copy())
-                    
-                    interface_atual = match_interface.group(1)
-                    dados_interface = {
-                        'nome': interface_atual,
-                        'estado': 'DOWN',
-                        'mac': '',
-                        'ipv4': [],
-                        'ipv6': []
-                    }
-                
-                # Verifica estado da interface
-                elif interface_atual and 'state' in linha.lower():
-                    if 'UP' in linha.upper():
-                        dados_interface['estado'] = 'UP'
-                    elif 'DOWN' in linha.upper():
-                        dados_interface['estado'] = 'DOWN'
-                
-                # Captura endereço MAC
-                elif interface_atual and 'link/ether' in linha:
-                    partes = linha.split()
-                    if len(partes) >= 2:
-                        dados_interface['mac'] = partes[1]
-                
-                # Captura IPv4
-                elif interface_atual and 'inet ' in linha and 'scope global' in linha:
-                    partes = linha.split()
-                    if len(partes) >= 2:
-                        ip = partes[1].split('/')[0]  # Remove máscara
-                        dados_interface['ipv4'].append(ip)
-                
-                # Captura IPv6 global
-                elif interface_atual and 'inet6 ' in linha and 'scope global' in linha:
-                    partes = linha.split()
-                    if len(partes) >= 2:
-                        ipv6 = partes[1].split('/')[0]
-                        dados_interface['ipv6'].append(ipv6)
-            
-            # Adiciona a última interface
-            if interface_atual and dados_interface:
-                interfaces.append(dados_interface)
-            
-            # Exibe interfaces de forma organizada
-            for i, interface in enumerate(interfaces, 1):
-                estado_color = "🟢 UP" if interface['estado'] == 'UP' else "🔴 DOWN"
-                print(f"\n{i}. {interface['nome']:12} {estado_color}")
-                
-                if interface['mac']:
-                    print(f"   MAC: {interface['mac']}")
-                
-                if interface['ipv4']:
-                    for ip in interface['ipv4']:
-                        print(f"   IPv4: {ip}")
-                
-                if interface['ipv6']:
-                    for ipv6 in interface['ipv6'][:2]:  # Mostra apenas os 2 primeiros IPv6
-                        print(f"   IPv6: {ipv6}")
-                    if len(interface['ipv6']) > 2:
-                        print(f"   ... e mais {len(interface['ipv6']) - 2} endereços IPv6")
+            interfaces = interfaces_rede.listar_interfaces(atualizar)
+        except OSError as e:
+            print(f"Erro ao ler as interfaces: {e}")
+            return []
+        
+        # Exibe interfaces de forma organizada
+        for i, interface in enumerate(interfaces, 1):
+            estado_color = "🟢 UP" if interface['estado'] == 'UP' else "🔴 DOWN"
+            print(f"\n{i}. {interface['nome']:12} {estado_color}")
             
-            print("\n" + "="*60)
+            if interface['mac']:
+                print(f"   MAC: {interface['mac']}")
             
-            # Sugere interface padrão
-            interfaces_up = [iface for iface in interfaces if iface['estado'] == 'UP' and iface['nome'] != 'lo']
-            if interfaces_up:
-                print(f"💡 Interface sugerida: {interfaces_up[0]['nome']}")
-                self.interface = interfaces_up[0]['nome']
-            else:
-                print("⚠️  Nenhuma interface UP encontrada (exceto loopback)")
+            if interface['ipv4']:
+                for ip in interface['ipv4']:
+                    print(f"   IPv4: {ip}")
             
-            return interfaces
-            
-        except subprocess.CalledProcessError as e:
-            print(f"Erro ao executar comando: {e}")
-            return []
-        except Exception as e:
-            print(f"Erro inesperado: {e}")
-            return []
+            if interface['ipv6']:
+                for ipv6 in interface['ipv6'][:2]:  # Mostra apenas os 2 primeiros IPv6
+                    print(f"   IPv6: {ipv6}")
+                if len(interface['ipv6']) > 2:
+                    print(f"   ... e mais {len(interface['ipv6']) - 2} endereços IPv6")
+        
+        print("\n" + "="*60)
+        
+        # Sugere a interface da rota padrão (ou a primeira UP que não seja loopback)
+        sugerida = interfaces_rede.interface_padrao(atualizar)
+        if sugerida:
+            print(f"💡 Interface sugerida: {sugerida}")
+            self.interface = sugerida
+        else:
+            print("⚠️  Nenhuma interface UP encontrada (exceto loopback)")
+        
+        return interfaces
     
-    def detectar_interface(self):
-        """Detecta automaticamente a interface de rede ativa"""
+    def detectar_interface(self, atualizar=False):
+        """Detecta automaticamente a interface de rede ativa (rota padrão em /proc/net/route)"""
         try:
-            # Tenta encontrar interface padrão pela rota
-            resultado = subprocess.run(['ip', 'route'], capture_output=True, text=True)
-            linhas = resultado.stdout.split('\n')
-            
-            for linha in linhas:
-                if 'default' in linha:
-                    partes = linha.split()
-                    if len(partes) >= 5:
-                        self.interface = partes[4]
-                        return self.interface
-            
-            # Fallback para interfaces comuns
-            interfaces_comuns = ['eth0', 'wlan0', 'enp0s3', 'ens33', 'wlp2s0']
-            for interface in interfaces_comuns:
-                try:
-                    subprocess.run(['ip', 'addr', 'show', interface], 
-                                 capture_output=True, check=True)
-                    self.interface = interface
-                    return interface
-                except:
-                    continue
-                    
-            return None
-        except Exception as e:
+            self.interface = interfaces_rede.interface_padrao(atualizar)
+            return self.interface
+        except OSError as e:
             print(f"Erro ao detectar interface: {e}")
             return None
     
@@ -154,169 +177,308 @@ class AnalisadorTrafego:
             return False
         
         print(f"\n🎯 Iniciando captura na interface {self.interface} por {duracao} segundos...")
+        print(f"   Perfil de captura: {self.perfil_captura.descricao()}")
         
         try:
-            # Comando tcpdump para capturar apenas pacotes IP
+            # Comando tcpdump; o perfil define o filtro BPF (pacotes IP) e o snaplen
             comando = [
                 'sudo', 'tcpdump',
                 '-i', self.interface,
                 '-nn',           # Não resolver nomes
-                '-ttt',          # Timestamp relativo em segundos
-                'ip',            # Apenas pacotes IP
-                '-w', 'captura.pcap'  # Salva em formato pcap para análise posterior
+                *self.perfil_captura.opcoes(),
+                '-w', self.arquivo_pcap,  # Salva em formato pcap para análise posterior
+                self.perfil_captura.expressao()
             ]
             
             print("📡 Capturando tráfego... (aguarde)")
-            # Executa tcpdump em background
-            processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Aguarda o tempo especificado
-            for i in range(duracao):
-                print(f"\r⏱️  Progresso: {i+1}/{duracao} segundos", end='', flush=True)
-                time.sleep(1)
-            
-            # Envia sinal SIGTERM para parar o tcpdump
-            processo.terminate()
-            stdout, stderr = processo.communicate()
+            with self.metricas.etapa('captura_tcpdump'):
+                # Executa tcpdump em background
+                processo = subprocess.Popen(comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+                
+                # Aguarda o tempo especificado
+                for i in range(duracao):
+                    print(f"\r⏱️  Progresso: {i+1}/{duracao} segundos", end='', flush=True)
+                    time.sleep(1)
+                
+                # Envia sinal SIGTERM para parar o tcpdump
+                processo.terminate()
+                stdout, stderr = processo.communicate()
             
             if stderr:
                 print(f"\n⚠️  Avisos do tcpdump: {stderr.decode()}")
             
-            print(f"\n✅ Captura concluída! Convertendo para formato texto...")
-            
-            # Converte pcap para texto legível
-            comando_convert = [
-                'tcpdump',
-                '-nn',
-                '-ttt',
-                '-r', 'captura.pcap'
-            ]
+            print(f"\n✅ Captura concluída!")
             
-            with open(self.arquivo_trafego, 'w') as f:
-                subprocess.run(comando_convert, stdout=f, text=True)
+            # Conta os pacotes lendo apenas os cabeçalhos dos registros do pcap
+            with self.metricas.etapa('contagem_pcap'):
+                total_pacotes = leitor_pcap.contar_pacotes(self.arquivo_pcap)
+            self.metricas.contar('pacotes_capturados', total_pacotes)
+            print(f"📊 Total de pacotes capturados: {total_pacotes}")
+            print(f"💾 Captura salva em {self.arquivo_pcap}")
             
-            # Conta linhas capturadas
-            with open(self.arquivo_trafego, 'r') as f:
-                linhas = f.readlines()
-            
-            print(f"📊 Total de pacotes capturados: {len(linhas)}")
-            print(f"💾 Tráfego salvo em {self.arquivo_trafego}")
+            if self.exportar_texto:
+                self.exportar_texto_depuracao()
             return True
             
         except Exception as e:
             print(f"❌ Erro na captura: {e}")
             return False
     
+    def exportar_texto_depuracao(self):
+        """
+        Converte o pcap para texto legível (trafego.txt), apenas para depuração
+        Com arquivo_trafego terminando em .gz/.xz/.zst o texto já é gravado comprimido
+        """
+        print(f"📝 Exportando {self.arquivo_pcap} para {self.arquivo_trafego}...")
+        
+        comando_convert = [
+            'tcpdump',
+            '-nn',
+            '-tt',           # Timestamp absoluto (epoch), base de tempo da análise
+            '-r', self.arquivo_pcap
+        ]
+        
+        with self.metricas.etapa('conversao_tcpdump'):
+            if compressao.formato_por_extensao(self.arquivo_trafego) is None:
+                with open(self.arquivo_trafego, 'w') as f:
+                    subprocess.run(comando_convert, stdout=f, text=True)
+                return
+            # Comprime enquanto o tcpdump escreve, sem o texto inteiro passar pelo disco
+            processo = subprocess.Popen(comando_convert, stdout=subprocess.PIPE)
+            with compressao.abrir(self.arquivo_trafego, 'wb') as f:
+                shutil.copyfileobj(processo.stdout, f, compressao.TAMANHO_BUFFER)
+            processo.wait()
+    
     def converter_servico_para_porta(self, servico):
         """Converte nomes de serviço para números de porta"""
-        servicos = {
-            'http': 80, 'https': 443, 'ssh': 22, 'ftp': 21,
-            'domain': 53, 'smtp': 25, 'pop3': 110, 'imap': 143
-        }
-        
-        return servicos.get(servico.lower(), 0)
+        return parser_tcpdump.SERVICOS.get(servico.lower(), 0)
 
     def parse_linha(self, linha):
-        """Parseia uma linha do tcpdump com regex mais flexível"""
-        
-        # Padrão 1: Formato padrão com flags
-        padrao1 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+[\d\.]+\.(\d+):'
-        
-        # Padrão 2: Formato com protocolo TCP
-        padrao2 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+[\d\.]+\.(\d+)\s+tcp'
-        
-        # Padrão 3: Formato com nomes de serviço
-        padrao3 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+[\d\.]+\.(\w+):'
-        
-        padrao4 = r'^\s*(\d+:\d+:\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\d+):'
-        
-        padrao5 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\d+):'
-        
-        padrao6 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\d+)\s+tcp'
-        
-        padrao7 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\w+):'
+        """Parseia uma linha do tcpdump (fast path por split + regex única pré-compilada)"""
+        return parser_tcpdump.parse_linha(linha)
+    
+    def ler_eventos(self, arquivo, agregador=None):
+        """
+        Gera os eventos de um arquivo, lendo pcap/pcapng nativamente ou texto do tcpdump
+        Os timestamps saem da camada de ingestão em microssegundos absolutos e monotônicos
+        Com 'agregador' (AgregadorTempo), cada evento também entra nos agregados de tempo
+        """
+        # Com --profile, as linhas descartadas são contadas por tipo (ARP, IP6, ICMP...)
+        falhas = self.metricas.falhas_parse if self.metricas.ativo else None
+        eventos = ingestao.eventos_de_arquivo(arquivo, self.formato_tempo, falhas)
+        eventos = self.metricas.medir_iterador('leitura_parse', eventos)
+        if self.filtro_redes is not None:
+            eventos = self.filtro_redes.filtrar(eventos)
+        if agregador is not None:
+            eventos = self._agregando(eventos, agregador)
+        return eventos
+    
+    @staticmethod
+    def _agregando(eventos, agregador):
+        adicionar = agregador.adicionar
+        for dados in eventos:
+            if dados:
+                adicionar(dados)
+            yield dados
+    
+    def _iniciar_filtro_redes(self):
+        """Zera o contador de descartes da análise que começa e mostra as listas de redes em uso"""
+        if self.filtro_redes is not None:
+            self.filtro_redes.descartados = 0
+            print(f"🛡️  Redes: {self.filtro_redes.descricao()}")
+    
+    def _relatar_filtro_redes(self):
+        if self.filtro_redes is None:
+            return
+        self.metricas.contar('descartados_permitidos', self.filtro_redes.descartados)
+        if self.filtro_redes.permitidos is not None:
+            print(f"   • Eventos de redes permitidas descartados: {self.filtro_redes.descartados}")
+    
+    def _novo_agregador(self, arquivo=None):
+        """
+        AgregadorTempo que grava no histórico, ou None (desligado, sem histórico ou, com 'arquivo',
+        se esse arquivo já foi somado aos agregados: reanalisá-lo contaria tudo duas vezes)
+        """
+        if not self.agregados_tempo or self.historico is None:
+            return None
+        historico = self.historico
+        try:
+            if arquivo is not None and historico.arquivo_agregado(arquivo):
+                print(f"ℹ️  {arquivo} já está nos agregados de tempo do histórico (não será somado de novo)")
+                return None
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️  Agregados de tempo desligados: histórico indisponível ({e})")
+            return None
         
-        for padrao in [padrao1, padrao2, padrao3, padrao4, padrao5, padrao6, padrao7]:
-            match = re.match(padrao, linha)
-            if match:
-                timestamp_str = match.group(1)
-                ip_origem = match.group(2)
-                porta_origem = match.group(3)
-                ip_destino = match.group(4)
-                porta_destino = match.group(5)
-                
-                # Se for nome de serviço, converte para número
-                if not porta_destino.isdigit():
-                    porta_destino = self.converter_servico_para_porta(porta_destino)
-                    
-                try:
-                    h, m, s = timestamp_str.split(':')
-                    segundos, microsegundos = s.split('.')
-                    timestamp_total = int(h)*3600 + int(m)*60 + int(segundos) + float("0." + microsegundos)
-                except:
-                    timestamp_total = 0.0
-                
-                return {
-                    'timestamp': timestamp_total,
-                    'ip_origem': ip_origem,
-                    'porta_origem': int(porta_origem) if porta_origem.isdigit() else 0,
-                    'ip_destino': ip_destino,
-                    'porta_destino': int(porta_destino) if porta_destino.isdigit() else 0
-                }
+        def gravar(linhas):
+            if not agregador.ativo:
+                return
+            try:
+                historico.mesclar_agregados(linhas)
+            except sqlite3.Error as e:
+                print(f"⚠️  Não foi possível gravar os agregados de tempo em {historico.caminho}: {e}")
+                agregador.ativo = False
         
-        return None
+        agregador = agregados_tempo.AgregadorTempo(gravar)
+        return agregador
+    
+    def _fechar_agregador(self, agregador, arquivo=None):
+        """Grava os baldes ainda abertos, aplica a retenção e marca o arquivo como somado"""
+        if agregador is None:
+            return
+        with self.metricas.etapa('agregados_tempo'):
+            agregador.fechar()
+            if not agregador.ativo or not agregador.emitidas:
+                return
+            try:
+                self.historico.aplicar_retencao()
+                if arquivo is not None:
+                    self.historico.marcar_arquivo_agregado(arquivo)
+            except (sqlite3.Error, OSError) as e:
+                print(f"⚠️  Não foi possível atualizar os agregados de tempo: {e}")
+                return
+        self.metricas.contar('linhas_agregados', agregador.emitidas)
+        print(f"🧮 Agregados de tempo (1s/1m/1h): {agregador.emitidas} linhas somadas ao histórico")
+    
+    def _janela_us(self):
+        """Janela de port scan convertida para a base de tempo da ingestão (µs)"""
+        return int(self.janela_portscan * ingestao.MICROS)
+    
+    def _novo_detector(self):
+        return novo_detector(self._janela_us(), self.limite_portas, self.deteccao_aproximada)
+    
+    def configurar_deteccao(self, configuracao):
+        """Aplica a configuração dos detectores; a janela/limite do port scan vertical valem para todas as análises"""
+        self.configuracao_deteccao = configuracao
+        vertical = configuracao['portscan_vertical']
+        self.janela_portscan = float(vertical['janela'])
+        self.limite_portas = int(vertical['limite'])
     
-    def analisar_trafego(self):
+    def _nova_pipeline(self, vertical=True):
+        """Pipeline com os detectores ativos; vertical=False quando o port scan é calculado à parte"""
+        detector = self._novo_detector() if vertical else None
+        return pipeline_deteccao.montar_pipeline(self.configuracao_deteccao, detector, vertical=vertical)
+    
+    def _portscan_ativo(self):
+        return self.configuracao_deteccao['portscan_vertical']['ativo']
+    
+    def _avisar_so_portscan(self, analise):
+        """Análises que mantêm só o detector de port scan avisam quando há outros detectores ligados"""
+        extras = pipeline_deteccao.extras_ativos(self.configuracao_deteccao)
+        if extras:
+            print(f"ℹ️  A {analise} usa só o detector de port scan vertical ({', '.join(extras)} ignorados)")
+    
+    def _imprimir_alerta(self, detector, chave, timestamp, origem=''):
+        momento = datetime.fromtimestamp(ingestao.segundos(timestamp)).strftime('%H:%M:%S')
+        sufixo = f" ({origem})" if origem else ""
+        print(f"🚨 [{momento}] {detector.descrever(chave)}{sufixo}")
+    
+    def _relatar_deteccoes(self, pipeline):
+        """Resumo e alertas.csv dos detectores além do port scan vertical (nada se não houver nenhum)"""
+        extras = pipeline.extras()
+        if not extras:
+            return
+        alertas = [alerta for alerta in pipeline.alertas() if alerta[1] is not pipeline.vertical]
+        print(f"🧩 Outros detectores:")
+        for detector in extras:
+            self.metricas.contar(f'alertas_{detector.nome}', len(detector.detectados))
+            print(f"   • {detector.nome}: {len(detector.detectados)} alerta(s)")
+            primeiros = sorted(detector.detectados.items(), key=lambda x: x[1])[:5]
+            for chave, momento in primeiros:
+                print(f"      [{self.formatar_momento(momento)}] {detector.descrever(chave)}")
+        try:
+            relatorio_csv.escrever_alertas(self.arquivo_alertas, alertas)
+        except OSError as e:
+            print(f"⚠️  Não foi possível gravar {self.arquivo_alertas}: {e}")
+            return
+        print(f"✅ Alertas gravados em: {self.arquivo_alertas} ({len(alertas)})")
+    
+    def analisar_trafego(self, arquivo=None):
         """Analisa o tráfego capturado e detecta port scans"""
-        if not os.path.exists(self.arquivo_trafego):
+        self.metricas.iniciar('analisar_trafego', arquivo)
+        try:
+            return self._analisar_trafego(arquivo)
+        finally:
+            self.metricas.finalizar()
+    
+    def _analisar_trafego(self, arquivo):
+        if arquivo is None:
+            # Prefere o pcap da captura; trafego.txt fica como alternativa
+            arquivo = self.arquivo_pcap if os.path.exists(self.arquivo_pcap) else self.arquivo_trafego
+        
+        if not os.path.exists(arquivo):
             print("❌ Arquivo de tráfego não encontrado!")
             return False
         
-        print("🔍 Analisando tráfego...")
+        print(f"🔍 Analisando tráfego de {arquivo}...")
+        self.metricas.arquivo_analisado = arquivo
+        self._iniciar_filtro_redes()
         
-        # Estruturas para análise
-        eventos_por_ip = defaultdict(int)
-        portas_por_ip = defaultdict(lambda: defaultdict(list))
+        if self.agregar_fluxos:
+            return self._analisar_trafego_fluxos(arquivo)
+        
+        # O armazém guarda IPs como inteiros: chaves de bloco/sub-rede vão pela análise em uma passada
+        if self.topk_ips or self.deteccao_aproximada or (self.filtro_redes and self.filtro_redes.agrupa):
+            return self._analisar_trafego_streaming(arquivo)
         
-        # DEBUG: Verificar parsing
-        ips_detectados = set()
+        # Eventos guardados em colunas compactas (18 bytes por evento)
+        armazem = ArmazemEventos()
+        
+        # O port scan vertical é vetorizado no armazém; os outros detectores ligados recebem
+        # cada evento na mesma passada de leitura
+        pipeline = self._nova_pipeline(vertical=False)
+        processar = pipeline.processar if pipeline else None
+        agregador = self._novo_agregador(arquivo)
+        adicionar = agregador.adicionar if agregador is not None else None
         
         # Lê e parseia o arquivo
         total_linhas = 0
-        linhas_parseadas = 0
         
-        with open(self.arquivo_trafego, 'r') as f:
-            for num_linha, linha in enumerate(f, 1):
+        with self.metricas.etapa('armazenamento'):
+            for dados in self.ler_eventos(arquivo):
                 total_linhas += 1
-                dados = self.parse_linha(linha)
-                
                 if dados:
-                    linhas_parseadas += 1
-                    ip = dados['ip_origem']
-                    timestamp = dados['timestamp']
-                    porta = dados['porta_destino']
-                    
-                    # DEBUG
-                    ips_detectados.add(ip)
-                    
-                    # Conta eventos por IP (ANÁLISE BÁSICA)
-                    eventos_por_ip[ip] += 1
-                    
-                    # Armazena para detecção de port scan (ANÁLISE AVANÇADA)
-                    portas_por_ip[ip][timestamp].append(porta)
+                    armazem.adicionar_evento(dados)
+                    if processar is not None:
+                        processar(dados)
+                    if adicionar is not None:
+                        adicionar(dados)
+        self.metricas.descontar('armazenamento', 'leitura_parse')
+        self._fechar_agregador(agregador, arquivo)
+        
+        linhas_parseadas = len(armazem)
+        
+        # Contagem por IP (ANÁLISE BÁSICA) e janelas de port scan (ANÁLISE AVANÇADA),
+        # vetorizadas com NumPy quando disponível
+        with self.metricas.etapa('deteccao_janelas'):
+            resultado = armazem.analisar(self._janela_us(), self.limite_portas)
+        eventos_por_ip = resultado.eventos_por_ip
+        
+        self.metricas.contar('registros', total_linhas)
+        self.metricas.contar('eventos', linhas_parseadas)
+        self.metricas.contar('ips_unicos', len(eventos_por_ip))
+        self.metricas.contar('portscans', len(resultado.portscan_detectado))
+        self.metricas.contar('bytes_armazem', armazem.bytes_usados())
+        self.metricas.registrar_janelas(resultado.max_portas_janela.values())
         
         # DEBUG: Mostra o que foi encontrado
         print(f"📈 Estatísticas da análise:")
-        print(f"   • Total de linhas no arquivo: {total_linhas}")
+        print(f"   • Total de registros no arquivo: {total_linhas}")
         print(f"   • Linhas parseadas com sucesso: {linhas_parseadas}")
+        self._relatar_filtro_redes()
         print(f"   • IPs únicos detectados: {len(eventos_por_ip)}")
+        print(f"   • Memória dos eventos: {armazem.bytes_usados() / 1024:.1f} KB "
+              f"({armazem.bytes_por_evento()} bytes/evento)")
         
         if eventos_por_ip:
             print(f"   • IPs encontrados: {', '.join(sorted(eventos_por_ip.keys()))}")
         else:
             print("   ⚠️  NENHUM IP detectado - problema no parsing!")
+            if ingestao.e_captura_pcap(arquivo):
+                print("      Nenhum pacote IPv4 TCP/UDP encontrado na captura")
+                return False
             # Mostra exemplo de linha não parseada
-            with open(self.arquivo_trafego, 'r') as f:
+            with compressao.abrir(arquivo, 'r') as f:
                 for i, linha in enumerate(f):
                     if i < 3:  # Mostra 3 primeiras linhas
                         print(f"      Exemplo linha {i+1}: {linha.strip()}")
@@ -324,78 +486,860 @@ class AnalisadorTrafego:
                         break
             return False
         
-        # DETECÇÃO DE PORTSCAN (funcionalidade adicional)
-        portscan_detectado = {}
-        for ip, timestamps in portas_por_ip.items():
-            portas_unicas_60s = set()
-            timestamps_ordenados = sorted(timestamps.keys())
-            
-            # Verifica janela deslizante de 60 segundos
-            portscan_encontrado = False
-            for i, ts_inicio in enumerate(timestamps_ordenados):
-                portas_janela = set()
-                
-                for ts in timestamps_ordenados[i:]:
-                    if ts - ts_inicio <= 60.0:  # Janela de 60 segundos
-                        portas_janela.update(timestamps[ts])
-                    else:
-                        break
-                
-                if len(portas_janela) > 10:  # Limite para considerar portscan
-                    portscan_encontrado = True
-                    break
-            
-            portscan_detectado[ip] = portscan_encontrado
+        # DETECÇÃO DE PORTSCAN: ip -> momento em que o limite foi cruzado
+        portscan_detectado = resultado.portscan_detectado if self._portscan_ativo() else {}
         
         # Gera relatório CSV com AMBAS as análises
-        with open(self.arquivo_relatorio, 'w', newline='') as csvfile:
-            writer = csv.writer(csvfile, delimiter=';')
-            writer.writerow(['IP', 'Total_Eventos', 'Detectado_PortScan'])
-            
-            for ip, total in sorted(eventos_por_ip.items(), key=lambda x: x[1], reverse=True):
-                portscan = 'Sim' if portscan_detectado.get(ip, False) else 'Nao'
-                writer.writerow([ip, total, portscan])
+        self.gerar_relatorio(eventos_por_ip, portscan_detectado)
         
         print(f"✅ Relatório gerado: {self.arquivo_relatorio}")
         
+        # Contagens por minuto do tráfego só existem com timestamps epoch (-tt ou pcap)
+        baldes = None
+        if balde_de_timestamp(armazem.timestamps[0]) is not None:
+            baldes = armazem.contagens_por_balde(LARGURA_BALDE_S * ingestao.MICROS)
+        self.salvar_historico('analisar_trafego', eventos_por_ip, portscan_detectado,
+                              baldes=baldes, arquivo=arquivo)
+        
         # Mostra resumo das detecções
-        portscans = sum(1 for ip in portscan_detectado.values() if ip)
+        portscans = len(portscan_detectado)
         print(f"📊 Resumo da detecção:")
         print(f"   • IPs com comportamento normal: {len(eventos_por_ip) - portscans}")
         print(f"   • IPs com possível portscan: {portscans}")
+        print(f"   • Top talkers:")
+        for ip, total in resultado.top_talkers(5):
+            maximo = resultado.max_portas_janela.get(ip)
+            detalhe = f", máx. {maximo} portas/janela" if maximo is not None else ""
+            print(f"      {ip:<15} {total} eventos{detalhe}")
         
+        self._relatar_deteccoes(pipeline)
         return True
     
-    def mostrar_estatisticas(self):
-        """Mostra estatísticas do relatório gerado"""
-        if not os.path.exists(self.arquivo_relatorio):
+    def _analisar_trafego_streaming(self, arquivo):
+        """
+        Análise em uma passada, sem guardar os eventos: top-K aproximado por IP (topk_ips)
+        e/ou detector aproximado (deteccao_aproximada), com as janelas expiradas periodicamente
+        """
+        topk = SpaceSaving(self.topk_ips) if self.topk_ips else None
+        eventos_por_ip = defaultdict(int)
+        pipeline = self._nova_pipeline()
+        processar = pipeline.processar
+        agregador = self._novo_agregador(arquivo)
+        total_linhas = 0
+        eventos = 0
+        
+        with self.metricas.etapa('contagem_deteccao'):
+            for dados in self.ler_eventos(arquivo, agregador):
+                total_linhas += 1
+                if not dados:
+                    continue
+                eventos += 1
+                ip = dados['ip_origem']
+                if topk is not None:
+                    topk.adicionar(ip)
+                else:
+                    eventos_por_ip[ip] += 1
+                # A pipeline expira sozinha as janelas de quem parou de enviar
+                processar(dados)
+        self.metricas.descontar('contagem_deteccao', 'leitura_parse')
+        self._fechar_agregador(agregador, arquivo)
+        
+        detectados = pipeline.portscan_detectado()
+        self.metricas.contar('registros', total_linhas)
+        self.metricas.contar('eventos', eventos)
+        self.metricas.contar('portscans', len(detectados))
+        
+        modos = []
+        if topk is not None:
+            modos.append(f"top-{self.topk_ips} aproximado")
+        if self.deteccao_aproximada:
+            modos.append("detecção aproximada (HLL)")
+        if self.filtro_redes is not None and self.filtro_redes.agrupa:
+            modos.append("origens agrupadas")
+        print(f"📈 Estatísticas da análise ({', '.join(modos) or 'uma passada'}):")
+        print(f"   • Total de registros no arquivo: {total_linhas}")
+        print(f"   • Linhas parseadas com sucesso: {eventos}")
+        self._relatar_filtro_redes()
+        if topk is not None:
+            print(f"   • IPs no top-K: {len(topk)} (erro máximo por contagem: {topk.erro_maximo()})")
+        else:
+            print(f"   • IPs únicos detectados: {len(eventos_por_ip)}")
+        
+        if not eventos:
+            print("   ⚠️  NENHUM IP detectado - problema no parsing!")
+            return False
+        
+        if topk is not None:
+            eventos_por_ip, erros = self.gerar_relatorio_topk(topk, detectados)
+            top = topk.top(5)
+        else:
+            erros = None
+            self.gerar_relatorio(eventos_por_ip, detectados)
+            top = [(ip, total, 0) for ip, total in
+                   heapq.nlargest(5, eventos_por_ip.items(), key=lambda x: x[1])]
+        print(f"✅ Relatório gerado: {self.arquivo_relatorio}")
+        self.salvar_historico('analisar_trafego', eventos_por_ip, detectados, erros, arquivo=arquivo)
+        
+        print(f"📊 Resumo da detecção:")
+        print(f"   • IPs com possível portscan: {len(detectados)}")
+        print(f"   • Top talkers:")
+        for ip, contagem, erro in top:
+            detalhe = f" (±{erro})" if erro else ""
+            print(f"      {ip:<15} {contagem} eventos{detalhe}")
+        self._relatar_deteccoes(pipeline)
+        return True
+    
+    def _analisar_trafego_fluxos(self, arquivo):
+        """
+        Análise em uma passada com os pacotes agregados em fluxos (tabela_fluxos.AnaliseFluxos):
+        os detectores recebem um registro por fluxo novo e o relatório soma pacotes e bytes dos fluxos
+        """
+        topk = SpaceSaving(self.topk_ips) if self.topk_ips else None
+        pipeline = self._nova_pipeline()
+        analise = tabela_fluxos.AnaliseFluxos(
+            pipeline, topk, int(self.timeout_inativo_fluxo * ingestao.MICROS),
+            int(self.timeout_ativo_fluxo * ingestao.MICROS), self.capacidade_fluxos)
+        
+        # Os agregados de tempo contam pacotes, antes da tabela de fluxos
+        agregador = self._novo_agregador(arquivo)
+        with self.metricas.etapa('agregacao_fluxos'):
+            analise.processar(self.ler_eventos(arquivo, agregador))
+        self.metricas.descontar('agregacao_fluxos', 'leitura_parse')
+        self._fechar_agregador(agregador, arquivo)
+        
+        resumo = analise.tabela.resumo()
+        detectados = pipeline.portscan_detectado()
+        self.metricas.contar('registros', analise.registros)
+        self.metricas.contar('eventos', analise.eventos)
+        self.metricas.contar('fluxos', resumo['fluxos'])
+        self.metricas.contar('portscans', len(detectados))
+        
+        print(f"📈 Estatísticas da análise (agregação por fluxos):")
+        print(f"   • Total de registros no arquivo: {analise.registros}")
+        print(f"   • Pacotes parseados com sucesso: {analise.eventos}")
+        self._relatar_filtro_redes()
+        print(f"   • Fluxos: {resumo['fluxos']} ({resumo['pacotes_por_fluxo']:.1f} pacotes/fluxo), "
+              f"no máximo {resumo['maximo_ativos']} abertos ao mesmo tempo")
+        print("   • Encerrados por: " + ", ".join(f"{motivo} {quantidade}" for motivo, quantidade
+                                                  in resumo['exportados'].items() if quantidade))
+        
+        if not analise.eventos:
+            print("   ⚠️  NENHUM IP detectado - problema no parsing!")
+            return False
+        
+        if topk is not None:
+            eventos_por_ip, erros = self.gerar_relatorio_topk(topk, detectados)
+        else:
+            eventos_por_ip, erros = analise.eventos_por_ip, None
+            self.gerar_relatorio(eventos_por_ip, detectados, fluxos=analise.fluxos_por_ip)
+        print(f"✅ Relatório gerado: {self.arquivo_relatorio}")
+        self.salvar_historico('analisar_trafego_fluxos', eventos_por_ip, detectados, erros, arquivo=arquivo)
+        
+        print(f"📊 Resumo da detecção:")
+        print(f"   • IPs únicos: {len(eventos_por_ip)}")
+        print(f"   • IPs com possível portscan: {len(detectados)}")
+        print(f"   • Top talkers:")
+        for ip, total in heapq.nlargest(5, eventos_por_ip.items(), key=lambda x: x[1]):
+            fluxos, total_bytes = analise.fluxos_por_ip.get(ip, (None, None))
+            detalhe = f", {fluxos} fluxos, {total_bytes} bytes" if fluxos is not None else ""
+            print(f"      {ip:<15} {total} pacotes{detalhe}")
+        self._relatar_deteccoes(pipeline)
+        return True
+    
+    def analisar_trafego_paralelo(self, arquivo=None, processos=None):
+        """Analisa um arquivo grande usando todos os núcleos (ver analise_paralela.py)"""
+        self.metricas.iniciar('analisar_trafego_paralelo', arquivo)
+        try:
+            return self._analisar_trafego_paralelo(arquivo, processos)
+        finally:
+            self.metricas.finalizar()
+    
+    def _analisar_trafego_paralelo(self, arquivo, processos):
+        if arquivo is None:
+            arquivo = self.arquivo_pcap if os.path.exists(self.arquivo_pcap) else self.arquivo_trafego
+        
+        if not os.path.exists(arquivo):
+            print("❌ Arquivo de tráfego não encontrado!")
+            return False
+        
+        # Um fluxo comprimido não pode ser dividido em faixas de bytes independentes
+        formato = compressao.detectar(arquivo)
+        if formato:
+            print(f"ℹ️  {arquivo} está comprimido ({formato}): a leitura é sequencial")
+            return self._analisar_trafego(arquivo)
+        
+        # As faixas do arquivo só juntam as janelas de port scan; os outros detectores
+        # precisam ver o tráfego em ordem, numa passada só
+        if pipeline_deteccao.extras_ativos(self.configuracao_deteccao) or not self._portscan_ativo():
+            print("ℹ️  Detectores além do port scan vertical ligados: a leitura é sequencial")
+            return self._analisar_trafego(arquivo)
+        
+        # Os shards guardam IPs como inteiros e não aplicam as listas de redes
+        if self.filtro_redes is not None:
+            print("ℹ️  Listas de redes ligadas (--permitidos/--blocos/--agrupar): a leitura é sequencial")
+            return self._analisar_trafego(arquivo)
+        
+        # Os shards não veem os eventos em ordem de tempo, que o agregador precisa para fechar os baldes
+        if self.agregados_tempo and self.historico is not None:
+            print("ℹ️  Agregados de tempo ligados (desligue com --sem-agregados): a leitura é sequencial")
+            return self._analisar_trafego(arquivo)
+        
+        processos = processos or os.cpu_count() or 1
+        print(f"🔍 Analisando {arquivo} em paralelo com {processos} processos...")
+        
+        self.metricas.arquivo_analisado = arquivo
+        inicio = time.time()
+        with self.metricas.etapa('analise_paralela'):
+            eventos_por_ip, portscan_detectado, total, parseados = analise_paralela.analisar(
+                arquivo, self._janela_us(), self.limite_portas, processos, self.formato_tempo)
+        duracao = time.time() - inicio
+        self.metricas.contar('registros', total)
+        self.metricas.contar('eventos', parseados)
+        self.metricas.contar('ips_unicos', len(eventos_por_ip))
+        self.metricas.contar('portscans', len(portscan_detectado))
+        
+        print(f"📈 Estatísticas da análise:")
+        print(f"   • Total de registros no arquivo: {total}")
+        print(f"   • Linhas parseadas com sucesso: {parseados}")
+        print(f"   • IPs únicos detectados: {len(eventos_por_ip)}")
+        print(f"   • Tempo de análise: {duracao:.2f}s ({total / max(duracao, 1e-9):,.0f} registros/s)")
+        
+        if not eventos_por_ip:
+            print("   ⚠️  NENHUM IP detectado - verifique o formato do arquivo")
+            return False
+        
+        self.gerar_relatorio(eventos_por_ip, portscan_detectado)
+        print(f"✅ Relatório gerado: {self.arquivo_relatorio}")
+        self.salvar_historico('analisar_trafego_paralelo', eventos_por_ip, portscan_detectado, arquivo=arquivo)
+        print(f"📊 Resumo da detecção:")
+        print(f"   • IPs com comportamento normal: {len(eventos_por_ip) - len(portscan_detectado)}")
+        print(f"   • IPs com possível portscan: {len(portscan_detectado)}")
+        return True
+    
+    def analisar_trafego_incremental(self, arquivo=None):
+        """
+        Processa apenas o que foi acrescentado ao arquivo desde a última execução
+        O estado (offset, contagens, janelas abertas) fica em arquivo_checkpoint
+        """
+        self.metricas.iniciar('analisar_trafego_incremental', arquivo)
+        try:
+            return self._analisar_trafego_incremental(arquivo)
+        finally:
+            self.metricas.finalizar()
+    
+    def _analisar_trafego_incremental(self, arquivo):
+        if arquivo is None:
+            arquivo = self.arquivo_pcap if os.path.exists(self.arquivo_pcap) else self.arquivo_trafego
+        
+        if not os.path.exists(arquivo):
+            print("❌ Arquivo de tráfego não encontrado!")
+            return False
+        
+        if compressao.detectar(arquivo):
+            print(f"❌ {arquivo} está comprimido: a análise incremental acompanha um arquivo que cresce "
+                  f"(use --analisar para lê-lo inteiro)")
+            return False
+        
+        self._avisar_so_portscan('análise incremental')
+        self.metricas.arquivo_analisado = arquivo
+        self._iniciar_filtro_redes()
+        with self.metricas.etapa('checkpoint_carregar'):
+            estado = analise_incremental.carregar_checkpoint(self.arquivo_checkpoint)
+        if estado is None:
+            print(f"🆕 Sem checkpoint válido: processando {arquivo} desde o início")
+            estado = analise_incremental.EstadoIncremental(
+                arquivo, self._janela_us(), self.limite_portas, self.formato_tempo)
+        elif not estado.compativel(arquivo, self._janela_us(), self.limite_portas, self.formato_tempo):
+            print(f"♻️  Checkpoint não corresponde a {arquivo} (arquivo novo, truncado, critério ou "
+                  f"formato de tempo diferente): recomeçando do início")
+            estado = analise_incremental.EstadoIncremental(
+                arquivo, self._janela_us(), self.limite_portas, self.formato_tempo)
+        else:
+            print(f"⏩ Retomando {arquivo} a partir do byte {estado.offset}")
+        
+        anteriores = dict(estado.eventos_por_ip)
+        # Só os bytes novos passam pelo agregador, então nada é somado duas vezes no histórico
+        agregador = self._novo_agregador()
+        try:
+            with self.metricas.etapa('leitura_parse_deteccao'):
+                novos = analise_incremental.processar_novos(estado, arquivo, agregador, self.filtro_redes)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return False
+        self._fechar_agregador(agregador)
+        
+        with self.metricas.etapa('checkpoint_salvar'):
+            analise_incremental.salvar_checkpoint(estado, self.arquivo_checkpoint)
+        self.gerar_relatorio(estado.eventos_por_ip, estado.detector.detectados)
+        # O histórico guarda os totais acumulados por IP, mas no balde desta execução só entram
+        # os eventos novos, para que somar baldes de várias execuções não conte nada duas vezes
+        self.salvar_historico('analisar_trafego_incremental', estado.eventos_por_ip,
+                              estado.detector.detectados, arquivo=arquivo,
+                              baldes_execucao={ip: total - anteriores.get(ip, 0)
+                                               for ip, total in estado.eventos_por_ip.items()
+                                               if total != anteriores.get(ip, 0)})
+        self.metricas.contar('registros', novos)
+        self.metricas.contar('ips_unicos', len(estado.eventos_por_ip))
+        self.metricas.contar('portscans', len(estado.detector.detectados))
+        self.metricas.registrar_janelas(len(janela.contagem) for janela in estado.detector.janelas.values())
+        
+        print(f"📈 Registros novos processados: {novos} (total acumulado: {estado.registros})")
+        self._relatar_filtro_redes()
+        print(f"   • IPs únicos: {len(estado.eventos_por_ip)}")
+        print(f"   • IPs com possível portscan: {len(estado.detector.detectados)}")
+        print(f"   • Janelas abertas no checkpoint: {len(estado.detector.janelas)}")
+        print(f"✅ Relatório atualizado: {self.arquivo_relatorio}")
+        return True
+    
+    def formatar_momento(self, timestamp):
+        """Formata o timestamp em µs (data/hora se for epoch, segundos desde o início se for relativo)"""
+        return relatorio_csv.formatar_momento(timestamp)
+    
+    def gerar_relatorio(self, eventos_por_ip, portscan_detectado, erros=None, fluxos=None):
+        """
+        Escreve o relatorio.csv (ver relatorio_csv.escrever_relatorio)
+        portscan_detectado mapeia ip -> timestamp em que o limite de portas foi cruzado
+        erros (modo top-K) mapeia ip -> erro máximo da contagem e acrescenta a coluna Erro_Max
+        fluxos (análise por fluxos) mapeia ip -> [fluxos, bytes]
+        """
+        with self.metricas.etapa('relatorio_csv'):
+            relatorio_csv.escrever_relatorio(self.arquivo_relatorio, eventos_por_ip, portscan_detectado,
+                                             erros, fluxos)
+    
+    def gerar_relatorio_topk(self, topk, portscan_detectado):
+        """
+        Relatório do modo top-K: só os IPs monitorados, com o erro de cada contagem
+        IPs com port scan que saíram do top-K entram com a contagem limitada por erro_maximo()
+        """
+        eventos_por_ip = topk.contagens()
+        erros = topk.erros()
+        for ip in portscan_detectado:
+            if ip not in eventos_por_ip:
+                eventos_por_ip[ip], erros[ip] = topk.erro_maximo(), topk.erro_maximo()
+        self.gerar_relatorio(eventos_por_ip, portscan_detectado, erros)
+        return eventos_por_ip, erros
+    
+    def salvar_historico(self, comando, eventos_por_ip, portscan_detectado, erros=None,
+                         baldes=None, arquivo=None, baldes_execucao=None):
+        """
+        Grava a análise no histórico SQLite; uma falha aqui não invalida o relatorio.csv
+        baldes: (ip, balde) -> eventos pelo horário do tráfego; baldes_execucao: ip -> eventos
+        a registrar no balde do momento da execução (padrão: os próprios totais)
+        """
+        if self.historico is None:
+            return None
+        if baldes is None and baldes_execucao is not None:
+            balde = int(time.time() // LARGURA_BALDE_S)
+            baldes = {(ip, balde): total for ip, total in baldes_execucao.items()}
+        try:
+            with self.metricas.etapa('historico_sqlite'):
+                execucao = self.historico.salvar_execucao(
+                    comando, eventos_por_ip, portscan_detectado, erros, baldes, arquivo,
+                    self.janela_portscan, self.limite_portas)
+                removidas = 0
+                if self.manter_execucoes is not None:
+                    removidas = self.historico.remover_antigas(self.manter_execucoes)
+        except sqlite3.Error as e:
+            print(f"⚠️  Não foi possível gravar o histórico em {self.historico.caminho}: {e}")
+            return None
+        print(f"🗄️  Execução #{execucao} gravada no histórico ({self.historico.caminho})")
+        if removidas:
+            print(f"   {removidas} execução(ões) antiga(s) removida(s) do histórico "
+                  f"(mantidas as {self.manter_execucoes} mais recentes)")
+        return execucao
+    
+    def _reiniciar_estado_fluxo(self):
+        """Zera o estado incremental usado pela análise em fluxo contínuo"""
+        self.eventos_por_ip = defaultdict(int)
+        self.topk = SpaceSaving(self.topk_ips) if self.topk_ips else None
+        self.pipeline = self._nova_pipeline()
+        self.portscan_detectado = self.pipeline.portscan_detectado()
+        self.agregador = self._novo_agregador()
+        self._iniciar_filtro_redes()
+    
+    def _processar_evento_fluxo(self, dados):
+        """Atualiza contadores e detectores; retorna [(detector, chave)] dos limites cruzados agora"""
+        if self.filtro_redes is not None and self.filtro_redes.aplicar(dados) is None:
+            return ()
+        ip = dados['ip_origem']
+        if self.topk is not None:
+            self.topk.adicionar(ip)
+        else:
+            self.eventos_por_ip[ip] += 1
+        if self.agregador is not None:
+            self.agregador.adicionar(dados)
+        return self.pipeline.processar(dados)
+    
+    def _relatorio_fluxo(self):
+        """Reescreve o relatorio.csv; retorna (eventos_por_ip, erros) como no relatório"""
+        # Os baldes já fechados vão para o histórico junto com o relatório
+        if self.agregador is not None:
+            self.agregador.descarregar()
+        if self.topk is not None:
+            return self.gerar_relatorio_topk(self.topk, self.portscan_detectado)
+        self.gerar_relatorio(self.eventos_por_ip, self.portscan_detectado)
+        return self.eventos_por_ip, None
+    
+    def _limpar_estado_fluxo(self, agora):
+        """Mantém a memória limitada: descarta janelas expiradas e IPs pouco ativos"""
+        self.pipeline.expirar(agora)
+        
+        # No modo top-K a memória das contagens já é fixa
+        excedente = len(self.eventos_por_ip) - self.limite_ips_fluxo
+        if excedente > 0:
+            # Descarta os IPs com menos eventos que não estão com janela aberta nem marcados
+            vertical = self.pipeline.vertical
+            janelas = vertical.detector.janelas if vertical is not None else {}
+            candidatos = (item for item in self.eventos_por_ip.items()
+                          if item[0] not in janelas and item[0] not in self.portscan_detectado)
+            for ip, _ in heapq.nsmallest(excedente, candidatos, key=lambda x: x[1]):
+                del self.eventos_por_ip[ip]
+                self.ips_descartados_fluxo += 1
+    
+    def analisar_em_fluxo(self, duracao=None, formato='pcap'):
+        """
+        Analisa o tráfego enquanto ele é capturado (tcpdump -> stdout -> detector)
+        formato='pcap' lê o pcap bruto (-U -w -); formato='texto' lê a saída de 'tcpdump -l'
+        """
+        if not self.interface:
+            print("❌ Nenhuma interface selecionada. Use a opção 1 primeiro.")
+            return False
+        
+        if formato == 'pcap':
+            comando = ['sudo', 'tcpdump', '-i', self.interface, '-nn', '-U', '-w', '-']
+        else:
+            # -tt: timestamp absoluto, necessário para a janela de 60 segundos
+            comando = ['sudo', 'tcpdump', '-i', self.interface, '-nn', '-l', '-tt']
+        comando += [*self.perfil_captura.opcoes(), self.perfil_captura.expressao()]
+        
+        print(f"📡 Análise em fluxo na interface {self.interface} "
+              f"({'sem limite de tempo' if duracao is None else f'{duracao} segundos'})")
+        print(f"   Relatório atualizado a cada {self.intervalo_relatorio_fluxo}s em {self.arquivo_relatorio}")
+        print("   Pressione Ctrl+C para parar")
+        print("-" * 50)
+        
+        self._reiniciar_estado_fluxo()
+        self.ips_descartados_fluxo = 0
+        total_pacotes = 0
+        ultimo_timestamp = None
+        relogio = ingestao.RelogioIngestao('tt')
+        
+        def ao_lote(eventos, registros):
+            # Roda num trabalhador da captura, um lote por vez e na ordem do tcpdump
+            nonlocal total_pacotes, ultimo_timestamp
+            converter = relogio.converter
+            for dados in eventos:
+                timestamp = dados['timestamp'] = converter(dados['timestamp'])
+                total_pacotes += 1
+                for detector, chave in self._processar_evento_fluxo(dados):
+                    self._imprimir_alerta(detector, chave, timestamp)
+            if eventos:
+                ultimo_timestamp = eventos[-1]['timestamp']
+        
+        captura = fila_captura.CapturaDesacoplada(
+            comando, ao_lote, formato, self.capacidade_fila, self.politica_fila,
+            self.trabalhadores_captura, nome=self.interface)
+        captura.iniciar()
+        
+        # O prazo é cumprido pela thread principal, mesmo que a interface fique sem tráfego
+        fim = None if duracao is None else time.time() + duracao
+        proximo_relatorio = time.time() + self.intervalo_relatorio_fluxo
+        try:
+            while not captura.esperar(0.2):
+                agora = time.time()
+                if fim is not None and agora >= fim:
+                    # Continua até os trabalhadores analisarem o que o tcpdump já entregou
+                    captura.parar()
+                    fim = None
+                if agora >= proximo_relatorio:
+                    captura.solicitar_estatisticas()
+                    with captura.trava:
+                        if ultimo_timestamp is not None:
+                            self._limpar_estado_fluxo(ultimo_timestamp)
+                        self._relatorio_fluxo()
+                    self._salvar_captura('analisar_em_fluxo', captura.estatisticas_fila(),
+                                         captura.estatisticas())
+                    proximo_relatorio = agora + self.intervalo_relatorio_fluxo
+        
+        except KeyboardInterrupt:
+            print("\n⏹️  Análise interrompida pelo usuário")
+        finally:
+            captura.parar()
+            captura.esperar(2)
+            captura.aguardar()
+        
+        eventos_por_ip, erros = self._relatorio_fluxo()
+        self._fechar_agregador(self.agregador)
+        self.salvar_historico('analisar_em_fluxo', eventos_por_ip, self.portscan_detectado, erros,
+                              arquivo=self.interface)
+        
+        print(f"\n✅ Análise em fluxo finalizada. Pacotes analisados: {total_pacotes}")
+        self._relatar_captura('analisar_em_fluxo', captura.estatisticas_fila(), captura.estatisticas())
+        self._relatar_filtro_redes()
+        if self.topk is not None:
+            print(f"   • IPs no top-{self.topk_ips}: {len(self.topk)} "
+                  f"(erro máximo por contagem: {self.topk.erro_maximo()})")
+        else:
+            print(f"   • IPs únicos: {len(self.eventos_por_ip)}")
+        print(f"   • IPs com possível portscan: {len(self.portscan_detectado)}")
+        if self.ips_descartados_fluxo:
+            print(f"   • IPs pouco ativos descartados para limitar memória: {self.ips_descartados_fluxo}")
+        print(f"📊 Relatório gerado: {self.arquivo_relatorio}")
+        self._relatar_deteccoes(self.pipeline)
+        return True
+    
+    def _salvar_captura(self, analise, fila, interfaces):
+        """Grava profundidade e descartes da fila e os contadores do tcpdump em arquivo_captura"""
+        try:
+            fila_captura.salvar_estatisticas(self.arquivo_captura, {
+                'analise': analise,
+                'gerado_em': datetime.now().isoformat(timespec='seconds'),
+                'fila': fila,
+                'interfaces': interfaces,
+            })
+        except OSError as e:
+            print(f"⚠️  Não foi possível gravar {self.arquivo_captura}: {e}")
+    
+    def _relatar_captura(self, analise, fila, interfaces):
+        """Resumo da fila de captura no fim da análise ao vivo (também em arquivo_captura e nas métricas)"""
+        kernel = [e['descartados_kernel'] for e in interfaces if e['descartados_kernel'] is not None]
+        self.metricas.contar('descartados_fila', fila['descartados'])
+        self.metricas.contar('descartados_kernel', sum(kernel))
+        self.metricas.contar('profundidade_maxima_fila', fila['profundidade_maxima'])
+        print(f"📥 Fila de captura ({fila['politica']}): máximo {fila['profundidade_maxima']}/{fila['capacidade']} "
+              f"registros, {fila['descartados']} descartados pela fila, "
+              f"{sum(kernel) if kernel else '?'} pelo kernel"
+              + (f", leitor bloqueado {fila['bloqueios']}x" if fila['bloqueios'] else ""))
+        for e in interfaces:
+            if e['erro']:
+                print(f"   ⚠️  {e['interface'] or 'tcpdump'}: {e['erro']}")
+        self._salvar_captura(analise, fila, interfaces)
+        print(f"💾 Contadores da captura: {self.arquivo_captura}")
+    
+    def _imprimir_interfaces(self, estatisticas):
+        for e in estatisticas:
+            descartes = []
+            if e['descartados_kernel'] is not None:
+                descartes.append(f"kernel {e['descartados_kernel']}")
+            if e['descartados_interface']:
+                descartes.append(f"interface {e['descartados_interface']}")
+            if e['descartados_fila']:
+                descartes.append(f"fila {e['descartados_fila']}")
+            if e['fora_de_ordem']:
+                descartes.append(f"fora de ordem {e['fora_de_ordem']}")
+            print(f"   • {e['interface']:<12} {e['pacotes']:>9} pacotes  {e['pacotes_por_s']:>9,.0f} pps  "
+                  f"{e['bytes_por_s'] * 8 / 1e6:>8.2f} Mbit/s"
+                  + (f"  descartes: {', '.join(descartes)}" if descartes else ""))
+            if e['erro']:
+                print(f"     ⚠️  {e['erro']}")
+    
+    def analisar_multi_interface(self, interfaces=None, duracao=None):
+        """
+        Análise em fluxo capturando em várias interfaces ao mesmo tempo (ver captura_multi.py)
+        Os pacotes de todas as interfaces passam, em ordem de timestamp, pelo mesmo detector
+        """
+        interfaces = interfaces or self.interfaces or ([self.interface] if self.interface else [])
+        if not interfaces:
+            print("❌ Nenhuma interface selecionada. Use a opção 1 primeiro.")
+            return False
+        
+        print(f"📡 Análise em fluxo nas interfaces {', '.join(interfaces)} "
+              f"({'sem limite de tempo' if duracao is None else f'{duracao} segundos'})")
+        print(f"   Relatório atualizado a cada {self.intervalo_relatorio_fluxo}s em {self.arquivo_relatorio}")
+        print("   Pressione Ctrl+C para parar")
+        print("-" * 50)
+        
+        self._reiniciar_estado_fluxo()
+        self.ips_descartados_fluxo = 0
+        total_pacotes = 0
+        ultimo_timestamp = None
+        
+        captura = CapturaMultiInterface(interfaces, self.perfil_captura, capacidade=self.capacidade_fila,
+                                        politica=self.politica_fila,
+                                        decodificadores=self.trabalhadores_captura)
+        captura.iniciar()
+        fim = None if duracao is None else time.time() + duracao
+        proximo_relatorio = time.time() + self.intervalo_relatorio_fluxo
+        try:
+            for item in captura.eventos():
+                agora = time.time()
+                if fim is not None and agora >= fim:
+                    # Continua consumindo até todas as interfaces entregarem o que já capturaram
+                    captura.parar()
+                    fim = None
+                
+                if item is not None:
+                    interface, dados = item
+                    total_pacotes += 1
+                    ultimo_timestamp = dados['timestamp']
+                    for detector, chave in self._processar_evento_fluxo(dados):
+                        self._imprimir_alerta(detector, chave, dados['timestamp'], interface)
+                
+                if agora >= proximo_relatorio:
+                    if ultimo_timestamp is not None:
+                        self._limpar_estado_fluxo(ultimo_timestamp)
+                    self._relatorio_fluxo()
+                    captura.solicitar_estatisticas()
+                    print(f"📊 {total_pacotes} pacotes analisados, {len(self.portscan_detectado)} port scans")
+                    self._imprimir_interfaces(captura.estatisticas())
+                    self._salvar_captura('analisar_multi_interface', captura.estatisticas_fila(),
+                                         captura.estatisticas())
+                    proximo_relatorio = agora + self.intervalo_relatorio_fluxo
+        
+        except KeyboardInterrupt:
+            print("\n⏹️  Análise interrompida pelo usuário")
+        finally:
+            captura.parar()
+            captura.aguardar()
+        
+        eventos_por_ip, erros = self._relatorio_fluxo()
+        self._fechar_agregador(self.agregador)
+        self.salvar_historico('analisar_multi_interface', eventos_por_ip, self.portscan_detectado, erros,
+                              arquivo=','.join(interfaces))
+        
+        print(f"\n✅ Análise em {len(interfaces)} interfaces finalizada. Pacotes analisados: {total_pacotes}")
+        self._relatar_filtro_redes()
+        self._imprimir_interfaces(captura.estatisticas())
+        self._relatar_captura('analisar_multi_interface', captura.estatisticas_fila(), captura.estatisticas())
+        print(f"   • IPs com possível portscan: {len(self.portscan_detectado)}")
+        print(f"📊 Relatório gerado: {self.arquivo_relatorio}")
+        self._relatar_deteccoes(self.pipeline)
+        return True
+    
+    def captura_rotativa(self, duracao=None):
+        """
+        Captura contínua em anel (tcpdump -C/-W) com análise de cada segmento fechado em segundo plano
+        O relatório cobre os segmentos ainda presentes no anel e é reescrito a cada segmento analisado
+        """
+        if not self.interface:
+            print("❌ Nenhuma interface selecionada. Use a opção 1 primeiro.")
+            return False
+        
+        def ao_analisar(resultado):
+            print(f"📦 Segmento {resultado.caminho}: {resultado.pacotes} pacotes, "
+                  f"{len(resultado.eventos_por_ip)} IPs")
+            for ip, momento in resultado.portscan_detectado.items():
+                print(f"🚨 [{self.formatar_momento(momento)}] Possível port scan de {ip}: "
+                      f"mais de {self.limite_portas} portas em {self.janela_portscan:.0f}s")
+            self.gerar_relatorio(*captura.relatorio())
+        
+        self._avisar_so_portscan('captura rotativa')
+        agregador = self._novo_agregador()
+        captura = CapturaRotativa(self.interface, self.prefixo_rotacao, self.tamanho_segmento_mb,
+                                  self.segmentos_rotacao, self._janela_us(), self.limite_portas,
+                                  ao_analisar, self.perfil_captura, self._novo_detector(), self.filtro_redes,
+                                  agregador)
+        
+        print(f"🔁 Captura rotativa na interface {self.interface}: {self.segmentos_rotacao} segmentos "
+              f"de {self.tamanho_segmento_mb} MB ({self.prefixo_rotacao}N)")
+        print(f"   Relatório contínuo em {self.arquivo_relatorio}")
+        print("   Pressione Ctrl+C para parar")
+        print("-" * 50)
+        
+        captura.iniciar()
+        fim = None if duracao is None else time.time() + duracao
+        try:
+            while captura.ativa() and (fim is None or time.time() < fim):
+                time.sleep(1)
+                captura.verificar()
+        except KeyboardInterrupt:
+            print("\n⏹️  Captura interrompida pelo usuário")
+        finally:
+            captura.parar()
+        self._fechar_agregador(agregador)
+        
+        eventos_por_ip, portscan_detectado = captura.relatorio()
+        self.gerar_relatorio(eventos_por_ip, portscan_detectado)
+        self.salvar_historico('captura_rotativa', eventos_por_ip, portscan_detectado, arquivo=self.interface)
+        
+        print(f"\n✅ Captura rotativa finalizada. Segmentos no relatório: {len(captura.resultados)}")
+        print(f"   • IPs únicos: {len(eventos_por_ip)}")
+        print(f"   • IPs com possível portscan: {len(portscan_detectado)}")
+        print(f"📊 Relatório gerado: {self.arquivo_relatorio}")
+        return True
+    
+    def _linha_estatistica(self, ip, eventos, erro, portscan, momento):
+        if erro:
+            eventos = f"{eventos} (±{erro})"
+        if portscan:
+            status = f"🚨 SIM (desde {momento})" if momento else "🚨 SIM"
+        else:
+            status = "✅ Não"
+        print(f"IP: {ip:<15} | Eventos: {eventos!s:<6} | PortScan: {status}")
+    
+    def mostrar_estatisticas(self, quantidade=50):
+        """
+        Mostra estatísticas do último relatório (os 'quantidade' IPs com mais eventos)
+        Lê a última execução do histórico SQLite; o relatorio.csv só é lido se for mais novo
+        (ex: gerado pela versão simple) e, mesmo assim, linha a linha
+        """
+        ultima = None
+        if self.historico is not None and os.path.exists(self.historico.caminho):
+            try:
+                ultima = self.historico.ultima_execucao()
+            except sqlite3.Error as e:
+                print(f"⚠️  Histórico indisponível ({e}), usando {self.arquivo_relatorio}")
+        csv_mais_novo = (os.path.exists(self.arquivo_relatorio) and
+                         (ultima is None or os.path.getmtime(self.arquivo_relatorio) > ultima[1] + 1))
+        
+        if ultima is None and not csv_mais_novo:
             print("❌ Relatório não encontrado!")
-            print("   Execute primeiro a análise (opção 4)")
+            print("   Execute primeiro a análise (opção 3)")
             return
         
-        with open(self.arquivo_relatorio, 'r') as f:
-            reader = csv.reader(f)
-            linhas = list(reader)
-        
         print("\n" + "="*50)
         print("📊 ESTATÍSTICAS DO TRÁFEGO")
         print("="*50)
         
-        for linha in linhas[1:]:  # Pula cabeçalho
-            ip, eventos, portscan = linha
-            status = "🚨 SIM" if portscan == "Sim" else "✅ Não"
-            print(f"IP: {ip:<15} | Eventos: {eventos:<6} | PortScan: {status}")
+        if csv_mais_novo:
+            total_ips, portscans, aproximado = self._estatisticas_csv(quantidade)
+        else:
+            execucao, inicio, comando, arquivo, total_ips, portscans = ultima
+            print(f"Execução #{execucao} ({comando}, {datetime.fromtimestamp(inicio):%Y-%m-%d %H:%M:%S}"
+                  f"{', ' + arquivo if arquivo else ''})")
+            aproximado = False
+            for ip, eventos, erro, portscan, momento in self.historico.ips_da_execucao(execucao, quantidade):
+                aproximado = aproximado or bool(erro)
+                self._linha_estatistica(ip, eventos, erro, portscan, self.formatar_momento(momento))
         
-        total_ips = len(linhas) - 1
-        portscans = sum(1 for linha in linhas[1:] if linha[2] == 'Sim')
+        if total_ips > quantidade:
+            print(f"... e mais {total_ips - quantidade} IPs (consulta completa: --consultar)")
         
         print(f"\n📈 Resumo:")
-        print(f"   • Total de IPs únicos: {total_ips}")
+        if aproximado:
+            print(f"   • Top-K aproximado: {total_ips} IPs (contagem real entre Total - Erro_Max e Total)")
+        else:
+            print(f"   • Total de IPs únicos: {total_ips}")
         print(f"   • IPs com PortScan detectado: {portscans}")
+        self._tendencia_recente()
         print("="*50)
     
+    def _tendencia_recente(self, minutos=10):
+        """Pacotes e IPs ativos por minuto no fim do histórico, direto dos agregados de tempo"""
+        if self.historico is None or not os.path.exists(self.historico.caminho):
+            return
+        try:
+            linhas = self.historico.tendencia(agregados_tempo.RESOLUCOES['1m'], minutos)
+        except sqlite3.Error:
+            return
+        if not linhas:
+            return
+        print(f"\n📉 Tendência por minuto (agregados do histórico, últimos {minutos} min):")
+        self._imprimir_tendencia(linhas)
+    
+    def _imprimir_tendencia(self, linhas):
+        maximo = max(pacotes for _, pacotes, _ in linhas) or 1
+        for inicio, pacotes, ips in linhas:
+            barra = '█' * max(1, round(30 * pacotes / maximo))
+            print(f"   {datetime.fromtimestamp(inicio):%Y-%m-%d %H:%M:%S}  {pacotes:>10} pacotes "
+                  f"{ips:>7} IPs  {barra}")
+    
+    def _estatisticas_csv(self, quantidade):
+        """Mostra as primeiras linhas do relatorio.csv e conta o resto sem guardá-lo na memória"""
+        total_ips = portscans = 0
+        with compressao.abrir(self.arquivo_relatorio, 'r') as f:
+            reader = csv.reader(f, delimiter=';')
+            cabecalho = next(reader, [])
+            # Relatório do modo top-K: contagens aproximadas com a coluna Erro_Max
+            coluna_erro = cabecalho.index('Erro_Max') if 'Erro_Max' in cabecalho else None
+            for linha in reader:
+                if len(linha) < 3:
+                    continue
+                total_ips += 1
+                portscan = linha[2] == 'Sim'
+                portscans += portscan
+                if total_ips <= quantidade:
+                    erro = linha[coluna_erro] if coluna_erro is not None and linha[coluna_erro] != '0' else None
+                    momento = linha[3] if len(linha) > 3 else ''
+                    self._linha_estatistica(linha[0], linha[1], erro, portscan, momento)
+        return total_ips, portscans, coluna_erro is not None
+    
+    def consultar_historico(self, consulta, horas=1.0, execucoes=30, quantidade=20, ip=None,
+                            resolucao='1m', criterio='pacotes'):
+        """
+        Consultas ao histórico SQLite:
+          top       -> IPs com mais eventos nas últimas 'horas' (baldes do horário do tráfego)
+          scanners  -> IPs com port scan nas últimas 'execucoes' execuções
+          execucoes -> execuções mais recentes
+          ip        -> histórico de um IP
+        Respondidas pelos agregados de tempo, na 'resolucao' (1s, 1m ou 1h), até o último balde gravado:
+          serie     -> pacotes, portas e destinos distintos de um IP nos últimos 'quantidade' baldes
+          tendencia -> pacotes e IPs ativos nos últimos 'quantidade' baldes
+          agregados -> IPs das últimas 'horas' ordenados por 'criterio' (pacotes, portas ou destinos)
+        """
+        if self.historico is None or not os.path.exists(self.historico.caminho):
+            print("❌ Histórico não encontrado! Execute uma análise primeiro")
+            return False
+        
+        inicio = time.perf_counter()
+        if consulta == 'top':
+            linhas = self.historico.top_ips(time.time() - horas * 3600, quantidade=quantidade)
+            print(f"🏆 Top {quantidade} IPs nas últimas {horas:g}h:")
+            for posicao, (ip_linha, total, vezes, portscan) in enumerate(linhas, 1):
+                marca = " 🚨" if portscan else ""
+                print(f"   {posicao:>3}. {ip_linha:<15} {total:>10} eventos em {vezes} execução(ões){marca}")
+        elif consulta == 'scanners':
+            linhas = self.historico.scanners(execucoes)
+            print(f"🚨 IPs com port scan nas últimas {execucoes} execuções:")
+            for ip_linha, vezes, primeiro, ultimo, total in linhas:
+                print(f"   {ip_linha:<15} {vezes:>3} execução(ões), {total} eventos "
+                      f"(de {self.formatar_momento(primeiro)} a {self.formatar_momento(ultimo)})")
+        elif consulta == 'execucoes':
+            linhas = self.historico.execucoes(quantidade)
+            print(f"🗄️  Últimas {quantidade} execuções:")
+            for execucao, momento, comando, arquivo, total_ips, portscans in linhas:
+                print(f"   #{execucao:<5} {datetime.fromtimestamp(momento):%Y-%m-%d %H:%M:%S}  "
+                      f"{comando:<28} {total_ips:>7} IPs {portscans:>4} port scans  {arquivo or ''}")
+        elif consulta == 'ip':
+            if not ip:
+                print("❌ Informe o IP (--ip)")
+                return False
+            linhas = self.historico.historico_ip(ip, quantidade)
+            print(f"🔎 Histórico de {ip}:")
+            for execucao, momento, eventos, portscan, detectado in linhas:
+                status = f"🚨 port scan em {self.formatar_momento(detectado)}" if portscan else "✅"
+                print(f"   #{execucao:<5} {datetime.fromtimestamp(momento):%Y-%m-%d %H:%M:%S}  "
+                      f"{eventos:>10} eventos  {status}")
+        elif consulta in ('serie', 'tendencia', 'agregados'):
+            largura = agregados_tempo.RESOLUCOES[resolucao]
+            if consulta == 'serie':
+                if not ip:
+                    print("❌ Informe o IP (--ip)")
+                    return False
+                linhas = self.historico.serie_ip(ip, largura, quantidade)
+                print(f"📈 {ip} por balde de {resolucao} (últimos {quantidade} baldes dos agregados):")
+                for inicio_balde, pacotes, portas, destinos in linhas:
+                    print(f"   {datetime.fromtimestamp(inicio_balde):%Y-%m-%d %H:%M:%S}  {pacotes:>10} pacotes "
+                          f"{portas:>6} portas {destinos:>6} destinos")
+            elif consulta == 'tendencia':
+                linhas = self.historico.tendencia(largura, quantidade)
+                print(f"📉 Tendência por balde de {resolucao} (últimos {quantidade} baldes dos agregados):")
+                if linhas:
+                    self._imprimir_tendencia(linhas)
+            else:
+                linhas = self.historico.top_agregados(largura, horas * 3600, criterio, quantidade)
+                print(f"🏆 Top {quantidade} IPs por {criterio} nas últimas {horas:g}h dos agregados ({resolucao}):")
+                for posicao, (ip_linha, pacotes, portas, destinos) in enumerate(linhas, 1):
+                    print(f"   {posicao:>3}. {ip_linha:<15} {pacotes:>10} pacotes {portas:>6} portas "
+                          f"{destinos:>6} destinos")
+        else:
+            print(f"❌ Consulta desconhecida: {consulta}")
+            return False
+        
+        if not linhas:
+            print("   (nenhum resultado)")
+        print(f"⏱️  {len(linhas)} linha(s) em {(time.perf_counter() - inicio) * 1000:.1f} ms")
+        return True
+    
     def realizar_analise_completa(self):
         """Realiza análise completa: captura por 60s e mostra estatísticas"""
+        self.metricas.iniciar('analise_completa')
+        try:
+            return self._realizar_analise_completa()
+        finally:
+            self.metricas.finalizar()
+    
+    def _realizar_analise_completa(self):
         if not self.interface:
             print("❌ Nenhuma interface selecionada. Use a opção 1 primeiro.")
             return False
@@ -419,14 +1363,18 @@ class AnalisadorTrafego:
         self.mostrar_estatisticas()
         
         print(f"\n✅ Análise completa concluída!")
-        print(f"💾 Dados salvos em: {self.arquivo_trafego}")
+        print(f"💾 Dados salvos em: {self.arquivo_pcap}")
         print(f"📊 Relatório gerado: {self.arquivo_relatorio}")
         #print(f"📈 Use a opção 5 para exportar o relatório completo")
         
         return True
     
     def monitorar_tempo_real(self, duracao=30):
-        """Monitora tráfego em tempo real (visualização básica)"""
+        """
+        Monitora tráfego em tempo real (ver monitor_tempo_real.py)
+        Sem limite de pacotes; o prazo é cumprido mesmo sem tráfego e a tela de resumo é
+        redesenhada a cada segundo em vez de um print por pacote
+        """
         if not self.interface:
             print("❌ Nenhuma interface selecionada. Use a opção 1 primeiro.")
             return
@@ -435,41 +1383,36 @@ class AnalisadorTrafego:
         print("   Pressione Ctrl+C para parar antecipadamente")
         print("-" * 50)
         
+        comando = [
+            'sudo', 'tcpdump',
+            '-i', self.interface,
+            '-nn',
+            '-l',       # Saída por linha, sem esperar o buffer encher
+            '-tt',      # Timestamp absoluto (epoch)
+            *self.perfil_captura.opcoes(),
+            self.perfil_captura.expressao()
+        ]
+        
+        agregador = self._novo_agregador()
+        self._iniciar_filtro_redes()
+        monitor = MonitorTempoReal(self._nova_pipeline(), self.topk_ips or 1000, agregador=agregador,
+                                   filtro=self.filtro_redes, capacidade_fila=self.capacidade_fila,
+                                   politica_fila=self.politica_fila, trabalhadores=self.trabalhadores_captura)
         try:
-            comando = [
-                'sudo', 'tcpdump',
-                '-i', self.interface,
-                '-nn',
-                '-ttt',
-                'ip',
-                '-c', '50'  # Limite para demonstração
-            ]
-            
-            processo = subprocess.Popen(comando, stdout=subprocess.PIPE, text=True)
-            
-            inicio = time.time()
-            contador = 0
-            
-            for linha in processo.stdout:
-                contador += 1
-                dados = self.parse_linha(linha)
-                if dados:
-                    print(f"{contador:3d}. [{dados['timestamp']:8.6f}] {dados['ip_origem']:15} → Porta {dados['porta_destino']}")
-                else:
-                    # Mostra linha não parseada para debug
-                    if len(linha.strip()) > 0 and 'IP' in linha:
-                        print(f"{contador:3d}. [Não parseado] {linha.strip()[:80]}...")
-                
-                if time.time() - inicio > duracao:
-                    processo.terminate()
-                    break
-                    
-            print(f"\n✅ Monitoramento finalizado. Total de pacotes: {contador}")
-                    
+            monitor.executar(comando, duracao, self.interface)
         except KeyboardInterrupt:
             print("\n⏹️  Monitoramento interrompido pelo usuário")
         except Exception as e:
             print(f"❌ Erro no monitoramento: {e}")
+            return
+        
+        monitor.desenhar(final=True)
+        self._fechar_agregador(agregador)
+        print(f"\n✅ Monitoramento finalizado. Total de pacotes: {monitor.pacotes}")
+        if monitor.captura is not None:
+            self._relatar_captura('monitorar_tempo_real', monitor.captura.estatisticas_fila(),
+                                  monitor.captura.estatisticas())
+        self._relatar_deteccoes(monitor.pipeline)
     
     def exportar_relatorio(self):
         """Exporta/mostra o relatório completo"""
@@ -481,7 +1424,7 @@ class AnalisadorTrafego:
         print("\n📋 CONTEÚDO DO RELATÓRIO: {self.arquivo_relatorio}")
         print("="*50)
         
-        with open(self.arquivo_relatorio, 'r') as f:
+        with compressao.abrir(self.arquivo_relatorio, 'r') as f:
             conteudo = f.read()
             print(conteudo)
         
@@ -493,12 +1436,188 @@ class AnalisadorTrafego:
         if salvar_como == 's':
             novo_nome = input("Novo nome do arquivo (ex: relatorio_scan.csv): ").strip()
             if novo_nome:
-                import shutil
                 shutil.copy2(self.arquivo_relatorio, novo_nome)
                 print(f"✅ Relatório salvo como: {novo_nome}")
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisador de tráfego de rede (sem argumentos: menu interativo)")
+    parser.add_argument('--incremental', nargs='?', const='', metavar='ARQUIVO',
+                        help="processa só o que foi acrescentado ao arquivo desde a última execução (ex: cron)")
+    parser.add_argument('--relatorio', default=None, metavar='ARQUIVO',
+                        help="arquivo do relatório (padrão: relatorio.csv; .gz, .xz ou .zst grava comprimido)")
+    parser.add_argument('--exportar-texto', nargs='?', const='', metavar='ARQUIVO',
+                        help="após a captura, exporta o pcap também como texto do tcpdump "
+                             "(padrão: trafego.txt; .gz, .xz ou .zst grava comprimido)")
+    parser.add_argument('--checkpoint', default=None,
+                        help="arquivo de checkpoint da análise incremental (padrão: analise.checkpoint)")
+    parser.add_argument('--analisar', nargs='?', const='', metavar='ARQUIVO',
+                        help="analisa um arquivo (pcap ou texto) e sai, sem o menu")
+    parser.add_argument('--consultar', default=None,
+                        choices=['top', 'scanners', 'execucoes', 'ip', 'serie', 'tendencia', 'agregados'],
+                        help="consulta o histórico SQLite e sai: top (IPs com mais eventos nas últimas "
+                             "--horas), scanners (nas últimas --execucoes), execucoes, ip (--ip); pelos "
+                             "agregados de tempo: serie (--ip), tendencia, agregados (top por --ordenar)")
+    parser.add_argument('--resolucao', choices=list(agregados_tempo.RESOLUCOES), default='1m',
+                        help="baldes das consultas serie, tendencia e agregados (padrão: 1m)")
+    parser.add_argument('--ordenar', choices=list(historico_relatorios.CRITERIOS_AGREGADOS), default='pacotes',
+                        help="critério da consulta agregados (padrão: pacotes)")
+    parser.add_argument('--horas', type=float, default=1.0, help="período da consulta top (padrão: 1)")
+    parser.add_argument('--execucoes', type=int, default=30, help="execuções da consulta scanners (padrão: 30)")
+    parser.add_argument('--quantidade', type=int, default=20, help="linhas das consultas (padrão: 20)")
+    parser.add_argument('--ip', default=None, help="IP da consulta ip")
+    parser.add_argument('--historico', default=None, metavar='ARQUIVO',
+                        help="banco SQLite do histórico (padrão: historico.db)")
+    parser.add_argument('--sem-historico', action='store_true', help="não grava as análises no histórico")
+    parser.add_argument('--manter-execucoes', type=int, default=None, metavar='N',
+                        help="execuções mantidas no histórico; as mais antigas são apagadas a cada gravação "
+                             "(padrão: 1000, 0 = todas)")
+    parser.add_argument('--sem-agregados', action='store_true',
+                        help="não calcula os agregados de tempo (1s/1m/1h por IP) do histórico")
+    parser.add_argument('--interfaces', default=None, metavar='IF1,IF2',
+                        help="análise em fluxo simultânea nessas interfaces, com um só detector, e sai")
+    parser.add_argument('--duracao', type=float, default=None,
+                        help="segundos da análise com --interfaces (padrão: até Ctrl+C)")
+    parser.add_argument('--perfil', choices=sorted(perfil_captura.PERFIS), default='completo',
+                        help="perfil de captura: completo, cabecalhos (snaplen pequeno) ou "
+                             "portscan (cabeçalhos de SYN sem ACK + UDP)")
+    parser.add_argument('--bpf', default=None, metavar='FILTROS',
+                        help=f"componentes do filtro combinados com 'or' ({','.join(perfil_captura.FILTROS_BPF)})")
+    parser.add_argument('--snaplen', type=int, default=None, help="bytes gravados por pacote (0 = inteiro)")
+    parser.add_argument('--filtro-extra', default=None, metavar='EXPR',
+                        help="expressão BPF adicional, combinada com 'and' (ex: 'not port 22')")
+    parser.add_argument('--topk', type=int, default=None, metavar='K',
+                        help="contagem por IP aproximada em memória fixa: só os K maiores (Space-Saving)")
+    parser.add_argument('--aproximado', action='store_true',
+                        help="detecção de port scan aproximada (HyperLogLog), memória fixa por IP")
+    parser.add_argument('--fluxos', action='store_true',
+                        help="agrega os pacotes em fluxos (5-tupla, estilo NetFlow) antes da detecção e do relatório")
+    parser.add_argument('--timeout-inativo', type=float, default=None, metavar='S',
+                        help="com --fluxos, segundos sem pacotes para encerrar um fluxo (padrão: 15)")
+    parser.add_argument('--timeout-ativo', type=float, default=None, metavar='S',
+                        help="com --fluxos, duração máxima de um registro de fluxo (padrão: 1800)")
+    parser.add_argument('--max-fluxos', type=int, default=None, metavar='N',
+                        help="com --fluxos, fluxos abertos em memória; acima disso sai o menos usado (padrão: 65536)")
+    parser.add_argument('--deteccao', default=None, metavar='ARQUIVO',
+                        help="configuração JSON dos detectores (padrão: deteccao.json, se existir)")
+    parser.add_argument('--detectores', default=None, metavar='D1,D2',
+                        help=f"detectores ligados, sobrepondo a configuração ({','.join(pipeline_deteccao.DETECTORES)})")
+    parser.add_argument('--alertas', default=None, metavar='ARQUIVO',
+                        help="alertas dos detectores além do port scan (padrão: alertas.csv)")
+    parser.add_argument('--permitidos', default=None, metavar='ARQUIVO',
+                        help="arquivo de CIDRs (um por linha) cujo tráfego de origem é descartado antes da detecção")
+    parser.add_argument('--blocos', default=None, metavar='ARQUIVO',
+                        help="arquivo 'CIDR rótulo' (ex: blocos por ASN): origens de um bloco contam como uma só")
+    parser.add_argument('--agrupar', type=int, default=None, metavar='N',
+                        help="conta e detecta por sub-rede /N da origem (ex: 24) em vez de por IP")
+    parser.add_argument('--fila-politica', choices=fila_captura.POLITICAS, default='bloquear',
+                        help="captura ao vivo com a fila cheia: bloquear o leitor (o kernel descarta) "
+                             "ou descartar os lotes mais antigos (padrão: bloquear)")
+    parser.add_argument('--fila-capacidade', type=int, default=None, metavar='N',
+                        help=f"registros na fila da captura ao vivo (padrão: {fila_captura.CAPACIDADE_PADRAO})")
+    parser.add_argument('--trabalhadores', type=int, default=None, metavar='N',
+                        help="threads de parse/análise da captura ao vivo (padrão: 1)")
+    parser.add_argument('--captura-json', default=None, metavar='ARQUIVO',
+                        help="contadores de fila e descartes da captura ao vivo (padrão: captura.json)")
+    parser.add_argument('--profile', action='store_true',
+                        help="mede tempo, contadores e memória de cada etapa da análise")
+    parser.add_argument('--metricas', default='metricas.json',
+                        help="arquivo JSON das métricas do --profile (padrão: metricas.json)")
+    parser.add_argument('--cprofile', default=None, metavar='ARQUIVO',
+                        help="com --profile, grava também um dump do cProfile (pstats)")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="com --profile, mede o pico e o top de alocações com tracemalloc")
+    args = parser.parse_args(argv)
+    
     analisador = AnalisadorTrafego()
+    if args.relatorio:
+        analisador.arquivo_relatorio = args.relatorio
+    if args.exportar_texto is not None:
+        analisador.exportar_texto = True
+        if args.exportar_texto:
+            analisador.arquivo_trafego = args.exportar_texto
+    if args.checkpoint:
+        analisador.arquivo_checkpoint = args.checkpoint
+    if args.sem_historico:
+        analisador.historico = None
+    elif args.historico:
+        analisador.historico = HistoricoRelatorios(args.historico)
+    analisador.agregados_tempo = not args.sem_agregados
+    if args.manter_execucoes is not None:
+        if args.manter_execucoes < 0:
+            parser.error("--manter-execucoes não pode ser negativo")
+        analisador.manter_execucoes = args.manter_execucoes or None
+    try:
+        analisador.perfil_captura = perfil_captura.montar_perfil(
+            args.perfil, args.bpf.split(',') if args.bpf else None, args.snaplen, args.filtro_extra)
+    except ValueError as e:
+        parser.error(str(e))
+    arquivo_deteccao = args.deteccao or ('deteccao.json' if os.path.exists('deteccao.json') else None)
+    try:
+        analisador.configurar_deteccao(pipeline_deteccao.carregar_configuracao(
+            arquivo_deteccao, args.detectores.split(',') if args.detectores else None))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.alertas:
+        analisador.arquivo_alertas = args.alertas
+    try:
+        analisador.filtro_redes = redes_cidr.montar_filtro(args.permitidos, args.blocos, args.agrupar)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.topk:
+        analisador.topk_ips = args.topk
+    analisador.deteccao_aproximada = args.aproximado
+    analisador.agregar_fluxos = args.fluxos
+    if args.timeout_inativo:
+        analisador.timeout_inativo_fluxo = args.timeout_inativo
+    if args.timeout_ativo:
+        analisador.timeout_ativo_fluxo = args.timeout_ativo
+    if args.max_fluxos is not None:
+        if args.max_fluxos < 1:
+            parser.error("--max-fluxos deve ser pelo menos 1")
+        analisador.capacidade_fluxos = args.max_fluxos
+    analisador.politica_fila = args.fila_politica
+    if args.fila_capacidade is not None:
+        if args.fila_capacidade < 1:
+            parser.error("--fila-capacidade deve ser pelo menos 1")
+        analisador.capacidade_fila = args.fila_capacidade
+    if args.trabalhadores is not None:
+        if args.trabalhadores < 1:
+            parser.error("--trabalhadores deve ser pelo menos 1")
+        analisador.trabalhadores_captura = args.trabalhadores
+    if args.captura_json:
+        analisador.arquivo_captura = args.captura_json
+    if args.profile:
+        analisador.metricas = Metricas(True, args.metricas, args.cprofile, args.tracemalloc)
+    
+    if args.consultar is not None:
+        if analisador.historico is None:
+            parser.error("--consultar precisa do histórico (remova --sem-historico)")
+        return 0 if analisador.consultar_historico(args.consultar, args.horas, args.execucoes,
+                                                   args.quantidade, args.ip, args.resolucao,
+                                                   args.ordenar) else 1
+    
+    if args.interfaces:
+        analisador.interfaces = [nome for nome in args.interfaces.split(',') if nome]
+        return 0 if analisador.analisar_multi_interface(duracao=args.duracao) else 1
+    
+    if args.incremental is not None:
+        return 0 if analisador.analisar_trafego_incremental(args.incremental or None) else 1
+    
+    if args.analisar is not None:
+        return 0 if analisador.analisar_trafego(args.analisar or None) else 1
+    
+    # Sem terminal (cron, pipeline) o menu ficaria bloqueado no input()
+    if not sys.stdin.isatty():
+        parser.print_usage(sys.stderr)
+        print("❌ Menu interativo precisa de um terminal; use --analisar, --incremental, --consultar, "
+              "--interfaces ou analise_lote.py", file=sys.stderr)
+        return 2
+    
+    # Verifica se está rodando como root
+    if os.geteuid() != 0:
+        print("⚠️  AVISO: Algumas funcionalidades requerem privilégios de root")
+        print("   Execute com 'sudo python3 analise_trafego.py' para melhor experiência")
+        print()
     
     while True:
         print("\n" + "="*60)
@@ -508,12 +1627,22 @@ def main():
         print("2 - Monitorar tráfego em tempo real (30s)")
         print("3 - Realizar análise de tráfego (60s captura + análise)")
         print("4 - Mostrar estatísticas do último relatório")
-        # print("5 - Exportar relatório completo")
+        print("5 - Análise em fluxo contínuo (alerta imediato de port scan)")
+        print("6 - Analisar arquivo grande em paralelo (multi-core)")
+        print("7 - Captura contínua rotativa (ring buffer + relatório contínuo)")
+        print("8 - Consultar histórico de análises (SQLite)")
+        print("9 - Análise em fluxo em várias interfaces ao mesmo tempo")
+        # print("10 - Exportar relatório completo")
         print("0 - Sair")
         print("-"*60)
         
-        if analisador.interface:
+        if len(analisador.interfaces) > 1:
+            print(f"🎯 Interfaces atuais: {', '.join(analisador.interfaces)}")
+        elif analisador.interface:
             print(f"🎯 Interface atual: {analisador.interface}")
+        print(f"📦 Perfil de captura: {analisador.perfil_captura.descricao()}")
+        if analisador.filtro_redes is not None:
+            print(f"🛡️  Redes: {analisador.filtro_redes.descricao()}")
         
         opcao = input("Escolha uma opção: ").strip()
         
@@ -524,10 +1653,12 @@ def main():
                 selecionar = input("\nDeseja selecionar uma interface? (s/N): ").strip().lower()
                 if selecionar == 's':
                     try:
-                        num = int(input("Número da interface: "))
-                        if 1 <= num <= len(interfaces):
-                            analisador.interface = interfaces[num-1]['nome']
-                            print(f"✅ Interface selecionada: {analisador.interface}")
+                        # Vários números (ex: 2,3) selecionam as interfaces da opção 9
+                        numeros = [int(n) for n in input("Número(s) da interface (ex: 2 ou 2,3): ").split(',')]
+                        if all(1 <= num <= len(interfaces) for num in numeros):
+                            analisador.interfaces = [interfaces[num-1]['nome'] for num in numeros]
+                            analisador.interface = analisador.interfaces[0]
+                            print(f"✅ Interface(s) selecionada(s): {', '.join(analisador.interfaces)}")
                         else:
                             print("❌ Número inválido!")
                     except ValueError:
@@ -542,7 +1673,31 @@ def main():
         elif opcao == '4':
             analisador.mostrar_estatisticas()
         
-        #elif opcao == '5':
+        elif opcao == '5':
+            analisador.analisar_em_fluxo()
+        
+        elif opcao == '6':
+            arquivo = input("Arquivo (Enter para captura.pcap/trafego.txt): ").strip()
+            analisador.analisar_trafego_paralelo(arquivo or None)
+        
+        elif opcao == '7':
+            analisador.captura_rotativa()
+        
+        elif opcao == '8':
+            print("Consultas: top (IPs da última hora), scanners (últimas 30 execuções), execucoes, ip, "
+                  "serie (um IP por minuto), tendencia (por minuto), agregados")
+            consulta = input("Consulta [top]: ").strip() or 'top'
+            ip = input("IP: ").strip() if consulta in ('ip', 'serie') else None
+            analisador.consultar_historico(consulta, ip=ip)
+        
+        elif opcao == '9':
+            if len(analisador.interfaces) < 2:
+                nomes = input("Interfaces separadas por vírgula (ex: eth0,eth1): ").strip()
+                if nomes:
+                    analisador.interfaces = [nome.strip() for nome in nomes.split(',') if nome.strip()]
+            analisador.analisar_multi_interface()
+        
+        #elif opcao == '10':
         #    analisador.exportar_relatorio()
         
         elif opcao == '0':
@@ -551,13 +1706,8 @@ def main():
         
         else:
             print("❌ Opção inválida!")
+    
+    return 0
 
 if __name__ == "__main__":
-    # Verifica se está rodando como root
-    import os
-    if os.geteuid() != 0:
-        print("⚠️  AVISO: Algumas funcionalidades requerem privilégios de root")
-        print("   Execute com 'sudo python3 analise_trafego.py' para melhor experiência")
-        print()
-    
-    main()
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Armazém colunar de eventos de tráfego
+Cada evento ocupa 18 bytes: timestamp int64 (µs), IP de origem e destino uint32 e porta uint16.
+Contagens por IP, top talkers e janelas de portas distintas são calculadas com NumPy
+(sort/unique/searchsorted); sem NumPy, a análise cai para o DetectorJanela em Python puro.
+"""
+
+import socket
+from array import array
+from collections import Counter
+
+from detector_portscan import DetectorJanela
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+
+def ip_para_int(ip):
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+
+def int_para_ip(valor):
+    return socket.inet_ntoa(int(valor).to_bytes(4, 'big'))
+
+
+class ResultadoAnalise:
+    """Resultado da análise do armazém, com os IPs já em notação decimal com pontos"""
+
+    def __init__(self, eventos_por_ip, portscan_detectado, max_portas_janela):
+        self.eventos_por_ip = eventos_por_ip          # ip -> total de eventos
+        self.portscan_detectado = portscan_detectado  # ip -> timestamp (µs) do cruzamento do limite
+        self.max_portas_janela = max_portas_janela    # ip -> máximo de portas distintas numa janela
+
+    def top_talkers(self, quantidade=5):
+        return sorted(self.eventos_por_ip.items(), key=lambda x: x[1], reverse=True)[:quantidade]
+
+
+class ArmazemEventos:
+    """Colunas em array.array; os eventos devem ser adicionados em ordem de timestamp"""
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.ips_origem = array('I')
+        self.ips_destino = array('I')
+        self.portas = array('H')
+        self._cache_ips = {}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _ip(self, ip):
+        valor = self._cache_ips.get(ip)
+        if valor is None:
+            valor = self._cache_ips[ip] = ip_para_int(ip)
+        return valor
+
+    def adicionar(self, timestamp, ip_origem, ip_destino, porta_destino):
+        """Adiciona um evento com IPs já convertidos para inteiro"""
+        self.timestamps.append(timestamp)
+        self.ips_origem.append(ip_origem)
+        self.ips_destino.append(ip_destino)
+        self.portas.append(porta_destino)
+
+    def adicionar_evento(self, dados):
+        """Adiciona um evento no formato de parse_linha/ingestao"""
+        self.timestamps.append(dados['timestamp'])
+        self.ips_origem.append(self._ip(dados['ip_origem']))
+        self.ips_destino.append(self._ip(dados['ip_destino']))
+        self.portas.append(dados['porta_destino'])
+
+    def bytes_por_evento(self):
+        return (self.timestamps.itemsize + self.ips_origem.itemsize
+                + self.ips_destino.itemsize + self.portas.itemsize)
+
+    def bytes_usados(self):
+        return len(self) * self.bytes_por_evento()
+
+    def contagens_por_balde(self, largura_us):
+        """(ip, balde) -> eventos, com balde = timestamp // largura_us"""
+        if not len(self):
+            return {}
+        if np is not None:
+            ts = np.frombuffer(self.timestamps, dtype=np.int64)
+            origem = np.frombuffer(self.ips_origem, dtype=np.uint32).astype(np.uint64)
+            baldes = ts // largura_us
+            base = int(baldes.min())
+            # IP nos 32 bits de cima, balde (relativo ao primeiro) nos de baixo; uint64 para
+            # IPs a partir de 128.0.0.0 não estourarem o sinal
+            chaves, totais = np.unique((origem << np.uint64(32)) | (baldes - base).astype(np.uint64),
+                                       return_counts=True)
+            return {(int_para_ip(chave >> 32), int(chave & 0xFFFFFFFF) + base): int(total)
+                    for chave, total in zip(chaves.tolist(), totais.tolist())}
+        contagens = Counter(zip(self.ips_origem, (t // largura_us for t in self.timestamps)))
+        return {(int_para_ip(ip), balde): total for (ip, balde), total in contagens.items()}
+
+    def analisar(self, janela_us, limite):
+        """Calcula contagens por IP e port scans (vetorizado se o NumPy estiver disponível)"""
+        if not len(self):
+            return ResultadoAnalise({}, {}, {})
+        if np is not None:
+            return self._analisar_numpy(janela_us, limite)
+        return self._analisar_python(janela_us, limite)
+
+    def _analisar_python(self, janela_us, limite):
+        eventos_por_ip = Counter(self.ips_origem)
+        detector = DetectorJanela(janela_us, limite)
+        for timestamp, ip, porta in zip(self.timestamps, self.ips_origem, self.portas):
+            detector.registrar(ip, timestamp, porta)
+
+        # Sem NumPy o máximo da janela só é conhecido para os IPs que cruzaram o limite
+        return ResultadoAnalise(
+            {int_para_ip(ip): total for ip, total in eventos_por_ip.items()},
+            {int_para_ip(ip): momento for ip, momento in detector.detectados.items()},
+            {}
+        )
+
+    def _analisar_numpy(self, janela_us, limite):
+        ts = np.frombuffer(self.timestamps, dtype=np.int64)
+        origem = np.frombuffer(self.ips_origem, dtype=np.uint32)
+        porta = np.frombuffer(self.portas, dtype=np.uint16)
+
+        ips, totais = np.unique(origem, return_counts=True)
+
+        # Ordena por (IP, porta, tempo): cada par (IP, porta) vira um bloco contíguo
+        ordem = np.lexsort((ts, porta, origem))
+        o, p, t = origem[ordem], porta[ordem], ts[ordem]
+
+        # A porta fica "presente" na janela do IP durante [t, t + janela] após cada acesso.
+        # Acessos a menos de uma janela do anterior se fundem num único segmento de presença.
+        inicio_segmento = np.ones(len(t), dtype=bool)
+        inicio_segmento[1:] = ((o[1:] != o[:-1]) | (p[1:] != p[:-1])
+                               | (t[1:] - t[:-1] > janela_us))
+        inicios = np.flatnonzero(inicio_segmento)
+        fins = np.append(inicios[1:] - 1, len(t) - 1)
+
+        # Varredura: +1 no início de cada segmento, -1 no fim (o fim é inclusivo, então
+        # em empate de tempo o +1 vem antes do -1)
+        n = len(inicios)
+        ev_ip = np.concatenate((o[inicios], o[fins]))
+        ev_tempo = np.concatenate((t[inicios], t[fins] + janela_us))
+        ev_tipo = np.concatenate((np.zeros(n, dtype=np.int8), np.ones(n, dtype=np.int8)))
+        ev_delta = np.concatenate((np.ones(n, dtype=np.int64), -np.ones(n, dtype=np.int64)))
+
+        ordem = np.lexsort((ev_tipo, ev_tempo, ev_ip))
+        ev_ip, ev_tempo = ev_ip[ordem], ev_tempo[ordem]
+        # Os deltas de cada IP somam zero, então a soma acumulada recomeça em 0 a cada IP
+        portas_distintas = np.cumsum(ev_delta[ordem])
+
+        # Máximo de portas distintas simultâneas na janela, por IP
+        blocos = np.searchsorted(ev_ip, ips)
+        maximos = np.maximum.reduceat(portas_distintas, blocos)
+
+        # Primeiro instante em que cada IP passou do limite
+        cruzou = np.flatnonzero(portas_distintas > limite)
+        ips_cruzaram, primeiro = np.unique(ev_ip[cruzou], return_index=True)
+        momentos = ev_tempo[cruzou[primeiro]]
+
+        return ResultadoAnalise(
+            {int_para_ip(ip): int(total) for ip, total in zip(ips, totais)},
+            {int_para_ip(ip): int(momento) for ip, momento in zip(ips_cruzaram, momentos)},
+            {int_para_ip(ip): int(maximo) for ip, maximo in zip(ips, maximos)}
+        )
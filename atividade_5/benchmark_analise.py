@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escala dos analisadores
+Gera tráfego sintético (gerador_trafego.py) em vários tamanhos e mede, para cada analisador
+ou estágio, a vazão (pacotes/s), o pico de memória (RSS) e a precisão da detecção contra o
+gabarito dos scans injetados. Cada medição roda num processo separado, para que o pico de RSS
+de uma não contamine a outra. Os resultados vão para um JSON que pode ser comparado com o de
+outra versão (--comparar).
+
+Uso: python3 benchmark_analise.py --tamanhos 1000,100000,1000000 --saida benchmark.json
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib.util
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import gerador_trafego
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+JANELA_SEGUNDOS = 60
+LIMITE_PORTAS = 10
+
+
+def _parse_linha(caminho):
+    """Estágio: só o parser de linhas do tcpdump"""
+    import parser_tcpdump
+    parse = parser_tcpdump.parse_linha
+    with open(caminho, 'r') as f:
+        return sum(1 for linha in f if parse(linha)), None
+
+
+def _ingestao(caminho):
+    """Estágio: leitura + parse + base de tempo (texto ou pcap)"""
+    import ingestao
+    return sum(1 for dados in ingestao.eventos_de_arquivo(caminho) if dados), None
+
+
+def _armazem(caminho, sem_numpy=False):
+    """Estágio: ingestão + armazém colunar + análise (núcleo do analisar_trafego)"""
+    import armazem_colunar
+    import ingestao
+    if sem_numpy:
+        armazem_colunar.np = None
+    armazem = armazem_colunar.ArmazemEventos()
+    for dados in ingestao.eventos_de_arquivo(caminho):
+        if dados:
+            armazem.adicionar_evento(dados)
+    resultado = armazem.analisar(JANELA_SEGUNDOS * ingestao.MICROS, LIMITE_PORTAS)
+    return len(armazem), set(resultado.portscan_detectado)
+
+
+def _fluxos(caminho):
+    """Estágio: ingestão + tabela de fluxos + detector por fluxo (analisar_trafego --fluxos)"""
+    import ingestao
+    import tabela_fluxos
+    import pipeline_deteccao
+    from detector_portscan import DetectorJanela
+    pipeline = pipeline_deteccao.montar_pipeline(
+        pipeline_deteccao.configuracao_padrao(), DetectorJanela(JANELA_SEGUNDOS * ingestao.MICROS, LIMITE_PORTAS))
+    analise = tabela_fluxos.AnaliseFluxos(pipeline)
+    analise.processar(ingestao.eventos_de_arquivo(caminho))
+    return analise.eventos, set(pipeline.portscan_detectado())
+
+
+def _pipeline(caminho):
+    """Estágio: ingestão + pipeline com os quatro detectores ligados (uma passada para todos)"""
+    import ingestao
+    import pipeline_deteccao
+    configuracao = pipeline_deteccao.carregar_configuracao(ativos=pipeline_deteccao.DETECTORES)
+    configuracao['portscan_vertical'].update(janela=JANELA_SEGUNDOS, limite=LIMITE_PORTAS)
+    pipeline = pipeline_deteccao.montar_pipeline(configuracao)
+    processar = pipeline.processar
+    pacotes = 0
+    for dados in ingestao.eventos_de_arquivo(caminho):
+        if dados:
+            pacotes += 1
+            processar(dados)
+    return pacotes, set(pipeline.portscan_detectado())
+
+
+def _agregados(caminho):
+    """Estágio: ingestão + agregados de tempo 1s/1m/1h (sem gravar no SQLite)"""
+    import agregados_tempo
+    import ingestao
+    agregador = agregados_tempo.AgregadorTempo(lambda linhas: None)
+    adicionar = agregador.adicionar
+    pacotes = 0
+    for dados in ingestao.eventos_de_arquivo(caminho):
+        if dados:
+            pacotes += 1
+            adicionar(dados)
+    agregador.fechar()
+    return pacotes, None
+
+
+def _filtro_redes(caminho):
+    """Estágio: ingestão + lista de redes (1000 prefixos permitidos de /8 a /28) e agrupamento por /24"""
+    import random
+    import ingestao
+    import redes_cidr
+    aleatorio = random.Random(1)
+    permitidos = redes_cidr.TabelaPrefixos()
+    for _ in range(1000):
+        comprimento = aleatorio.choice((8, 16, 20, 24, 28))
+        permitidos.adicionar(f"{aleatorio.randrange(11, 224)}.{aleatorio.randrange(256)}."
+                             f"{aleatorio.randrange(256)}.0/{comprimento}")
+    filtro = redes_cidr.FiltroRedes(permitidos, prefixo=24)
+    pacotes = sum(1 for dados in filtro.filtrar(ingestao.eventos_de_arquivo(caminho)) if dados)
+    return pacotes, None
+
+
+def _analisar_trafego(caminho):
+    """analise_trafego.AnalisadorTrafego.analisar_trafego completo, incluindo o CSV e o histórico"""
+    import analise_trafego
+    analisador = analise_trafego.AnalisadorTrafego()
+    with tempfile.TemporaryDirectory() as diretorio:
+        analisador.arquivo_relatorio = os.path.join(diretorio, 'relatorio.csv')
+        analisador.historico = analise_trafego.HistoricoRelatorios(os.path.join(diretorio, 'historico.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            analisador.analisar_trafego(caminho)
+        with open(analisador.arquivo_relatorio, newline='') as f:
+            linhas = list(csv.DictReader(f, delimiter=';'))
+    return (sum(int(linha['Total_Eventos']) for linha in linhas),
+            {linha['IP'] for linha in linhas if linha['Detectado_PortScan'] == 'Sim'})
+
+
+def _paralelo(caminho):
+    """analise_paralela.analisar com todos os núcleos"""
+    import analise_paralela
+    import ingestao
+    eventos_por_ip, portscan_detectado, _, parseados = analise_paralela.analisar(
+        caminho, JANELA_SEGUNDOS * ingestao.MICROS, LIMITE_PORTAS)
+    return parseados, set(portscan_detectado)
+
+
+def _simple(caminho):
+    """simple/analise_trafego.py: parse_traffic_file + analyze_traffic"""
+    spec = importlib.util.spec_from_file_location(
+        'simple_analise_trafego', os.path.join(DIRETORIO, 'simple', 'analise_trafego.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    with contextlib.redirect_stdout(io.StringIO()):
+        dados = modulo.parse_traffic_file(caminho)
+        _, portscan_detectado = modulo.analyze_traffic(dados)
+    return len(dados), set(portscan_detectado)
+
+
+# nome -> (função, formatos aceitos)
+ANALISADORES = {
+    'parse_linha': (_parse_linha, ('texto',)),
+    'ingestao': (_ingestao, ('texto', 'pcap')),
+    'armazem_numpy': (_armazem, ('texto', 'pcap')),
+    'armazem_python': (lambda caminho: _armazem(caminho, sem_numpy=True), ('texto', 'pcap')),
+    'fluxos': (_fluxos, ('texto', 'pcap')),
+    'pipeline': (_pipeline, ('texto', 'pcap')),
+    'agregados': (_agregados, ('texto', 'pcap')),
+    'filtro_redes': (_filtro_redes, ('texto', 'pcap')),
+    'analisar_trafego': (_analisar_trafego, ('texto', 'pcap')),
+    'paralelo': (_paralelo, ('texto', 'pcap')),
+    'simple': (_simple, ('texto',)),
+}
+
+
+def _pico_rss_kb():
+    """Maior RSS do processo e dos filhos (ru_maxrss está em KB no Linux)"""
+    proprio = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(proprio, filhos)
+
+
+def medir(nome, caminho):
+    """Executa um analisador neste processo e retorna a medição"""
+    funcao, _ = ANALISADORES[nome]
+    # Importações (NumPy inclusive) ficam fora do tempo medido
+    import analise_paralela, analise_trafego, armazem_colunar, ingestao  # noqa: F401
+    import parser_tcpdump, pipeline_deteccao, tabela_fluxos  # noqa: F401
+    rss_base = _pico_rss_kb()
+    inicio = time.perf_counter()
+    pacotes, detectados = funcao(caminho)
+    segundos = time.perf_counter() - inicio
+    return {
+        'segundos': segundos,
+        'pacotes': pacotes,
+        'pacotes_por_s': pacotes / segundos if segundos else None,
+        'pico_rss_kb': _pico_rss_kb(),
+        'rss_base_kb': rss_base,
+        'detectados': sorted(detectados) if detectados is not None else None,
+    }
+
+
+def medir_em_subprocesso(nome, caminho):
+    resultado = subprocess.run([sys.executable, os.path.abspath(__file__), '--medir', nome, caminho],
+                               cwd=DIRETORIO, capture_output=True, text=True)
+    if resultado.returncode != 0:
+        return {'erro': resultado.stderr.strip().splitlines()[-1:] or ['falhou']}
+    return json.loads(resultado.stdout)
+
+
+def precisao(detectados, scanners):
+    """Verdadeiros/falsos positivos e falsos negativos contra o gabarito"""
+    detectados = set(detectados)
+    scanners = set(scanners)
+    vp = len(detectados & scanners)
+    fp = len(detectados - scanners)
+    fn = len(scanners - detectados)
+    return {
+        'vp': vp, 'fp': fp, 'fn': fn,
+        'precisao': vp / (vp + fp) if vp + fp else 1.0,
+        'revocacao': vp / (vp + fn) if vp + fn else 1.0,
+    }
+
+
+def _versao():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=DIRETORIO,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comparar(resultados, arquivo_base):
+    """Mostra a variação de vazão e memória em relação a um JSON anterior"""
+    with open(arquivo_base) as f:
+        base = {(r['formato'], r['tamanho'], r['analisador']): r for r in json.load(f)['resultados']}
+
+    print(f"\n=== Comparação com {arquivo_base} ===")
+    for r in resultados:
+        anterior = base.get((r['formato'], r['tamanho'], r['analisador']))
+        if not anterior or 'erro' in r or 'erro' in anterior:
+            continue
+        vazao = r['pacotes_por_s'] / anterior['pacotes_por_s']
+        memoria = r['pico_rss_kb'] / anterior['pico_rss_kb']
+        alerta = "  ⚠️" if vazao < 0.9 or memoria > 1.1 else ""
+        print(f"{r['formato']:<6} {r['tamanho']:>10} {r['analisador']:<17} "
+              f"vazão {vazao:5.2f}x  memória {memoria:5.2f}x{alerta}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de vazão, memória e precisão dos analisadores")
+    parser.add_argument('--tamanhos', default='1000,100000,1000000',
+                        help="quantidades de pacotes separadas por vírgula (ex: 1000,1000000,50000000)")
+    parser.add_argument('--formatos', default='texto,pcap')
+    parser.add_argument('--analisadores', default=','.join(ANALISADORES))
+    parser.add_argument('--ips', type=int, default=1000)
+    parser.add_argument('--portas', choices=gerador_trafego.DISTRIBUICOES, default='comuns')
+    parser.add_argument('--scans', type=int, default=10)
+    parser.add_argument('--pacotes-por-fluxo', type=int, default=1,
+                        help="pacotes por 5-tupla no tráfego normal (ex: 1000 = enlace de transferências)")
+    parser.add_argument('--diretorio', default=None, help="onde gerar os arquivos (padrão: temporário)")
+    parser.add_argument('--saida', default='benchmark.json')
+    parser.add_argument('--comparar', default=None, metavar='JSON', help="resultado anterior para comparação")
+    parser.add_argument('--medir', nargs=2, metavar=('ANALISADOR', 'ARQUIVO'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.medir:
+        print(json.dumps(medir(*args.medir)))
+        return 0
+
+    tamanhos = [int(t) for t in args.tamanhos.split(',')]
+    formatos = args.formatos.split(',')
+    analisadores = args.analisadores.split(',')
+    for nome in analisadores:
+        if nome not in ANALISADORES:
+            print(f"❌ Analisador desconhecido: {nome} (use {', '.join(ANALISADORES)})")
+            return 1
+
+    diretorio_temporario = None
+    if args.diretorio is None:
+        diretorio_temporario = tempfile.TemporaryDirectory()
+        args.diretorio = diretorio_temporario.name
+
+    resultados = []
+    print(f"{'formato':<6} {'pacotes':>10} {'analisador':<17} {'pacotes/s':>12} {'RSS (MB)':>9} "
+          f"{'VP':>4} {'FP':>4} {'FN':>4}")
+    for tamanho in tamanhos:
+        config = gerador_trafego.ConfiguracaoGerador(
+            pacotes=tamanho, ips=args.ips, portas=args.portas,
+            scans=min(args.scans, tamanho // 200), pacotes_por_fluxo=args.pacotes_por_fluxo)
+        for formato in formatos:
+            extensao = 'pcap' if formato == 'pcap' else 'txt'
+            caminho = os.path.join(args.diretorio, f"sintetico_{tamanho}.{extensao}")
+            verdade = gerador_trafego.gerar_arquivo(caminho, config, formato)
+
+            for nome in analisadores:
+                if formato not in ANALISADORES[nome][1]:
+                    continue
+                medicao = medir_em_subprocesso(nome, caminho)
+                resultado = {'formato': formato, 'tamanho': tamanho, 'analisador': nome}
+                resultado.update(medicao)
+                if medicao.get('detectados') is not None:
+                    resultado.update(precisao(medicao['detectados'], verdade['scanners']))
+                resultado.pop('detectados', None)
+                resultados.append(resultado)
+
+                if 'erro' in resultado:
+                    print(f"{formato:<6} {tamanho:>10} {nome:<17} ❌ {resultado['erro']}")
+                    continue
+                acertos = (f"{resultado['vp']:>4} {resultado['fp']:>4} {resultado['fn']:>4}"
+                           if 'vp' in resultado else f"{'-':>4} {'-':>4} {'-':>4}")
+                print(f"{formato:<6} {tamanho:>10} {nome:<17} {resultado['pacotes_por_s']:>12,.0f} "
+                      f"{resultado['pico_rss_kb'] / 1024:>9.1f} {acertos}")
+
+    if diretorio_temporario:
+        diretorio_temporario.cleanup()
+
+    relatorio = {
+        'versao': _versao(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'parametros': {'ips': args.ips, 'portas': args.portas, 'scans': args.scans,
+                       'pacotes_por_fluxo': args.pacotes_por_fluxo,
+                       'janela': JANELA_SEGUNDOS, 'limite': LIMITE_PORTAS},
+        'resultados': resultados,
+    }
+    with open(args.saida, 'w') as f:
+        json.dump(relatorio, f, indent=2)
+    print(f"\n✅ Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        comparar(resultados, args.comparar)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark da leitura comprimida
+Gera o mesmo tráfego sintético em texto (-tt) e pcap, comprime em gzip, xz e zstd (se disponível)
+e mede a taxa de eventos/s do ingestao.eventos_de_arquivo em cada um, contra o arquivo sem
+compressão, além do tamanho e do tempo para comprimir.
+
+Uso: python3 benchmark_compressao.py [pacotes]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import compressao
+import gerador_trafego
+import ingestao
+
+FORMATOS = [('gzip', '.gz'), ('xz', '.xz'), ('zstd', '.zst')]
+
+
+def comprimir(origem, destino):
+    """Comprime 'origem' no formato da extensão de 'destino'; retorna os segundos gastos"""
+    inicio = time.perf_counter()
+    with open(origem, 'rb') as entrada, compressao.abrir(destino, 'wb') as saida:
+        shutil.copyfileobj(entrada, saida, compressao.TAMANHO_BUFFER)
+    return time.perf_counter() - inicio
+
+
+def medir(caminho, repeticoes=3):
+    """Retorna a melhor taxa (eventos/s) e quantos eventos foram lidos"""
+    melhor = float('inf')
+    eventos = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        eventos = sum(1 for dados in ingestao.eventos_de_arquivo(caminho) if dados)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return eventos / melhor, eventos
+
+
+def main():
+    pacotes = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    config = gerador_trafego.ConfiguracaoGerador(pacotes=pacotes, scans=10)
+    formatos = [(nome, extensao) for nome, extensao in FORMATOS
+                if nome != 'zstd' or compressao.zstd_disponivel()]
+
+    print(f"=== Benchmark de leitura comprimida ({pacotes} pacotes) ===")
+    if not compressao.zstd_disponivel():
+        print("(zstd indisponível: instale o pacote zstandard ou use Python 3.14+)")
+    print(f"{'Arquivo':<14} {'Tamanho':>10} {'Razão':>7} {'Comprimir':>10} {'Eventos/s':>12} {'vs. sem':>8}")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        for formato in ('texto', 'pcap'):
+            original = os.path.join(diretorio, 'trafego.txt' if formato == 'texto' else 'trafego.pcap')
+            gerador_trafego.gerar_arquivo(original, config, formato, 'tt')
+            tamanho = os.path.getsize(original)
+            taxa_base, eventos_base = medir(original)
+            print(f"{os.path.basename(original):<14} {tamanho / 1e6:>8.1f}MB {'1.0x':>7} {'-':>10} "
+                  f"{taxa_base:>12,.0f} {'1.00x':>8}")
+
+            for nome, extensao in formatos:
+                comprimido = original + extensao
+                segundos = comprimir(original, comprimido)
+                taxa, eventos = medir(comprimido)
+                if eventos != eventos_base:
+                    print(f"❌ {comprimido}: {eventos} eventos, esperado {eventos_base}")
+                    return 1
+                tamanho_comprimido = os.path.getsize(comprimido)
+                print(f"{os.path.basename(comprimido):<14} {tamanho_comprimido / 1e6:>8.1f}MB "
+                      f"{tamanho / tamanho_comprimido:>6.1f}x {segundos:>9.2f}s {taxa:>12,.0f} "
+                      f"{taxa / taxa_base:>7.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Precisão e memória do detector aproximado (HyperLogLog) em relação ao exato
+Gera IPs com quantidades de portas distintas em torno do limite e compara as decisões do
+DetectorHLL com as do DetectorJanela: falso positivo = só o aproximado detectou,
+falso negativo = só o exato detectou.
+
+Uso: python3 benchmark_deteccao.py [IPS_POR_FAIXA] [PRECISAO]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from detector_hll import PRECISAO_PADRAO, DetectorHLL
+from detector_portscan import DetectorJanela
+from ingestao import MICROS
+
+JANELA_US = 60 * MICROS
+LIMITE = 10
+
+
+def gerar_ip(aleatorio, portas_distintas, eventos):
+    """Eventos (timestamp, porta) de um IP: 'portas_distintas' portas dentro de uma janela"""
+    portas = aleatorio.sample(range(1, 65536), portas_distintas)
+    inicio = aleatorio.randrange(0, 3600 * MICROS)
+    duracao = aleatorio.randrange(1, JANELA_US)
+    tempos = sorted(inicio + aleatorio.randrange(duracao) for _ in range(eventos))
+    # Toda porta aparece pelo menos uma vez; o resto são repetições
+    sequencia = portas + [aleatorio.choice(portas) for _ in range(eventos - portas_distintas)]
+    aleatorio.shuffle(sequencia)
+    return list(zip(tempos, sequencia))
+
+
+def comparar(ips_por_faixa, precisao, semente=7):
+    aleatorio = random.Random(semente)
+    exato = DetectorJanela(JANELA_US, LIMITE)
+    aproximado = DetectorHLL(JANELA_US, LIMITE, precisao)
+    faixas = {}
+    for portas in range(1, 3 * LIMITE + 1):
+        fp = fn = 0
+        for n in range(ips_por_faixa):
+            ip = f"{portas}.{n}"
+            eventos = gerar_ip(aleatorio, portas, portas * aleatorio.randint(1, 5))
+            for timestamp, porta in eventos:
+                exato.registrar(ip, timestamp, porta)
+                aproximado.registrar(ip, timestamp, porta)
+            detectado_exato = ip in exato.detectados
+            detectado_aproximado = ip in aproximado.detectados
+            fp += detectado_aproximado and not detectado_exato
+            fn += detectado_exato and not detectado_aproximado
+            exato.janelas.pop(ip, None)
+            aproximado.janelas.pop(ip, None)
+        faixas[portas] = (fp, fn)
+    return faixas
+
+
+def _carregar(detector, ips, eventos_por_ip):
+    """'ips' IPs ativos, cada um com 'eventos_por_ip' eventos espalhados pela janela"""
+    aleatorio = random.Random(1)
+    for i in range(eventos_por_ip):
+        timestamp = i * (JANELA_US // eventos_por_ip)
+        for ip in range(ips):
+            detector.registrar(ip, timestamp, aleatorio.randrange(1, 65536))
+
+
+def memoria(fabrica, ips, eventos_por_ip):
+    """Bytes por IP (tracemalloc) e eventos/s (medido à parte, sem o custo do tracemalloc)"""
+    # Limite inalcançável: todos os IPs ficam na memória
+    tracemalloc.start()
+    detector = fabrica()
+    _carregar(detector, ips, eventos_por_ip)
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del detector
+
+    detector = fabrica()
+    inicio = time.perf_counter()
+    _carregar(detector, ips, eventos_por_ip)
+    duracao = time.perf_counter() - inicio
+    return atual / ips, ips * eventos_por_ip / duracao
+
+
+def main():
+    ips_por_faixa = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    precisao = int(sys.argv[2]) if len(sys.argv) > 2 else PRECISAO_PADRAO
+    print(f"=== Detector aproximado (HLL, {1 << precisao} registradores) x exato: "
+          f"limite {LIMITE} portas / 60s, {ips_por_faixa} IPs por faixa ===")
+    print(f"{'portas':>6} {'FP':>8} {'FN':>8}")
+    faixas = comparar(ips_por_faixa, precisao)
+    negativos = positivos = total_fp = total_fn = 0
+    for portas, (fp, fn) in faixas.items():
+        if portas <= LIMITE:
+            negativos += ips_por_faixa
+            total_fp += fp
+        else:
+            positivos += ips_por_faixa
+            total_fn += fn
+        print(f"{portas:>6} {fp / ips_por_faixa:>8.2%} {fn / ips_por_faixa:>8.2%}")
+    print(f"Taxa de falso positivo (1..{LIMITE} portas): {total_fp / negativos:.2%}")
+    print(f"Taxa de falso negativo ({LIMITE + 1}..{3 * LIMITE} portas): {total_fn / positivos:.2%}")
+
+    print("\n=== Memória por IP ativo (1000 IPs) ===")
+    for eventos in (10, 100, 1000):
+        exato, taxa_exato = memoria(lambda: DetectorJanela(JANELA_US, 10 ** 9), 1000, eventos)
+        aproximado, taxa_aproximado = memoria(lambda: DetectorHLL(JANELA_US, 10 ** 9, precisao),
+                                              1000, eventos)
+        print(f"{eventos:>5} eventos/janela: exato {exato:>9,.0f} B ({taxa_exato:>9,.0f} ev/s)   "
+              f"aproximado {aproximado:>6,.0f} B ({taxa_aproximado:>9,.0f} ev/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do parse_linha
+Compara a cascata antiga de 7 regex com o parser_tcpdump em um mix realista de linhas
+"""
+
+import random
+import re
+import sys
+import time
+
+import parser_tcpdump
+
+# Amostras no formato do tcpdump -nn -ttt, com peso aproximado de ocorrência
+AMOSTRAS = [
+    (40, " 00:00:00.000261 IP 185.199.110.133.443 > 10.0.2.15.60584: Flags [.], ack 1, win 65535, length 0"),
+    (15, " 00:00:00.000515 IP 10.0.2.15.56834 > 140.82.113.25.443: Flags [P.], seq 1:30, ack 26, win 65535, length 29"),
+    (10, " 00:00:00.000000 IP 10.0.2.15.40878 > 8.8.8.8.53: 51742+ [1au] AAAA? connectivity-check.ubuntu.com. (58)"),
+    (8, " 00:00:00.001234 IP 10.0.0.5.44322 > 192.168.1.1.80: Flags [S], seq 123456789, win 64240, length 0"),
+    (5, " 00:00:00.004321 IP 192.168.1.20.5353 > 224.0.0.251.5353: 0 PTR (QM)? _services._dns-sd._udp.local. (45)"),
+    (5, " 00:00:00.000812 IP 10.0.2.15 > 8.8.8.8: ICMP echo request, id 4, seq 1, length 64"),
+    (6, " 00:00:00.000044 ARP, Request who-has 10.0.2.2 tell 10.0.2.15, length 28"),
+    (6, " 00:00:00.000107 IP6 fe80::1.546 > ff02::1:2.547: dhcp6 solicit"),
+    (2, " 00:00:00.000010 IP 10.0.2.15.39112 > 93.184.216.34.http: Flags [S], seq 1, win 64240, length 0"),
+    (3, "tcpdump: verbose output suppressed, use -v[v]... for full protocol decode"),
+]
+
+
+def parse_linha_legado(linha):
+    """Cópia da implementação anterior (7 regex tentadas em sequência)"""
+    padrao1 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+[\d\.]+\.(\d+):'
+    padrao2 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+[\d\.]+\.(\d+)\s+tcp'
+    padrao3 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+[\d\.]+\.(\w+):'
+    padrao4 = r'^\s*(\d+:\d+:\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\d+):'
+    padrao5 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\d+):'
+    padrao6 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\d+)\s+tcp'
+    padrao7 = r'^\s*(\d+\.\d+)\s+IP\s+([\d\.]+)\.(\d+)\s+>\s+([\d\.]+)\.(\w+):'
+
+    for padrao in [padrao1, padrao2, padrao3, padrao4, padrao5, padrao6, padrao7]:
+        match = re.match(padrao, linha)
+        if match:
+            timestamp_str = match.group(1)
+            ip_origem = match.group(2)
+            porta_origem = match.group(3)
+            ip_destino = match.group(4)
+            porta_destino = match.group(5)
+
+            if not porta_destino.isdigit():
+                porta_destino = str(parser_tcpdump.SERVICOS.get(porta_destino.lower(), 0))
+
+            try:
+                h, m, s = timestamp_str.split(':')
+                segundos, microsegundos = s.split('.')
+                timestamp_total = int(h)*3600 + int(m)*60 + int(segundos) + float("0." + microsegundos)
+            except:
+                timestamp_total = 0.0
+
+            return {
+                'timestamp': timestamp_total,
+                'ip_origem': ip_origem,
+                'porta_origem': int(porta_origem) if porta_origem.isdigit() else 0,
+                'ip_destino': ip_destino,
+                'porta_destino': int(porta_destino) if porta_destino.isdigit() else 0
+            }
+
+    return None
+
+
+def gerar_linhas(quantidade, semente=42):
+    """Gera o mix de linhas respeitando os pesos das amostras"""
+    aleatorio = random.Random(semente)
+    pesos = [peso for peso, _ in AMOSTRAS]
+    linhas = [linha for _, linha in AMOSTRAS]
+    return aleatorio.choices(linhas, weights=pesos, k=quantidade)
+
+
+def medir(funcao, linhas, repeticoes=3):
+    """Retorna a melhor taxa (linhas/s) e quantas linhas foram parseadas"""
+    melhor = float('inf')
+    parseadas = 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        parseadas = sum(1 for linha in linhas if funcao(linha))
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return len(linhas) / melhor, parseadas
+
+
+def main():
+    quantidade = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    linhas = gerar_linhas(quantidade)
+
+    print(f"=== Benchmark parse_linha ({quantidade} linhas) ===")
+    taxa_antes, ok_antes = medir(parse_linha_legado, linhas)
+    taxa_depois, ok_depois = medir(parser_tcpdump.parse_linha, linhas)
+
+    print(f"Antes  (7 regex):       {taxa_antes:>12,.0f} linhas/s  ({ok_antes} parseadas)")
+    print(f"Depois (parser_tcpdump): {taxa_depois:>11,.0f} linhas/s  ({ok_depois} parseadas)")
+    print(f"Ganho: {taxa_depois / taxa_antes:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
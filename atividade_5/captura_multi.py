@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Captura simultânea em várias interfaces com um único fluxo de análise
+Cada interface tem a sua thread que só lê o 'tcpdump -U -w -' e põe lotes de registros crus numa
+fila limitada (fila_captura.AnelLimitado: cheia, bloqueia as leitoras ou descarta os mais antigos).
+Os decodificadores transformam os lotes em eventos fora da thread de leitura e os eventos de todas
+as interfaces são intercalados em ordem de timestamp antes de chegar ao detector, então um scan
+espalhado por vários links soma as portas num só IP. Cada interface tem contadores próprios de
+pacotes, bytes e descartes (do kernel, informados pelo tcpdump no stderr, e os da fila).
+"""
+
+import heapq
+import subprocess
+import threading
+import time
+
+import fila_captura
+import ingestao
+import leitor_pcap
+
+# Quanto um pacote pode esperar por pacotes mais antigos de outras interfaces (o -U do tcpdump
+# entrega cada pacote logo após a captura, então o atraso entre interfaces é pequeno)
+ATRASO_INTERCALACAO_US = 500_000
+
+# Quantos lotes um decodificador pode estar à frente do consumidor (limita a memória decodificada)
+ADIANTAMENTO_MAXIMO = 64
+
+
+class CapturaInterface(threading.Thread):
+    """Um tcpdump numa interface; os lotes crus vão para a fila compartilhada como (índice, bloco)"""
+
+    def __init__(self, indice, interface, comando, fila):
+        super().__init__(name=f"captura-{interface}", daemon=True)
+        self.indice = indice
+        self.interface = interface
+        self.comando = comando
+        self.fila = fila
+        self.processo = None
+        self.registros = 0  # lidos do tcpdump
+        self.pacotes = 0    # decodificados (IPv4 TCP/UDP)
+        self.bytes = 0
+        self.fora_de_ordem = 0  # chegaram depois de pacotes mais novos de outras interfaces
+        self.descartados_fila = 0
+        self.terminou = False
+        self.capturados = None
+        self.recebidos_filtro = None
+        self.descartados_kernel = None
+        self.descartados_interface = None
+        self.erro = None
+        self.inicio = None
+        self.fim = None
+        self._leitor_stderr = None
+
+    def run(self):
+        self.inicio = time.time()
+        try:
+            self.processo = subprocess.Popen(self.comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            self._leitor_stderr = threading.Thread(target=fila_captura.acompanhar_stderr,
+                                                   args=(self.processo, self), daemon=True)
+            self._leitor_stderr.start()
+            lotes = leitor_pcap.ler_lotes_stream(self.processo.stdout, fila_captura.TAMANHO_BLOCO)
+            for quantidade, bloco in lotes:
+                self.registros += quantidade
+                self.fila.colocar((self.indice, bloco), quantidade)
+        except Exception as e:
+            self.erro = str(e)
+        finally:
+            if self.processo is not None:
+                self.processo.wait()
+                self._leitor_stderr.join(timeout=2)
+            self.fim = time.time()
+            # Depois do último colocar(): a fila vazia já não tem lotes desta interface
+            self.terminou = True
+
+    def solicitar_estatisticas(self):
+        fila_captura.solicitar_estatisticas(self.processo)
+
+    def parar(self):
+        if self.processo is not None and self.processo.poll() is None:
+            try:
+                self.processo.terminate()
+            except ProcessLookupError:
+                pass
+
+    def estatisticas(self):
+        duracao = max(1e-9, (self.fim or time.time()) - (self.inicio or time.time()))
+        return {
+            'interface': self.interface,
+            'registros': self.registros,
+            'pacotes': self.pacotes,
+            'bytes': self.bytes,
+            'pacotes_por_s': self.pacotes / duracao,
+            'bytes_por_s': self.bytes / duracao,
+            'capturados': self.capturados,
+            'recebidos_filtro': self.recebidos_filtro,
+            'descartados_kernel': self.descartados_kernel,
+            'descartados_interface': self.descartados_interface,
+            'descartados_fila': self.descartados_fila,
+            'fora_de_ordem': self.fora_de_ordem,
+            'erro': self.erro,
+        }
+
+
+class CapturaMultiInterface:
+    def __init__(self, interfaces, perfil, atraso_us=ATRASO_INTERCALACAO_US,
+                 capacidade=fila_captura.CAPACIDADE_PADRAO, politica='bloquear', decodificadores=1):
+        if not interfaces:
+            raise ValueError("Informe pelo menos uma interface")
+        self.fila = fila_captura.AnelLimitado(capacidade, politica, self._descartado)
+        self.atraso_us = atraso_us
+        self.trabalhadores = [
+            CapturaInterface(indice, interface, self.comando(interface, perfil), self.fila)
+            for indice, interface in enumerate(interfaces)
+        ]
+        self.decodificadores = [
+            threading.Thread(target=self._decodificar, name=f"captura-decodificador-{i}", daemon=True)
+            for i in range(max(1, decodificadores))
+        ]
+        # Lotes decodificados por sequência da fila, entregues ao consumidor na ordem de retirada
+        self._prontos = {}
+        self._proximo = 0
+        self._pronto = threading.Condition()
+
+    def _descartado(self, item, quantidade):
+        self.trabalhadores[item[0]].descartados_fila += quantidade
+
+    def _leitoras_terminaram(self):
+        return all(trabalhador.terminou for trabalhador in self.trabalhadores)
+
+    def _decodificar(self):
+        """Retira lotes crus, decodifica fora de qualquer trava e publica pela sequência do lote"""
+        while True:
+            retirado = self.fila.retirar(fila_captura.ESPERA_S)
+            if retirado is None:
+                if self._leitoras_terminaram() and self.fila.vazia:
+                    return
+                continue
+            sequencia, (indice, bloco), _ = retirado
+            try:
+                eventos = list(leitor_pcap.ler_pacotes_buffer(bloco))
+            except Exception as e:
+                self.trabalhadores[indice].erro = f"decodificação: {e}"
+                eventos = []
+            with self._pronto:
+                # O lote esperado pelo consumidor (distância 0) nunca espera
+                while sequencia - self._proximo >= ADIANTAMENTO_MAXIMO:
+                    self._pronto.wait()
+                self._prontos[sequencia] = (indice, eventos)
+                self._pronto.notify_all()
+
+    def _retirar_prontos(self, espera):
+        """Lotes decodificados na ordem da fila (espera até 'espera' segundos pelo primeiro)"""
+        with self._pronto:
+            if self._proximo not in self._prontos:
+                self._pronto.wait(espera)
+            lotes = []
+            while self._proximo in self._prontos:
+                lotes.append(self._prontos.pop(self._proximo))
+                self._proximo += 1
+            if lotes:
+                self._pronto.notify_all()
+            return lotes
+
+    @staticmethod
+    def comando(interface, perfil):
+        return ['sudo', 'tcpdump', '-i', interface, '-nn', '-U', '-w', '-',
+                *perfil.opcoes(), perfil.expressao()]
+
+    def iniciar(self):
+        for thread in self.decodificadores + self.trabalhadores:
+            thread.start()
+
+    def eventos(self, espera=0.2):
+        """
+        Gera (interface, dados) em ordem de timestamp, intercalando as interfaces
+        Um pacote só sai quando nenhuma interface ativa pode mais entregar algo anterior a ele:
+        cada uma já entregou um pacote mais novo ou passou ATRASO_INTERCALACAO_US sem entregar.
+        Sem tráfego, gera None a cada 'espera' segundos (para o chamador cuidar de prazos e relatórios).
+        """
+        quantidade = len(self.trabalhadores)
+        relogios = [ingestao.RelogioIngestao('tt') for _ in range(quantidade)]
+        ultimo = [None] * quantidade
+        encerrado = [False] * quantidade
+        ativos = quantidade
+        heap = []
+        sequencia = 0
+        emitido = None
+
+        while ativos or heap:
+            for indice, eventos in self._retirar_prontos(espera):
+                if not eventos:
+                    continue
+                trabalhador = self.trabalhadores[indice]
+                converter = relogios[indice].converter
+                for dados in eventos:
+                    timestamp = dados['timestamp'] = converter(dados['timestamp'])
+                    trabalhador.bytes += dados['tamanho']
+                    heapq.heappush(heap, (timestamp, sequencia, indice, dados))
+                    sequencia += 1
+                trabalhador.pacotes += len(eventos)
+                ultimo[indice] = timestamp
+
+            # Uma interface encerrada só sai do cálculo quando nada dela está na fila nem sendo
+            # decodificado (terminou é marcado depois do último colocar)
+            for i, trabalhador in enumerate(self.trabalhadores):
+                if (not encerrado[i] and trabalhador.terminou and self.fila.vazia
+                        and self._proximo == self.fila.retirados):
+                    encerrado[i] = True
+                    ativos -= 1
+
+            if ativos:
+                limite_atraso = time.time_ns() // 1000 - self.atraso_us
+                marca = min(max(ultimo[i], limite_atraso) if ultimo[i] is not None else limite_atraso
+                            for i in range(quantidade) if not encerrado[i])
+            else:
+                marca = None  # Todas terminaram: esvazia o heap
+
+            entregou = False
+            while heap and (marca is None or heap[0][0] <= marca):
+                timestamp, _, indice, dados = heapq.heappop(heap)
+                if emitido is not None and timestamp < emitido:
+                    self.trabalhadores[indice].fora_de_ordem += 1
+                else:
+                    emitido = timestamp
+                entregou = True
+                yield self.trabalhadores[indice].interface, dados
+            if not entregou:
+                yield None
+
+    def solicitar_estatisticas(self):
+        for trabalhador in self.trabalhadores:
+            trabalhador.solicitar_estatisticas()
+
+    def parar(self):
+        for trabalhador in self.trabalhadores:
+            trabalhador.parar()
+
+    def aguardar(self, timeout=5):
+        for thread in self.trabalhadores + self.decodificadores:
+            thread.join(timeout)
+
+    def estatisticas(self):
+        return [trabalhador.estatisticas() for trabalhador in self.trabalhadores]
+
+    def estatisticas_fila(self):
+        return {**self.fila.estatisticas(), 'trabalhadores': len(self.decodificadores)}
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Captura contínua em anel (ring buffer) com análise por segmento
+O tcpdump grava no máximo 'segmentos' arquivos de 'tamanho_mb' MB (-C/-W), sobrescrevendo
+os mais antigos: o uso de disco fica limitado a tamanho_mb * segmentos.
+Cada segmento fechado é analisado em segundo plano enquanto a captura continua, e os
+resultados dos últimos segmentos formam um relatório contínuo (rolling).
+"""
+
+import glob
+import os
+import subprocess
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import ingestao
+from detector_portscan import DetectorJanela
+from perfil_captura import PERFIS
+
+
+class ResultadoSegmento:
+    """Contagens e detecções de um segmento da captura"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.pacotes = 0
+        self.eventos_por_ip = defaultdict(int)
+        self.portscan_detectado = {}  # ip -> timestamp (µs), apenas detecções ocorridas neste segmento
+        self.inicio = None
+        self.fim = None
+
+
+class CapturaRotativa:
+    def __init__(self, interface, prefixo, tamanho_mb, segmentos, janela_us, limite, ao_analisar=None,
+                 perfil=None, detector=None, filtro=None, agregador=None):
+        self.interface = interface
+        self.perfil = perfil or PERFIS['completo']
+        self.prefixo = prefixo
+        self.tamanho_mb = tamanho_mb
+        self.segmentos = segmentos
+        self.ao_analisar = ao_analisar  # callback(ResultadoSegmento), chamado na thread de análise
+
+        # Um único worker analisa os segmentos em ordem; o detector continua de um segmento
+        # para o outro, então um scan que atravessa a rotação também é detectado
+        self.detector = detector or DetectorJanela(janela_us, limite)
+        # redes_cidr.FiltroRedes (só usado pelo worker): permitidos descartados, origens agrupadas
+        self.filtro = filtro
+        # agregados_tempo.AgregadorTempo (só usado pelo worker, que vê os segmentos em ordem)
+        self.agregador = agregador
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.resultados = deque(maxlen=segmentos)  # Relatório contínuo: só os últimos segmentos
+        self.trava = threading.Lock()
+
+        self.processo = None
+        self.vistos = set()  # (caminho, mtime, tamanho) dos segmentos já enviados para análise
+        self.inicio_captura = None
+        self.pendentes = []
+
+    def comando(self):
+        return [
+            'sudo', 'tcpdump',
+            '-i', self.interface,
+            '-nn',
+            '-C', str(self.tamanho_mb),   # Novo arquivo a cada tamanho_mb MB
+            '-W', str(self.segmentos),    # Anel com no máximo 'segmentos' arquivos
+            *self.perfil.opcoes(),
+            '-w', self.prefixo,
+            self.perfil.expressao()
+        ]
+
+    def iniciar(self):
+        self.inicio_captura = time.time_ns()
+        self.processo = subprocess.Popen(self.comando(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def ativa(self):
+        return self.processo is not None and self.processo.poll() is None
+
+    def _arquivos_segmentos(self):
+        """Arquivos do anel (prefixo seguido do número do segmento), do mais antigo ao mais novo"""
+        arquivos = []
+        for caminho in glob.glob(glob.escape(self.prefixo) + '*'):
+            sufixo = caminho[len(self.prefixo):]
+            if not sufixo.isdigit():
+                continue
+            try:
+                info = os.stat(caminho)
+            except FileNotFoundError:
+                continue
+            arquivos.append((info.st_mtime_ns, caminho, info.st_size))
+        arquivos.sort()
+        return arquivos
+
+    def verificar(self, encerrando=False):
+        """Envia para análise os segmentos fechados (todos menos o que o tcpdump está escrevendo)"""
+        arquivos = self._arquivos_segmentos()
+        if not encerrando:
+            arquivos = arquivos[:-1]
+
+        for mtime, caminho, tamanho in arquivos:
+            # Ignora arquivos de execuções anteriores que ainda não foram sobrescritos
+            if mtime < self.inicio_captura:
+                continue
+            assinatura = (caminho, mtime, tamanho)
+            if assinatura in self.vistos:
+                continue
+            self.vistos.add(assinatura)
+            self.pendentes.append(self.executor.submit(self._analisar_segmento, caminho))
+
+        # Mantém o conjunto de assinaturas limitado ao tamanho do anel
+        if len(self.vistos) > 4 * self.segmentos:
+            atuais = {(c, m, t) for m, c, t in self._arquivos_segmentos()}
+            self.vistos &= atuais
+        self.pendentes = [futuro for futuro in self.pendentes if not futuro.done()]
+
+    def _analisar_segmento(self, caminho):
+        resultado = ResultadoSegmento(caminho)
+        detector = self.detector
+        aplicar = self.filtro.aplicar if self.filtro is not None else None
+        agregar = self.agregador.adicionar if self.agregador is not None else None
+        try:
+            for dados in ingestao.eventos_de_pcap(caminho):
+                if aplicar is not None and aplicar(dados) is None:
+                    continue
+                if agregar is not None:
+                    agregar(dados)
+                ip = dados['ip_origem']
+                timestamp = dados['timestamp']
+                resultado.pacotes += 1
+                resultado.eventos_por_ip[ip] += 1
+                if resultado.inicio is None:
+                    resultado.inicio = timestamp
+                resultado.fim = timestamp
+                if detector.registrar(ip, timestamp, dados['porta_destino']):
+                    resultado.portscan_detectado[ip] = timestamp
+        except (OSError, ValueError):
+            pass  # Segmento sobrescrito ou truncado durante a leitura: aproveita o que foi lido
+
+        if resultado.fim is not None:
+            detector.expirar(resultado.fim)
+
+        with self.trava:
+            self.resultados.append(resultado)
+            mais_antigo = min((r.inicio for r in self.resultados if r.inicio is not None), default=None)
+
+        # Detecções anteriores ao segmento mais antigo do anel saem da memória: o IP volta a ser
+        # avaliado, como se a captura tivesse começado ali
+        if mais_antigo is not None:
+            antigos = [ip for ip, momento in detector.detectados.items() if momento < mais_antigo]
+            for ip in antigos:
+                del detector.detectados[ip]
+        if self.ao_analisar:
+            self.ao_analisar(resultado)
+        return resultado
+
+    def relatorio(self):
+        """Junta os resultados dos segmentos retidos: (eventos_por_ip, portscan_detectado)"""
+        eventos_por_ip = defaultdict(int)
+        portscan_detectado = {}
+        with self.trava:
+            resultados = list(self.resultados)
+        for resultado in resultados:
+            for ip, total in resultado.eventos_por_ip.items():
+                eventos_por_ip[ip] += total
+            for ip, momento in resultado.portscan_detectado.items():
+                if ip not in portscan_detectado or momento < portscan_detectado[ip]:
+                    portscan_detectado[ip] = momento
+        return eventos_por_ip, portscan_detectado
+
+    def parar(self):
+        """Para o tcpdump, analisa o último segmento e espera a fila de análise esvaziar"""
+        if self.processo is not None:
+            self.processo.terminate()
+            self.processo.wait()
+        self.verificar(encerrando=True)
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Entrada e saída comprimidas de forma transparente (gzip, xz e zstd)
+Na leitura o formato é reconhecido pelos magic bytes e o conteúdo é descomprimido em blocos,
+sem descomprimir para o disco; na escrita o formato vem da extensão (.gz, .xz, .zst).
+O zstd é opcional: usa o compression.zstd (Python 3.14+) ou o pacote zstandard, se instalados.
+"""
+
+import gzip
+import io
+import lzma
+
+try:
+    from compression import zstd as _zstd_stdlib
+except ImportError:  # Python < 3.14
+    _zstd_stdlib = None
+
+try:
+    import zstandard
+except ImportError:  # zstandard é opcional
+    zstandard = None
+
+MAGICS = {
+    'gzip': b'\x1f\x8b',
+    'xz': b'\xfd7zXZ\x00',
+    'zstd': b'\x28\xb5\x2f\xfd',
+}
+
+EXTENSOES = {
+    '.gz': 'gzip',
+    '.gzip': 'gzip',
+    '.xz': 'xz',
+    '.zst': 'zstd',
+    '.zstd': 'zstd',
+}
+
+# Buffer da leitura descomprimida: blocos grandes diminuem as chamadas por linha/registro
+TAMANHO_BUFFER = 1 << 20
+
+
+def zstd_disponivel():
+    return _zstd_stdlib is not None or zstandard is not None
+
+
+def detectar(caminho):
+    """'gzip', 'xz', 'zstd' ou None (arquivo sem compressão), pelos magic bytes"""
+    try:
+        with open(caminho, 'rb') as f:
+            cabecalho = f.read(6)
+    except OSError:
+        return None
+    for formato, magic in MAGICS.items():
+        if cabecalho.startswith(magic):
+            return formato
+    return None
+
+
+def formato_por_extensao(caminho):
+    for extensao, formato in EXTENSOES.items():
+        if caminho.lower().endswith(extensao):
+            return formato
+    return None
+
+
+def sem_extensao(caminho):
+    """Nome sem a extensão de compressão (ex: trafego.txt.gz -> trafego.txt)"""
+    formato = formato_por_extensao(caminho)
+    if formato is None:
+        return caminho
+    return caminho[:caminho.rfind('.')]
+
+
+def _abrir_binario(caminho, escrita, formato, nivel):
+    if formato == 'gzip':
+        if escrita:
+            return gzip.open(caminho, 'wb', compresslevel=6 if nivel is None else nivel)
+        return gzip.open(caminho, 'rb')
+    if formato == 'xz':
+        if escrita:
+            return lzma.open(caminho, 'wb', preset=6 if nivel is None else nivel)
+        return lzma.open(caminho, 'rb')
+    if formato == 'zstd':
+        if _zstd_stdlib is not None:
+            if escrita:
+                return _zstd_stdlib.open(caminho, 'wb', level=nivel)
+            return _zstd_stdlib.open(caminho, 'rb')
+        if zstandard is not None:
+            if escrita:
+                return zstandard.ZstdCompressor(level=3 if nivel is None else nivel).stream_writer(
+                    open(caminho, 'wb'), closefd=True)
+            return zstandard.ZstdDecompressor().stream_reader(open(caminho, 'rb'), closefd=True)
+        raise ValueError(f"{caminho}: zstd requer Python 3.14+ ou o pacote zstandard (pip install zstandard)")
+    raise ValueError(f"Formato de compressão desconhecido: {formato}")
+
+
+def abrir(caminho, modo='rb', formato=None, nivel=None):
+    """
+    Abre 'caminho' como open() (modos r/rb/w/wb, texto em UTF-8), comprimindo/descomprimindo
+    conforme o formato: na leitura pelos magic bytes, na escrita pela extensão (ou 'formato')
+    """
+    escrita = 'w' in modo
+    texto = 'b' not in modo
+    if formato is None:
+        formato = formato_por_extensao(caminho) if escrita else detectar(caminho)
+
+    if formato is None:
+        if texto:
+            return open(caminho, modo.replace('t', ''), buffering=TAMANHO_BUFFER, encoding='utf-8',
+                        errors=None if escrita else 'replace', newline='' if escrita else None)
+        return open(caminho, modo, buffering=TAMANHO_BUFFER)
+
+    fp = _abrir_binario(caminho, escrita, formato, nivel)
+    if not escrita:
+        fp = io.BufferedReader(fp, TAMANHO_BUFFER)
+    if texto:
+        return io.TextIOWrapper(fp, encoding='utf-8', errors=None if escrita else 'replace',
+                                newline='' if escrita else None)
+    return fp
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Top-K aproximado em memória fixa (algoritmo Space-Saving, Metwally et al. 2005)
+Com 'capacidade' contadores e N eventos no total:
+  - a contagem de cada IP monitorado superestima a real em no máximo o seu 'erro'
+    (real está em [contagem - erro, contagem]) e erro <= N / capacidade;
+  - todo IP com mais de N / capacidade eventos está garantidamente entre os monitorados;
+  - um IP fora dos monitorados teve no máximo erro_maximo() eventos.
+Um flood com origens forjadas não faz a memória crescer: cada IP novo toma o lugar do menor.
+"""
+
+import heapq
+
+
+class SpaceSaving:
+    def __init__(self, capacidade=1000):
+        if capacidade < 1:
+            raise ValueError("A capacidade do top-K deve ser pelo menos 1")
+        self.capacidade = capacidade
+        self.contadores = {}  # ip -> [contagem, erro]
+        # Heap de mínimo (contagem, ip), uma entrada por IP; a contagem da entrada pode estar
+        # desatualizada (só cresce), então é corrigida na hora de escolher quem sai
+        self._heap = []
+        self.total = 0
+
+    def __len__(self):
+        return len(self.contadores)
+
+    def adicionar(self, ip, quantidade=1):
+        """Conta 'quantidade' eventos do IP; O(1) se já monitorado, O(log capacidade) amortizado se não"""
+        self.total += quantidade
+        contador = self.contadores.get(ip)
+        if contador is not None:
+            contador[0] += quantidade
+            return
+
+        if len(self.contadores) < self.capacidade:
+            self.contadores[ip] = [quantidade, 0]
+            heapq.heappush(self._heap, (quantidade, ip))
+            return
+
+        # Substitui o IP de menor contagem; o novo herda essa contagem como erro
+        heap = self._heap
+        contadores = self.contadores
+        while True:
+            minimo, vitima = heapq.heappop(heap)
+            atual = contadores[vitima][0]
+            if atual == minimo:
+                break
+            heapq.heappush(heap, (atual, vitima))
+
+        del contadores[vitima]
+        contadores[ip] = [minimo + quantidade, minimo]
+        heapq.heappush(heap, (minimo + quantidade, ip))
+
+    def erro_maximo(self):
+        """Limite para qualquer IP fora dos monitorados (e para o erro de qualquer contagem)"""
+        if len(self.contadores) < self.capacidade:
+            return 0
+        return min(contagem for contagem, _ in self.contadores.values())
+
+    def contagem(self, ip):
+        """(contagem estimada, erro) do IP; fora dos monitorados, (0, erro_maximo())"""
+        contador = self.contadores.get(ip)
+        if contador is None:
+            return 0, self.erro_maximo()
+        return contador[0], contador[1]
+
+    def top(self, quantidade=None):
+        """Lista [(ip, contagem, erro)] em ordem decrescente de contagem"""
+        itens = sorted(((ip, contagem, erro) for ip, (contagem, erro) in self.contadores.items()),
+                       key=lambda x: x[1], reverse=True)
+        return itens if quantidade is None else itens[:quantidade]
+
+    def contagens(self):
+        """ip -> contagem estimada (mesmo formato do eventos_por_ip exato)"""
+        return {ip: contador[0] for ip, contador in self.contadores.items()}
+
+    def erros(self):
+        """ip -> erro máximo da contagem"""
+        return {ip: contador[1] for ip, contador in self.contadores.items()}
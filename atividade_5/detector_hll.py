@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Detector de port scan aproximado (HyperLogLog por IP, em baldes de tempo)
+Mesma interface do DetectorJanela, mas a memória por IP é fixa: a janela é dividida em
+'baldes' fatias de tempo e cada fatia guarda 2**precisao registradores HLL (1 byte cada)
+das portas de destino. A estimativa de portas distintas é a união (máximo por registrador)
+das fatias que cobrem a janela. Troca exatidão por memória constante: ver
+benchmark_deteccao.py para as taxas de falso positivo/negativo em relação ao exato.
+"""
+
+import math
+from array import array
+
+from detector_portscan import DetectorJanela
+
+PRECISAO_PADRAO = 6   # 64 registradores por balde
+BALDES_PADRAO = 6     # janela de 60s -> baldes de 10s
+
+
+def _misturar(valor):
+    """splitmix64: hash de 64 bits determinístico (o hash() de int do Python é a identidade)"""
+    valor = (valor + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    valor = ((valor ^ (valor >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    valor = ((valor ^ (valor >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return valor ^ (valor >> 31)
+
+
+def _tabelas(precisao):
+    """Registrador e rho (posição do primeiro bit 1) de cada uma das 65536 portas"""
+    registradores = 1 << precisao
+    bits = 64 - precisao
+    indice = array('H', bytes(2 * 65536))
+    rho = bytearray(65536)
+    for porta in range(65536):
+        h = _misturar(porta)
+        indice[porta] = h & (registradores - 1)
+        rho[porta] = bits - (h >> precisao).bit_length() + 1
+    return indice, rho
+
+
+_TABELAS = {}
+
+# 2**-r para r = 0..64
+_POTENCIAS = [2.0 ** -r for r in range(65)]
+
+
+def _alfa(registradores):
+    if registradores == 16:
+        return 0.673
+    if registradores == 32:
+        return 0.697
+    if registradores == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / registradores)
+
+
+class JanelaHLL:
+    """Registradores HLL de um IP: um anel de baldes + a união dos baldes válidos"""
+
+    __slots__ = ('registros', 'baldes', 'mesclado', 'soma', 'zeros', 'balde_atual', 'ultimo')
+
+    def __init__(self, anel, registradores):
+        self.registros = bytearray(anel * registradores)  # anel de baldes, lado a lado
+        self.baldes = [-1] * anel                          # número do balde em cada posição do anel
+        self.mesclado = bytearray(registradores)           # máximo dos baldes válidos
+        self.soma = float(registradores)                   # soma de 2**-M[j] do mesclado
+        self.zeros = registradores                         # registradores zerados no mesclado
+        self.balde_atual = None
+        self.ultimo = None
+
+
+class DetectorHLL:
+    """
+    Marca um IP como port scan quando a estimativa de portas distintas passa de 'limite'.
+    As estimativas cobrem entre 'janela' e 'janela' + uma fatia: o tempo nunca fica menor que o
+    do detector exato, então os erros vêm só da estimativa do HLL.
+    """
+
+    def __init__(self, janela=60.0, limite=10, precisao=PRECISAO_PADRAO, baldes=BALDES_PADRAO):
+        self.janela = janela
+        self.limite = limite
+        self.precisao = precisao
+        self.registradores = 1 << precisao
+        self.largura = max(1, -(-janela // baldes))  # duração de cada balde, arredondada para cima
+        self.anel = baldes + 1
+        self.alfa_m2 = _alfa(self.registradores) * self.registradores ** 2
+        if precisao not in _TABELAS:
+            _TABELAS[precisao] = _tabelas(precisao)
+        self._indice, self._rho = _TABELAS[precisao]
+        self.janelas = {}      # ip -> JanelaHLL (apenas IPs ainda não detectados)
+        self.detectados = {}   # ip -> timestamp em que o limite foi cruzado
+
+    def _girar(self, estado, balde):
+        """Entrou num balde novo: zera os que saíram da janela e recalcula a união"""
+        m = self.registradores
+        anel = self.anel
+        registros = estado.registros
+        baldes = estado.baldes
+        primeiro_valido = balde - anel + 1
+        zerou = False
+        for i in range(anel):
+            if baldes[i] != -1 and baldes[i] < primeiro_valido:
+                registros[i * m:(i + 1) * m] = bytes(m)
+                baldes[i] = -1
+                zerou = True
+        baldes[balde % anel] = balde
+        estado.balde_atual = balde
+        if not zerou:
+            return  # Nenhum balde com dados saiu: a união continua a mesma
+
+        mesclado = bytearray(m)
+        for i in range(anel):
+            if baldes[i] != -1:
+                mesclado = bytearray(map(max, mesclado, registros[i * m:(i + 1) * m]))
+        estado.mesclado = mesclado
+        estado.soma = sum(_POTENCIAS[r] for r in mesclado)
+        estado.zeros = mesclado.count(0)
+
+    def estimar(self, estado):
+        m = self.registradores
+        estimativa = self.alfa_m2 / estado.soma
+        # Correção para cardinalidades pequenas (linear counting), a faixa do limite de portas
+        if estimativa <= 2.5 * m and estado.zeros:
+            estimativa = m * math.log(m / estado.zeros)
+        return estimativa
+
+    def registrar(self, ip, timestamp, porta):
+        """Processa um evento; retorna True somente no evento que cruza o limite"""
+        if ip in self.detectados:
+            return False
+
+        estado = self.janelas.get(ip)
+        if estado is None:
+            estado = self.janelas[ip] = JanelaHLL(self.anel, self.registradores)
+
+        # Timestamps fora de ordem são tratados como simultâneos ao último evento
+        if estado.ultimo is not None and timestamp < estado.ultimo:
+            timestamp = estado.ultimo
+        estado.ultimo = timestamp
+
+        balde = timestamp // self.largura
+        if balde != estado.balde_atual:
+            self._girar(estado, balde)
+
+        j = self._indice[porta]
+        r = self._rho[porta]
+        posicao = (balde % self.anel) * self.registradores + j
+        if r <= estado.registros[posicao]:
+            return False
+        estado.registros[posicao] = r
+
+        anterior = estado.mesclado[j]
+        if r <= anterior:
+            return False
+        estado.mesclado[j] = r
+        estado.soma += _POTENCIAS[r] - _POTENCIAS[anterior]
+        if not anterior:
+            estado.zeros -= 1
+
+        if self.estimar(estado) > self.limite:
+            self.detectados[ip] = timestamp
+            del self.janelas[ip]
+            return True
+        return False
+
+    def expirar(self, agora):
+        """Descarta IPs cujo último evento já saiu da janela; retorna quantos foram removidos"""
+        expirados = [ip for ip, estado in self.janelas.items()
+                     if agora - estado.ultimo > self.janela]
+        for ip in expirados:
+            del self.janelas[ip]
+        return len(expirados)
+
+
+def novo_detector(janela, limite, aproximado=False):
+    """DetectorJanela (exato) ou DetectorHLL (aproximado, memória fixa por IP)"""
+    if aproximado:
+        return DetectorHLL(janela, limite)
+    return DetectorJanela(janela, limite)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Detector de port scan por janela deslizante
+Compartilhado pelo analise_trafego.py e pelo simple/analise_trafego.py
+"""
+
+from collections import deque
+
+
+class JanelaPortas:
+    """Eventos (timestamp, porta) de um IP dentro da janela, com contagem de referências por porta"""
+
+    __slots__ = ('eventos', 'contagem', 'ultimo')
+
+    def __init__(self):
+        self.eventos = deque()
+        self.contagem = {}
+        self.ultimo = None
+
+    def adicionar(self, timestamp, porta, duracao):
+        """Insere o evento e expulsa os que saíram da janela; O(1) amortizado"""
+        # Timestamps fora de ordem são tratados como simultâneos ao último evento
+        if self.ultimo is not None and timestamp < self.ultimo:
+            timestamp = self.ultimo
+        self.ultimo = timestamp
+
+        self.eventos.append((timestamp, porta))
+        self.contagem[porta] = self.contagem.get(porta, 0) + 1
+
+        eventos = self.eventos
+        contagem = self.contagem
+        while timestamp - eventos[0][0] > duracao:
+            _, porta_antiga = eventos.popleft()
+            restante = contagem[porta_antiga] - 1
+            if restante:
+                contagem[porta_antiga] = restante
+            else:
+                del contagem[porta_antiga]
+
+    def portas_distintas(self):
+        return len(self.contagem)
+
+
+class DetectorJanela:
+    """
+    Marca um IP como port scan quando ele acessa mais de 'limite' portas distintas
+    dentro de 'janela' segundos. Guarda o momento em que o limite foi cruzado.
+    """
+
+    def __init__(self, janela=60.0, limite=10):
+        self.janela = janela
+        self.limite = limite
+        self.janelas = {}      # ip -> JanelaPortas (apenas IPs ainda não detectados)
+        self.detectados = {}   # ip -> timestamp em que o limite foi cruzado
+
+    def registrar(self, ip, timestamp, porta):
+        """Processa um evento; retorna True somente no evento que cruza o limite"""
+        if ip in self.detectados:
+            return False
+
+        janela = self.janelas.get(ip)
+        if janela is None:
+            janela = self.janelas[ip] = JanelaPortas()
+
+        janela.adicionar(timestamp, porta, self.janela)
+
+        if len(janela.contagem) > self.limite:
+            # Depois de detectado, a janela do IP não é mais necessária
+            self.detectados[ip] = timestamp
+            del self.janelas[ip]
+            return True
+
+        return False
+
+    def expirar(self, agora):
+        """Descarta janelas cujo último evento já saiu da janela; retorna quantas foram removidas"""
+        expirados = [ip for ip, janela in self.janelas.items()
+                     if agora - janela.ultimo > self.janela]
+        for ip in expirados:
+            del self.janelas[ip]
+        return len(expirados)
+
+    def exportar(self):
+        """Estado serializável em JSON: janelas abertas como listas planas [ts, porta, ts, porta, ...]"""
+        janelas = {}
+        for ip, janela in self.janelas.items():
+            plano = []
+            for timestamp, porta in janela.eventos:
+                plano.append(timestamp)
+                plano.append(porta)
+            janelas[ip] = plano
+        return {'janela': self.janela, 'limite': self.limite,
+                'janelas': janelas, 'detectados': self.detectados}
+
+    @classmethod
+    def restaurar(cls, estado):
+        detector = cls(estado['janela'], estado['limite'])
+        detector.detectados = dict(estado['detectados'])
+        for ip, plano in estado['janelas'].items():
+            janela = detector.janelas[ip] = JanelaPortas()
+            for i in range(0, len(plano), 2):
+                janela.adicionar(plano[i], plano[i + 1], detector.janela)
+        return detector
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Captura ao vivo desacoplada da análise (produtor/consumidor com fila limitada)
+Uma thread só drena o stdout do tcpdump em blocos e põe os registros completos (linhas do -l ou
+pacotes do -w -) num anel de capacidade fixa, contada em registros. Um ou mais trabalhadores
+retiram os lotes, parseiam fora de qualquer trava e entregam os eventos à análise na ordem de
+chegada. Quando a análise não acompanha, a política da fila decide o que acontece:
+  bloquear          -> o leitor espera; o pipe enche e o kernel descarta (contado pelo tcpdump)
+  descartar_antigos -> o leitor nunca para; os lotes mais antigos da fila são descartados e contados
+Os descartes do kernel vêm do stderr do tcpdump, no fim da captura e a cada SIGUSR1.
+"""
+
+import json
+import os
+import re
+import signal
+import subprocess
+import threading
+from collections import deque
+
+import leitor_pcap
+import parser_tcpdump
+
+POLITICAS = ('bloquear', 'descartar_antigos')
+
+# Registros (linhas ou pacotes) na fila; ~200 mil linhas do tcpdump ocupam uns 25 MB
+CAPACIDADE_PADRAO = 200_000
+
+TAMANHO_BLOCO = 1 << 16
+
+# Intervalo em que um trabalhador ocioso confere se a captura terminou
+ESPERA_S = 0.2
+
+_ESTATISTICA = re.compile(r'(\d+) packets? (captured|received by filter|dropped by kernel|dropped by interface)')
+_CAMPOS = {
+    'captured': 'capturados',
+    'received by filter': 'recebidos_filtro',
+    'dropped by kernel': 'descartados_kernel',
+    'dropped by interface': 'descartados_interface',
+}
+
+
+def acompanhar_stderr(processo, destino):
+    """
+    Lê o stderr do tcpdump até ele terminar: os contadores viram atributos de 'destino'
+    (capturados, recebidos_filtro, descartados_kernel, descartados_interface) e outras mensagens, destino.erro
+    """
+    for linha in processo.stderr:
+        linha = linha.decode('utf-8', errors='replace').strip()
+        encontrados = _ESTATISTICA.findall(linha)
+        for valor, campo in encontrados:
+            setattr(destino, _CAMPOS[campo], int(valor))
+        if not encontrados and linha and not linha.startswith(('tcpdump: listening', 'listening on')):
+            destino.erro = linha
+
+
+def solicitar_estatisticas(processo):
+    """No Linux o tcpdump responde ao SIGUSR1 com os contadores no stderr (o sudo repassa o sinal)"""
+    if processo is not None and processo.poll() is None and hasattr(signal, 'SIGUSR1'):
+        try:
+            os.kill(processo.pid, signal.SIGUSR1)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+
+class AnelLimitado:
+    """
+    Fila de lotes entre threads, limitada pelo total de registros (um lote de 500 linhas conta 500)
+    Cheia: 'bloquear' faz colocar() esperar; 'descartar_antigos' tira os lotes mais antigos
+    (ao_descartar(item, quantidade) é chamado para cada um, ex: para contar por interface)
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO, politica='bloquear', ao_descartar=None):
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de fila inválida: {politica} (use {', '.join(POLITICAS)})")
+        if capacidade < 1:
+            raise ValueError("A capacidade da fila deve ser pelo menos 1")
+        self.capacidade = capacidade
+        self.politica = politica
+        self.ao_descartar = ao_descartar
+        self.profundidade = 0
+        self.profundidade_maxima = 0
+        self.enfileirados = 0
+        self.descartados = 0
+        self.bloqueios = 0    # vezes em que o produtor teve de esperar
+        self.fechado = False
+        self._itens = deque()
+        self._sequencia = 0
+        self._trava = threading.Lock()
+        self._nao_vazia = threading.Condition(self._trava)
+        self._com_espaco = threading.Condition(self._trava)
+
+    def colocar(self, item, quantidade=1):
+        """Enfileira um lote (um lote maior que a capacidade entra sozinho na fila vazia)"""
+        with self._trava:
+            if self.profundidade + quantidade > self.capacidade and self._itens:
+                if self.politica == 'bloquear':
+                    self.bloqueios += 1
+                    while self.profundidade + quantidade > self.capacidade and self._itens and not self.fechado:
+                        self._com_espaco.wait()
+                else:
+                    while self.profundidade + quantidade > self.capacidade and self._itens:
+                        antigo, descartados = self._itens.popleft()
+                        self.profundidade -= descartados
+                        self.descartados += descartados
+                        if self.ao_descartar is not None:
+                            self.ao_descartar(antigo, descartados)
+            self._itens.append((item, quantidade))
+            self.profundidade += quantidade
+            self.enfileirados += quantidade
+            if self.profundidade > self.profundidade_maxima:
+                self.profundidade_maxima = self.profundidade
+            self._nao_vazia.notify()
+
+    def retirar(self, timeout=None):
+        """
+        (sequência, item, quantidade) do lote mais antigo, ou None se nada chegou no 'timeout'
+        A sequência numera os lotes retirados (0, 1, 2...), para os consumidores manterem a ordem
+        """
+        with self._trava:
+            if not self._itens and not self.fechado:
+                self._nao_vazia.wait(timeout)
+            if not self._itens:
+                return None
+            item, quantidade = self._itens.popleft()
+            self.profundidade -= quantidade
+            sequencia = self._sequencia
+            self._sequencia += 1
+            self._com_espaco.notify()
+            return sequencia, item, quantidade
+
+    def fechar(self):
+        """O produtor terminou: os consumidores esvaziam a fila e param"""
+        with self._trava:
+            self.fechado = True
+            self._nao_vazia.notify_all()
+            self._com_espaco.notify_all()
+
+    @property
+    def vazia(self):
+        return not self._itens
+
+    @property
+    def retirados(self):
+        """Lotes já retirados (a próxima sequência)"""
+        return self._sequencia
+
+    @property
+    def esgotado(self):
+        """Fechada e sem nada para retirar"""
+        return self.fechado and not self._itens
+
+    def estatisticas(self):
+        with self._trava:
+            return {
+                'politica': self.politica,
+                'capacidade': self.capacidade,
+                'profundidade': self.profundidade,
+                'profundidade_maxima': self.profundidade_maxima,
+                'enfileirados': self.enfileirados,
+                'descartados': self.descartados,
+                'bloqueios': self.bloqueios,
+            }
+
+
+class CapturaDesacoplada:
+    """
+    tcpdump -> thread leitora -> AnelLimitado -> trabalhadores (parse) -> ao_lote(eventos, registros)
+    formato='texto' lê 'tcpdump -l -tt' e formato='pcap' lê 'tcpdump -U -w -'. Os eventos saem com o
+    timestamp cru (µs) e ao_lote é chamado na ordem da captura, um lote por vez, segurando
+    self.trava: o chamador usa a mesma trava para ler o estado da análise (tela, relatório).
+    """
+
+    def __init__(self, comando, ao_lote, formato='texto', capacidade=CAPACIDADE_PADRAO,
+                 politica='bloquear', trabalhadores=1, nome=None):
+        if formato not in ('texto', 'pcap'):
+            raise ValueError(f"Formato de captura inválido: {formato}")
+        self.comando = comando
+        self.ao_lote = ao_lote
+        self.formato = formato
+        self.nome = nome
+        self.fila = AnelLimitado(capacidade, politica)
+        self.trabalhadores = max(1, trabalhadores)
+        self.trava = threading.Condition(threading.RLock())
+        self.encerrada = threading.Event()
+        self.processo = None
+        self.registros = 0    # lidos do tcpdump
+        self.analisados = 0   # entregues à análise
+        self.capturados = None
+        self.recebidos_filtro = None
+        self.descartados_kernel = None
+        self.descartados_interface = None
+        self.erro = None
+        self._proximo = 0
+        self._ativos = 0
+        self._threads = []
+
+    def iniciar(self):
+        self.processo = subprocess.Popen(self.comando, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        self._ativos = self.trabalhadores
+        self._threads = [
+            threading.Thread(target=self._ler, name="captura-leitor", daemon=True),
+            threading.Thread(target=acompanhar_stderr, args=(self.processo, self),
+                             name="captura-stderr", daemon=True),
+        ] + [
+            threading.Thread(target=self._trabalhar, name=f"captura-trabalhador-{i}", daemon=True)
+            for i in range(self.trabalhadores)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _lotes(self):
+        """(quantidade de registros, bloco cru) com só registros completos"""
+        fluxo = self.processo.stdout
+        if self.formato == 'pcap':
+            yield from leitor_pcap.ler_lotes_stream(fluxo, TAMANHO_BLOCO)
+            return
+        ler = fluxo.read1
+        resto = b''
+        while True:
+            bloco = ler(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            bloco = resto + bloco
+            corte = bloco.rfind(b'\n')
+            if corte < 0:
+                resto = bloco
+                continue
+            resto = bloco[corte + 1:]
+            yield bloco.count(b'\n', 0, corte) + 1, bloco[:corte]
+        if resto:
+            yield 1, resto
+
+    def _ler(self):
+        """Produtor: só lê e enfileira, para o pipe do tcpdump nunca ficar parado esperando o parse"""
+        try:
+            for quantidade, bloco in self._lotes():
+                self.registros += quantidade
+                self.fila.colocar(bloco, quantidade)
+        except Exception as e:
+            self.erro = f"leitura: {e}"
+        finally:
+            self.fila.fechar()
+
+    def _parsear(self, bloco):
+        if self.formato == 'pcap':
+            return list(leitor_pcap.ler_pacotes_buffer(bloco))
+        parse = parser_tcpdump.parse_linha
+        eventos = []
+        for linha in bloco.decode('utf-8', errors='replace').split('\n'):
+            dados = parse(linha)
+            if dados:
+                eventos.append(dados)
+        return eventos
+
+    def _trabalhar(self):
+        """Consumidor: parseia em paralelo com os outros e analisa na vez do seu lote"""
+        try:
+            while True:
+                retirado = self.fila.retirar(ESPERA_S)
+                if retirado is None:
+                    if self.fila.esgotado:
+                        return
+                    continue
+                sequencia, bloco, quantidade = retirado
+                try:
+                    eventos = self._parsear(bloco)
+                except Exception as e:
+                    self.erro = f"parse: {e}"
+                    eventos = []
+                with self.trava:
+                    while self._proximo != sequencia:
+                        self.trava.wait()
+                    try:
+                        self.ao_lote(eventos, quantidade)
+                    except Exception as e:
+                        self.erro = f"análise: {type(e).__name__}: {e}"
+                    finally:
+                        self.analisados += quantidade
+                        self._proximo += 1
+                        self.trava.notify_all()
+        finally:
+            with self.trava:
+                self._ativos -= 1
+                if not self._ativos:
+                    self.encerrada.set()
+
+    def esperar(self, timeout=None):
+        """True quando tudo o que o tcpdump entregou já foi analisado"""
+        return self.encerrada.wait(timeout)
+
+    def solicitar_estatisticas(self):
+        solicitar_estatisticas(self.processo)
+
+    def parar(self):
+        if self.processo is not None and self.processo.poll() is None:
+            try:
+                self.processo.terminate()
+            except ProcessLookupError:
+                pass
+
+    def aguardar(self, timeout=5):
+        """Espera o tcpdump e as threads; retorna o código de saída do tcpdump (None se ainda roda)"""
+        if self.processo is None:
+            return None
+        try:
+            self.processo.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.processo.kill()
+            self.processo.wait()
+        for thread in self._threads:
+            thread.join(timeout)
+        return self.processo.returncode
+
+    def estatisticas_fila(self):
+        return {**self.fila.estatisticas(), 'trabalhadores': self.trabalhadores}
+
+    def estatisticas(self):
+        """Contadores da interface, no formato de captura_multi.CapturaInterface.estatisticas (em lista)"""
+        return [{
+            'interface': self.nome,
+            'registros': self.registros,
+            'analisados': self.analisados,
+            'capturados': self.capturados,
+            'recebidos_filtro': self.recebidos_filtro,
+            'descartados_kernel': self.descartados_kernel,
+            'descartados_interface': self.descartados_interface,
+            'descartados_fila': self.fila.descartados,
+            'erro': self.erro,
+        }]
+
+
+def salvar_estatisticas(caminho, dados):
+    """Grava os contadores da captura em JSON (troca atômica, pode ser lido durante a captura)"""
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=2)
+    os.replace(temporario, caminho)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Gerador de tráfego sintético para testes de escala
+Escreve arquivos no formato do tcpdump (texto -ttt/-tt ou pcap) com quantidade de pacotes,
+número de IPs de origem e distribuição de portas configuráveis, e injeta port scans
+verticais em IPs conhecidos. O gabarito (IPs que fazem scan) vai para <saida>.verdade.json.
+
+Uso: python3 gerador_trafego.py --pacotes 1000000 --formato pcap --scans 20 --saida teste.pcap
+"""
+
+import argparse
+import json
+import random
+import struct
+import sys
+
+import compressao
+import ingestao
+
+# Portas de serviço com peso aproximado de ocorrência (distribuição 'comuns')
+PORTAS_COMUNS = [(443, 50), (80, 20), (53, 15), (22, 4), (123, 3), (8080, 3), (3306, 2), (25, 3)]
+
+DISTRIBUICOES = ('comuns', 'zipf', 'uniforme')
+
+# Portas de destino que viram UDP no pcap/texto
+PORTAS_UDP = {53, 123, 5353}
+
+EPOCH_INICIAL = 1_700_000_000
+
+
+def ip_texto(valor):
+    return f"{valor >> 24 & 255}.{valor >> 16 & 255}.{valor >> 8 & 255}.{valor & 255}"
+
+
+def ip_origem(indice):
+    """IPs de origem do tráfego normal: 10.0.0.1, 10.0.0.2, ..."""
+    return (10 << 24) + indice + 1
+
+
+def ip_scanner(indice):
+    """IPs dos scanners injetados (100.64.0.0/10), nunca colidem com o tráfego normal"""
+    return (100 << 24) + (64 << 16) + indice + 1
+
+
+class ConfiguracaoGerador:
+    def __init__(self, pacotes=100000, ips=1000, servidores=256, portas='comuns', scans=0,
+                 portas_scan=100, intervalo_scan=0.01, taxa=1000.0, semente=42, pacotes_por_fluxo=1):
+        self.pacotes = pacotes              # total de pacotes, incluindo os dos scans
+        self.ips = ips                      # IPs de origem distintos no tráfego normal
+        self.servidores = servidores        # IPs de destino distintos
+        self.portas = portas                # distribuição das portas de destino
+        self.scans = scans                  # quantidade de port scans verticais injetados
+        self.portas_scan = portas_scan      # portas distintas por scan
+        self.intervalo_scan = intervalo_scan  # segundos entre pacotes de um scan
+        self.taxa = taxa                    # pacotes por segundo (tempo entre pacotes exponencial)
+        self.semente = semente
+        self.pacotes_por_fluxo = pacotes_por_fluxo  # pacotes seguidos na mesma 5-tupla (transferências)
+
+    def exportar(self):
+        return dict(vars(self))
+
+
+def _sorteador_portas(aleatorio, distribuicao):
+    """Retorna uma função que sorteia 'k' portas de destino"""
+    if distribuicao == 'comuns':
+        portas = [porta for porta, _ in PORTAS_COMUNS]
+        pesos = [peso for _, peso in PORTAS_COMUNS]
+        return lambda k: aleatorio.choices(portas, weights=pesos, k=k)
+    if distribuicao == 'zipf':
+        # Portas 1..1024 com peso 1/posição: poucas portas concentram o tráfego
+        portas = list(range(1, 1025))
+        aleatorio.shuffle(portas)
+        acumulado = []
+        soma = 0.0
+        for posicao in range(1, len(portas) + 1):
+            soma += 1.0 / posicao
+            acumulado.append(soma)
+        return lambda k: aleatorio.choices(portas, cum_weights=acumulado, k=k)
+    if distribuicao == 'uniforme':
+        return lambda k: [aleatorio.randint(1, 65535) for _ in range(k)]
+    raise ValueError(f"Distribuição de portas inválida: {distribuicao} (use {', '.join(DISTRIBUICOES)})")
+
+
+def _eventos_scans(config, aleatorio, duracao_us):
+    """Eventos de todos os scans, ordenados por tempo, e os IPs dos scanners"""
+    eventos = []
+    scanners = []
+    passo = int(config.intervalo_scan * ingestao.MICROS)
+    for indice in range(config.scans):
+        origem = ip_scanner(indice)
+        destino = ip_origem(config.ips + aleatorio.randrange(config.servidores))
+        scanners.append(ip_texto(origem))
+        inicio = aleatorio.randrange(max(1, duracao_us - passo * config.portas_scan))
+        portas = aleatorio.sample(range(1, 65536), config.portas_scan)
+        porta_origem = aleatorio.randint(32768, 60999)
+        for i, porta in enumerate(portas):
+            eventos.append((inicio + i * passo, origem, porta_origem, destino, porta, True))
+    eventos.sort()
+    return eventos, scanners
+
+
+def gerar_eventos(config):
+    """
+    Gera (timestamp_us relativo, ip_origem, porta_origem, ip_destino, porta_destino, inicio_fluxo)
+    em ordem de tempo, com IPs como inteiros; inicio_fluxo marca o primeiro pacote de cada fluxo
+    (SYN no TCP, os seguintes são ACK). Retorna (gerador, scanners).
+    """
+    aleatorio = random.Random(config.semente)
+    normais = config.pacotes - config.scans * config.portas_scan
+    if normais < 0:
+        raise ValueError("Pacotes insuficientes para os scans pedidos (scans * portas_scan > pacotes)")
+
+    duracao_us = int(normais / config.taxa * ingestao.MICROS)
+    scans, scanners = _eventos_scans(config, aleatorio, duracao_us)
+    sortear_portas = _sorteador_portas(aleatorio, config.portas)
+
+    # Poucos IPs concentram a maior parte do tráfego (peso 1/posição)
+    acumulado = []
+    soma = 0.0
+    for posicao in range(1, config.ips + 1):
+        soma += 1.0 / posicao
+        acumulado.append(soma)
+    origens = range(config.ips)
+
+    def eventos():
+        tempo = 0.0
+        media_us = ingestao.MICROS / config.taxa
+        por_fluxo = max(1, config.pacotes_por_fluxo)
+        proximo_scan = 0
+        restantes = normais
+        while restantes:
+            bloco = min(-(-restantes // por_fluxo), 10000)
+            ips = aleatorio.choices(origens, cum_weights=acumulado, k=bloco)
+            portas = sortear_portas(bloco)
+            for indice, porta in zip(ips, portas):
+                destino = ip_origem(config.ips + indice % config.servidores)
+                porta_origem = None
+                for _ in range(min(por_fluxo, restantes)):
+                    tempo += aleatorio.expovariate(1.0) * media_us
+                    timestamp = int(tempo)
+                    while proximo_scan < len(scans) and scans[proximo_scan][0] <= timestamp:
+                        yield scans[proximo_scan]
+                        proximo_scan += 1
+                    inicio_fluxo = porta_origem is None
+                    if inicio_fluxo:
+                        porta_origem = 32768 + (indice * 7919 + timestamp) % 28232
+                    restantes -= 1
+                    yield timestamp, ip_origem(indice), porta_origem, destino, porta, inicio_fluxo
+        yield from scans[proximo_scan:]
+
+    return eventos(), scanners
+
+
+def _hora_delta(delta_us):
+    segundos, micros = divmod(delta_us, ingestao.MICROS)
+    minutos, segundos = divmod(segundos, 60)
+    horas, minutos = divmod(minutos, 60)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d}.{micros:06d}"
+
+
+def escrever_texto(caminho, eventos, formato_tempo='ttt'):
+    """Escreve no formato de 'tcpdump -nn -ttt' (delta) ou '-tt' (epoch)"""
+    anterior = 0
+    base = EPOCH_INICIAL * ingestao.MICROS
+    total = 0
+    with compressao.abrir(caminho, 'w') as f:
+        escrever = f.write
+        for timestamp, origem, porta_origem, destino, porta, inicio_fluxo in eventos:
+            if formato_tempo == 'ttt':
+                tempo = _hora_delta(timestamp - anterior)
+                anterior = timestamp
+            else:
+                segundos, micros = divmod(base + timestamp, ingestao.MICROS)
+                tempo = f"{segundos}.{micros:06d}"
+            if porta in PORTAS_UDP:
+                resto = "UDP, length 32"
+            elif inicio_fluxo:
+                resto = "Flags [S], seq 0, win 64240, length 0"
+            else:
+                resto = "Flags [.], ack 1, win 64240, length 1448"
+            escrever(f" {tempo} IP {ip_texto(origem)}.{porta_origem} > "
+                     f"{ip_texto(destino)}.{porta}: {resto}\n")
+            total += 1
+    return total
+
+
+def escrever_pcap(caminho, eventos):
+    """
+    Escreve um pcap Ethernet (microssegundos) com pacotes TCP / UDP mínimos: o primeiro pacote
+    de cada fluxo é SYN, os seguintes são ACK com 1448 bytes declarados no IPv4 (sem a carga,
+    como numa captura com snaplen pequeno)
+    """
+    ethernet = b'\x00\x00\x00\x00\x00\x02' + b'\x00\x00\x00\x00\x00\x01' + b'\x08\x00'
+    cabecalho = struct.Struct('<IIII')
+    ip = struct.Struct('!BBHHHBBHII')
+    tcp = struct.Struct('!HHIIBBHHH')
+    udp = struct.Struct('!HHHH')
+    base = EPOCH_INICIAL * ingestao.MICROS
+    total = 0
+    with compressao.abrir(caminho, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1))
+        escrever = f.write
+        for timestamp, origem, porta_origem, destino, porta, inicio_fluxo in eventos:
+            carga = 0
+            if porta in PORTAS_UDP:
+                transporte = udp.pack(porta_origem, porta, 8, 0)
+                protocolo = 17
+            else:
+                flags = 0x02 if inicio_fluxo else 0x10
+                carga = 0 if inicio_fluxo else 1448
+                transporte = tcp.pack(porta_origem, porta, 0, 0, 0x50, flags, 64240, 0, 0)
+                protocolo = 6
+            pacote = (ethernet + ip.pack(0x45, 0, 20 + len(transporte) + carga, 0, 0, 64, protocolo, 0,
+                                         origem, destino) + transporte)
+            segundos, micros = divmod(base + timestamp, ingestao.MICROS)
+            escrever(cabecalho.pack(segundos, micros, len(pacote), len(pacote) + carga))
+            escrever(pacote)
+            total += 1
+    return total
+
+
+def gerar_arquivo(caminho, config, formato='texto', formato_tempo='ttt'):
+    """Gera o arquivo e o gabarito <caminho>.verdade.json; retorna o gabarito"""
+    eventos, scanners = gerar_eventos(config)
+    if formato == 'pcap':
+        total = escrever_pcap(caminho, eventos)
+    else:
+        total = escrever_texto(caminho, eventos, formato_tempo)
+
+    verdade = {
+        'arquivo': caminho,
+        'formato': formato,
+        'pacotes': total,
+        'scanners': scanners,
+        'configuracao': config.exportar(),
+    }
+    with open(caminho + '.verdade.json', 'w') as f:
+        json.dump(verdade, f, indent=2)
+    return verdade
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera tráfego sintético no formato do tcpdump")
+    parser.add_argument('--pacotes', type=int, default=100000, help="total de pacotes (1K a 50M)")
+    parser.add_argument('--formato', choices=('texto', 'pcap'), default='texto')
+    parser.add_argument('--tempo', choices=('ttt', 'tt'), default='ttt',
+                        help="formato do timestamp no texto: delta (-ttt) ou epoch (-tt)")
+    parser.add_argument('--ips', type=int, default=1000, help="IPs de origem distintos")
+    parser.add_argument('--servidores', type=int, default=256, help="IPs de destino distintos")
+    parser.add_argument('--portas', choices=DISTRIBUICOES, default='comuns',
+                        help="distribuição das portas de destino do tráfego normal")
+    parser.add_argument('--scans', type=int, default=10, help="port scans verticais injetados")
+    parser.add_argument('--portas-scan', type=int, default=100, help="portas distintas por scan")
+    parser.add_argument('--intervalo-scan', type=float, default=0.01,
+                        help="segundos entre pacotes de um scan")
+    parser.add_argument('--taxa', type=float, default=1000.0, help="pacotes por segundo")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--pacotes-por-fluxo', type=int, default=1,
+                        help="pacotes seguidos na mesma 5-tupla (1 = cada pacote é um fluxo; 1000 = transferências)")
+    parser.add_argument('--saida', default=None, help="arquivo de saída (padrão: sintetico.txt/.pcap; .gz, .xz ou .zst grava comprimido)")
+    args = parser.parse_args(argv)
+
+    config = ConfiguracaoGerador(args.pacotes, args.ips, args.servidores, args.portas, args.scans,
+                                 args.portas_scan, args.intervalo_scan, args.taxa, args.semente,
+                                 args.pacotes_por_fluxo)
+    saida = args.saida or ('sintetico.pcap' if args.formato == 'pcap' else 'sintetico.txt')
+    try:
+        verdade = gerar_arquivo(saida, config, args.formato, args.tempo)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✅ {verdade['pacotes']} pacotes gravados em {saida} "
+          f"({len(verdade['scanners'])} scans injetados, gabarito em {saida}.verdade.json)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
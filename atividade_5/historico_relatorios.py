@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Histórico de relatórios em SQLite
+Cada análise vira uma execução; por execução ficam as contagens por IP (com a flag e o momento do
+port scan) e as contagens por IP em baldes de LARGURA_BALDE_S segundos do horário do tráfego.
+Os índices (execução, IP, balde, flag) respondem consultas como "top 20 IPs da última hora" ou
+"scanners nas últimas 30 execuções" sem carregar relatórios inteiros.
+Os agregados de tempo (agregados_tempo.py) ficam fora das execuções: cada (resolução, balde, IP)
+é uma linha só, que as execuções seguintes completam (pacotes somados, esboços unidos).
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import agregados_tempo
+import ingestao
+
+LARGURA_BALDE_S = 60
+
+EPOCH_MINIMO_S = ingestao.EPOCH_MINIMO_S
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS execucoes (
+    id INTEGER PRIMARY KEY,
+    inicio REAL NOT NULL,
+    comando TEXT,
+    arquivo TEXT,
+    janela_s REAL,
+    limite INTEGER,
+    ips INTEGER,
+    portscans INTEGER
+);
+CREATE TABLE IF NOT EXISTS ips (
+    execucao INTEGER NOT NULL REFERENCES execucoes(id) ON DELETE CASCADE,
+    ip TEXT NOT NULL,
+    eventos INTEGER NOT NULL,
+    erro INTEGER NOT NULL DEFAULT 0,
+    portscan INTEGER NOT NULL,
+    momento INTEGER,
+    PRIMARY KEY (execucao, ip)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ips_por_eventos ON ips(execucao, eventos DESC);
+CREATE INDEX IF NOT EXISTS ips_por_portscan ON ips(portscan, execucao);
+CREATE INDEX IF NOT EXISTS ips_por_ip ON ips(ip, execucao);
+CREATE TABLE IF NOT EXISTS baldes (
+    balde INTEGER NOT NULL,
+    ip TEXT NOT NULL,
+    execucao INTEGER NOT NULL REFERENCES execucoes(id) ON DELETE CASCADE,
+    eventos INTEGER NOT NULL,
+    portscan INTEGER NOT NULL,
+    PRIMARY KEY (balde, ip, execucao)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS baldes_por_execucao ON baldes(execucao);
+CREATE TABLE IF NOT EXISTS agregados (
+    resolucao INTEGER NOT NULL,
+    balde INTEGER NOT NULL,
+    ip TEXT NOT NULL,
+    pacotes INTEGER NOT NULL,
+    portas BLOB NOT NULL,
+    destinos BLOB NOT NULL,
+    PRIMARY KEY (resolucao, balde, ip)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS arquivos_agregados (
+    caminho TEXT NOT NULL,
+    tamanho INTEGER NOT NULL,
+    modificado REAL NOT NULL,
+    PRIMARY KEY (caminho, tamanho, modificado)
+) WITHOUT ROWID;
+"""
+
+# resolucao = largura do balde em segundos; balde = início do balde / resolucao
+# A chave começa pelo balde: as linhas chegam em ordem de tempo (inserção no fim da árvore) e todas
+# as consultas são por intervalo de baldes, então um índice por IP custaria mais do que economiza
+_UPSERT_AGREGADOS = (
+    "INSERT INTO agregados (resolucao, balde, ip, pacotes, portas, destinos) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (resolucao, balde, ip) DO UPDATE SET pacotes = pacotes + excluded.pacotes, "
+    "portas = mesclar_esbocos(portas, excluded.portas), "
+    "destinos = mesclar_esbocos(destinos, excluded.destinos)")
+
+# Critérios do ranking dos agregados -> expressão SQL
+CRITERIOS_AGREGADOS = {
+    'pacotes': "SUM(pacotes)",
+    'portas': "estimar_esboco(uniao_esbocos(portas))",
+    'destinos': "estimar_esboco(uniao_esbocos(destinos))",
+}
+
+
+def balde_de_segundos(segundos):
+    return int(segundos // LARGURA_BALDE_S)
+
+
+def balde_de_timestamp(timestamp_us):
+    """Balde de um timestamp da ingestão (µs), ou None se o timestamp não for epoch"""
+    segundos = ingestao.segundos(timestamp_us)
+    if segundos < EPOCH_MINIMO_S:
+        return None
+    return balde_de_segundos(segundos)
+
+
+class HistoricoRelatorios:
+    def __init__(self, caminho='historico.db'):
+        self.caminho = caminho
+        self._esquema_criado = False
+
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho)
+        conexao.execute("PRAGMA foreign_keys = ON")
+        # União e estimativa dos esboços HLL dos agregados, feitas dentro do SQLite
+        conexao.create_function('mesclar_esbocos', 2, agregados_tempo.mesclar_codificados, deterministic=True)
+        conexao.create_function('estimar_esboco', 1, agregados_tempo.estimar_codificado, deterministic=True)
+        conexao.create_aggregate('uniao_esbocos', 1, agregados_tempo.UniaoEsbocos)
+        if not self._esquema_criado:
+            # WAL: consultas não bloqueiam uma análise gravando ao mesmo tempo
+            conexao.execute("PRAGMA journal_mode = WAL")
+            conexao.executescript(ESQUEMA)
+            self._esquema_criado = True
+        return conexao
+
+    def salvar_execucao(self, comando, eventos_por_ip, portscan_detectado, erros=None,
+                        baldes=None, arquivo=None, janela_s=None, limite=None, inicio=None):
+        """
+        Grava uma execução e retorna o seu id
+        baldes mapeia (ip, balde) -> eventos; sem ele (ou com timestamps relativos) as contagens
+        de cada IP vão para o balde do início da execução
+        """
+        inicio = time.time() if inicio is None else inicio
+        erros = erros or {}
+        with closing(self._conectar()) as conexao, conexao:
+            cursor = conexao.execute(
+                "INSERT INTO execucoes (inicio, comando, arquivo, janela_s, limite, ips, portscans) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (inicio, comando, arquivo, janela_s, limite, len(eventos_por_ip), len(portscan_detectado)))
+            execucao = cursor.lastrowid
+
+            conexao.executemany(
+                "INSERT INTO ips (execucao, ip, eventos, erro, portscan, momento) VALUES (?, ?, ?, ?, ?, ?)",
+                ((execucao, ip, total, erros.get(ip, 0), ip in portscan_detectado, portscan_detectado.get(ip))
+                 for ip, total in eventos_por_ip.items()))
+
+            if baldes is None:
+                balde = balde_de_segundos(inicio)
+                baldes = {(ip, balde): total for ip, total in eventos_por_ip.items()}
+            conexao.executemany(
+                "INSERT INTO baldes (balde, ip, execucao, eventos, portscan) VALUES (?, ?, ?, ?, ?)",
+                ((balde, ip, execucao, total, ip in portscan_detectado)
+                 for (ip, balde), total in baldes.items()))
+        return execucao
+
+    def ultima_execucao(self):
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT id, inicio, comando, arquivo, ips, portscans FROM execucoes "
+                "ORDER BY id DESC LIMIT 1").fetchone()
+
+    def execucoes(self, quantidade=20):
+        """[(id, inicio, comando, arquivo, ips, portscans)] das execuções mais recentes"""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT id, inicio, comando, arquivo, ips, portscans FROM execucoes "
+                "ORDER BY id DESC LIMIT ?", (quantidade,)).fetchall()
+
+    def ips_da_execucao(self, execucao, quantidade=None):
+        """[(ip, eventos, erro, portscan, momento)] em ordem decrescente de eventos"""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT ip, eventos, erro, portscan, momento FROM ips WHERE execucao = ? "
+                "ORDER BY eventos DESC LIMIT ?", (execucao, -1 if quantidade is None else quantidade)).fetchall()
+
+    def top_ips(self, desde_s, ate_s=None, quantidade=20):
+        """[(ip, eventos, execuções, port scan em alguma)] no período, pelos baldes do tráfego"""
+        ate = balde_de_segundos(time.time() if ate_s is None else ate_s)
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT ip, SUM(eventos) AS total, COUNT(DISTINCT execucao), MAX(portscan) FROM baldes "
+                "WHERE balde BETWEEN ? AND ? GROUP BY ip ORDER BY total DESC LIMIT ?",
+                (balde_de_segundos(desde_s), ate, quantidade)).fetchall()
+
+    def scanners(self, ultimas_execucoes=30):
+        """[(ip, execuções em que foi detectado, primeiro momento, último momento, eventos)]"""
+        with closing(self._conectar()) as conexao:
+            primeira = conexao.execute(
+                "SELECT MIN(id) FROM (SELECT id FROM execucoes ORDER BY id DESC LIMIT ?)",
+                (ultimas_execucoes,)).fetchone()[0]
+            if primeira is None:
+                return []
+            return conexao.execute(
+                "SELECT ip, COUNT(*) AS vezes, MIN(momento), MAX(momento), SUM(eventos) FROM ips "
+                "WHERE portscan = 1 AND execucao >= ? GROUP BY ip ORDER BY vezes DESC, ip",
+                (primeira,)).fetchall()
+
+    def historico_ip(self, ip, quantidade=30):
+        """[(execução, inicio, eventos, portscan, momento)] do IP nas execuções mais recentes"""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT ips.execucao, execucoes.inicio, ips.eventos, ips.portscan, ips.momento "
+                "FROM ips JOIN execucoes ON execucoes.id = ips.execucao "
+                "WHERE ips.ip = ? ORDER BY ips.execucao DESC LIMIT ?", (ip, quantidade)).fetchall()
+
+    def remover_antigas(self, manter):
+        """Apaga as execuções além das 'manter' mais recentes; retorna quantas foram apagadas"""
+        with closing(self._conectar()) as conexao, conexao:
+            return conexao.execute(
+                "DELETE FROM execucoes WHERE id NOT IN (SELECT id FROM execucoes ORDER BY id DESC LIMIT ?)",
+                (manter,)).rowcount
+
+    def mesclar_agregados(self, linhas):
+        """Grava linhas (resolucao, balde, ip, pacotes, portas, destinos) do AgregadorTempo,
+        somando às que já existem"""
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.executemany(_UPSERT_AGREGADOS, linhas)
+
+    def aplicar_retencao(self):
+        """Apaga, em cada resolução, os baldes mais antigos que RETENCAO_S antes do mais recente"""
+        apagados = 0
+        with closing(self._conectar()) as conexao, conexao:
+            for nome, largura in agregados_tempo.RESOLUCOES.items():
+                retencao = agregados_tempo.RETENCAO_S[nome]
+                if retencao is None:
+                    continue
+                apagados += conexao.execute(
+                    "DELETE FROM agregados WHERE resolucao = ? AND balde < "
+                    "(SELECT MAX(balde) FROM agregados WHERE resolucao = ?) - ?",
+                    (largura, largura, retencao // largura)).rowcount
+        return apagados
+
+    @staticmethod
+    def _identidade_arquivo(caminho):
+        estado = os.stat(caminho)
+        return os.path.abspath(caminho), estado.st_size, estado.st_mtime
+
+    def arquivo_agregado(self, caminho):
+        """True se este arquivo, com o mesmo tamanho e data, já entrou nos agregados"""
+        with closing(self._conectar()) as conexao:
+            return conexao.execute(
+                "SELECT 1 FROM arquivos_agregados WHERE caminho = ? AND tamanho = ? AND modificado = ?",
+                self._identidade_arquivo(caminho)).fetchone() is not None
+
+    def marcar_arquivo_agregado(self, caminho):
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("INSERT OR IGNORE INTO arquivos_agregados (caminho, tamanho, modificado) "
+                            "VALUES (?, ?, ?)", self._identidade_arquivo(caminho))
+
+    def _ultimo_balde(self, conexao, largura):
+        return conexao.execute("SELECT MAX(balde) FROM agregados WHERE resolucao = ?", (largura,)).fetchone()[0]
+
+    def serie_ip(self, ip, largura, quantidade=60):
+        """
+        [(início do balde em s, pacotes, portas distintas, destinos distintos)] do IP nos
+        'quantidade' baldes mais recentes dos agregados (até o último balde gravado)
+        """
+        with closing(self._conectar()) as conexao:
+            ultimo = self._ultimo_balde(conexao, largura)
+            if ultimo is None:
+                return []
+            return conexao.execute(
+                "SELECT balde * ?, pacotes, estimar_esboco(portas), estimar_esboco(destinos) FROM agregados "
+                "WHERE resolucao = ? AND ip = ? AND balde > ? ORDER BY balde",
+                (largura, largura, ip, ultimo - quantidade)).fetchall()
+
+    def tendencia(self, largura, quantidade=60):
+        """[(início do balde em s, pacotes, IPs ativos)] dos 'quantidade' baldes mais recentes"""
+        with closing(self._conectar()) as conexao:
+            ultimo = self._ultimo_balde(conexao, largura)
+            if ultimo is None:
+                return []
+            return conexao.execute(
+                "SELECT balde * ?, SUM(pacotes), COUNT(*) FROM agregados "
+                "WHERE resolucao = ? AND balde > ? GROUP BY balde ORDER BY balde",
+                (largura, largura, ultimo - quantidade)).fetchall()
+
+    def top_agregados(self, largura, segundos, criterio='pacotes', quantidade=20):
+        """
+        [(ip, pacotes, portas distintas, destinos distintos)] nos últimos 'segundos' dos agregados,
+        ordenado por 'criterio' (pacotes, portas ou destinos; os distintos unem os esboços do período)
+        """
+        ordem = CRITERIOS_AGREGADOS[criterio]
+        with closing(self._conectar()) as conexao:
+            ultimo = self._ultimo_balde(conexao, largura)
+            if ultimo is None:
+                return []
+            return conexao.execute(
+                "SELECT ip, SUM(pacotes), estimar_esboco(uniao_esbocos(portas)), "
+                "estimar_esboco(uniao_esbocos(destinos)) FROM agregados "
+                f"WHERE resolucao = ? AND balde > ? GROUP BY ip ORDER BY {ordem} DESC, ip LIMIT ?",
+                (largura, ultimo - max(1, int(segundos // largura)), quantidade)).fetchall()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Camada de ingestão: base de tempo única para todas as janelas de análise
+Converte os timestamps do tcpdump (texto ou pcap) em microssegundos absolutos,
+inteiros e monotônicos
+"""
+
+import io
+
+import compressao
+import leitor_pcap
+import parser_tcpdump
+
+MICROS = 1_000_000
+
+# Abaixo de ~3 anos em microssegundos o valor não pode ser um epoch (-tt) real
+_LIMITE_EPOCH_US = 10 ** 14
+
+# Timestamps abaixo disso (em segundos) são relativos ao início da captura (-ttt), não epoch
+EPOCH_MINIMO_S = 1e9
+
+# Formatos de timestamp aceitos (flags equivalentes do tcpdump)
+MODOS = ('auto', 'tt', 'ttt', 'ttttt', 'hora')
+
+
+class RelogioIngestao:
+    """
+    Transforma o timestamp parseado (em microssegundos) em tempo absoluto monotônico
+      tt    -> epoch, usado como está (também é o caso do pcap)
+      ttt   -> delta desde o pacote anterior, acumulado a partir de 'origem_us'
+      ttttt -> delta desde o primeiro pacote, somado a 'origem_us'
+      hora  -> hora do dia (sem -t), com virada de meia-noite
+      auto  -> epoch se o valor for grande, senão delta (-ttt, formato histórico do trafego.txt)
+    """
+
+    __slots__ = ('modo', 'origem', 'acumulado', 'ultimo', 'dias')
+
+    def __init__(self, modo='auto', origem_us=0):
+        if modo not in MODOS:
+            raise ValueError(f"Modo de timestamp inválido: {modo} (use {', '.join(MODOS)})")
+        self.modo = modo
+        self.origem = origem_us
+        self.acumulado = 0
+        self.ultimo = None
+        self.dias = 0
+
+    def exportar(self):
+        """Estado do relógio para checkpoint (ver analise_incremental.py)"""
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    @classmethod
+    def restaurar(cls, estado):
+        relogio = cls(estado['modo'], estado['origem'])
+        for campo in cls.__slots__:
+            setattr(relogio, campo, estado[campo])
+        return relogio
+
+    def converter(self, valor_us):
+        modo = self.modo
+        if modo == 'auto':
+            # Decide no primeiro valor e mantém o modo para o restante do arquivo
+            modo = self.modo = 'tt' if valor_us >= _LIMITE_EPOCH_US else 'ttt'
+
+        if modo == 'tt':
+            absoluto = valor_us
+        elif modo == 'ttt':
+            self.acumulado += valor_us
+            absoluto = self.origem + self.acumulado
+        elif modo == 'ttttt':
+            absoluto = self.origem + valor_us
+        else:
+            absoluto = self.origem + self.dias * 86400 * MICROS + valor_us
+            # Voltou mais de 12h: passou da meia-noite
+            if self.ultimo is not None and self.ultimo - absoluto > 43200 * MICROS:
+                self.dias += 1
+                absoluto += 86400 * MICROS
+
+        # Nunca anda para trás (pacotes fora de ordem entre CPUs, ajustes de relógio)
+        ultimo = self.ultimo
+        if ultimo is not None and absoluto < ultimo:
+            absoluto = ultimo
+        self.ultimo = absoluto
+        return absoluto
+
+
+def eventos_de_linhas(linhas, modo='auto', origem_us=0, falhas=None):
+    """
+    Parseia linhas do tcpdump; gera dicts com timestamp absoluto (µs) ou None para linhas ignoradas
+    Se 'falhas' (Counter) for passado, conta as linhas ignoradas por tipo (parser_tcpdump.tipo_linha)
+    """
+    relogio = RelogioIngestao(modo, origem_us)
+    parse = parser_tcpdump.parse_linha
+    for linha in linhas:
+        dados = parse(linha)
+        if dados:
+            dados['timestamp'] = relogio.converter(dados['timestamp'])
+        elif falhas is not None:
+            falhas[parser_tcpdump.tipo_linha(linha)] += 1
+        yield dados
+
+
+def eventos_de_pcap(caminho, falhas=None):
+    """Lê um pcap/pcapng; gera dicts com timestamp absoluto (µs) monotônico"""
+    relogio = RelogioIngestao('tt')
+    for dados in leitor_pcap.ler_pacotes(caminho, falhas):
+        dados['timestamp'] = relogio.converter(dados['timestamp'])
+        yield dados
+
+
+def eventos_de_stream_pcap(fp):
+    """Lê um pcap de um fluxo (stdout do tcpdump); gera dicts com timestamp absoluto (µs)"""
+    relogio = RelogioIngestao('tt')
+    for dados in leitor_pcap.ler_pacotes_stream(fp):
+        dados['timestamp'] = relogio.converter(dados['timestamp'])
+        yield dados
+
+
+def eventos_de_arquivo(caminho, modo='auto', falhas=None):
+    """
+    Detecta o formato do arquivo (pcap/pcapng ou texto) e gera os eventos com tempo absoluto
+    Arquivos comprimidos (gzip/xz/zstd) são descomprimidos em blocos durante a leitura
+    """
+    if compressao.detectar(caminho):
+        yield from _eventos_comprimidos(caminho, modo, falhas)
+        return
+
+    if leitor_pcap.e_pcap(caminho):
+        yield from eventos_de_pcap(caminho, falhas)
+        return
+
+    with open(caminho, 'r') as f:
+        yield from eventos_de_linhas(f, modo, falhas=falhas)
+
+
+def e_captura_pcap(caminho):
+    """pcap/pcapng, comprimido ou não (lê só o cabeçalho)"""
+    if compressao.detectar(caminho):
+        with compressao.abrir(caminho, 'rb') as fp:
+            return leitor_pcap.e_cabecalho_pcap(fp.peek(4)[:4])
+    return leitor_pcap.e_pcap(caminho)
+
+
+def _eventos_comprimidos(caminho, modo, falhas):
+    with compressao.abrir(caminho, 'rb') as fp:
+        if leitor_pcap.e_cabecalho_pcap(fp.peek(4)[:4]):
+            relogio = RelogioIngestao('tt')
+            for dados in leitor_pcap.ler_pacotes_blocos(fp, falhas):
+                dados['timestamp'] = relogio.converter(dados['timestamp'])
+                yield dados
+            return
+
+        linhas = io.TextIOWrapper(fp, encoding='utf-8', errors='replace')
+        yield from eventos_de_linhas(linhas, modo, falhas=falhas)
+
+
+def segundos(timestamp_us):
+    """Converte microssegundos para segundos (float), para exibição"""
+    return timestamp_us / MICROS
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Descoberta de interfaces e da rota padrão sem subprocessos (não depende do iproute2)
+  /proc/net/dev      -> nomes e contadores das interfaces
+  /sys/class/net     -> estado (operstate/flags) e MAC
+  /proc/net/if_inet6 -> endereços IPv6
+  ioctl SIOCGIFADDR  -> endereço IPv4 principal
+  /proc/net/route    -> rota padrão
+O resultado fica em cache na sessão; atualizar=True relê tudo.
+"""
+
+import fcntl
+import ipaddress
+import socket
+import struct
+
+SIOCGIFADDR = 0x8915
+IFF_UP = 0x1
+
+# Flags de rota (linux/route.h)
+RTF_UP = 0x1
+RTF_GATEWAY = 0x2
+
+# Escopo do IPv6 em /proc/net/if_inet6 (0x00 = global)
+ESCOPO_GLOBAL_IPV6 = 0x00
+
+_CACHE = {}
+
+
+def _ler(caminho, padrao=''):
+    try:
+        with open(caminho) as f:
+            return f.read().strip()
+    except OSError:
+        return padrao
+
+
+def _contadores():
+    """nome -> {rx_bytes, rx_pacotes, rx_descartes, tx_bytes, tx_pacotes} de /proc/net/dev"""
+    contadores = {}
+    for linha in _ler('/proc/net/dev').splitlines()[2:]:  # Duas linhas de cabeçalho
+        nome, _, valores = linha.partition(':')
+        campos = valores.split()
+        if len(campos) < 16:
+            continue
+        contadores[nome.strip()] = {
+            'rx_bytes': int(campos[0]), 'rx_pacotes': int(campos[1]), 'rx_descartes': int(campos[3]),
+            'tx_bytes': int(campos[8]), 'tx_pacotes': int(campos[9]),
+        }
+    return contadores
+
+
+def _ipv4(nome):
+    """Endereço IPv4 principal da interface (ioctl), ou None"""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            resposta = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', nome[:15].encode()))
+        except OSError:
+            return None
+    return socket.inet_ntoa(resposta[20:24])
+
+
+def _ipv6_globais():
+    """nome -> [endereços IPv6 de escopo global] de /proc/net/if_inet6"""
+    enderecos = {}
+    for linha in _ler('/proc/net/if_inet6').splitlines():
+        campos = linha.split()
+        if len(campos) < 6 or int(campos[3], 16) != ESCOPO_GLOBAL_IPV6:
+            continue
+        endereco = str(ipaddress.IPv6Address(bytes.fromhex(campos[0])))
+        enderecos.setdefault(campos[5], []).append(endereco)
+    return enderecos
+
+
+def _estado(nome):
+    """'UP' ou 'DOWN'; operstate 'unknown' (loopback, túneis) conta como UP se a flag IFF_UP estiver ligada"""
+    operstate = _ler(f'/sys/class/net/{nome}/operstate', 'unknown')
+    if operstate == 'up':
+        return 'UP'
+    if operstate == 'unknown' and int(_ler(f'/sys/class/net/{nome}/flags', '0x0'), 16) & IFF_UP:
+        return 'UP'
+    return 'DOWN'
+
+
+def listar_interfaces(atualizar=False):
+    """
+    Lista de dicts {nome, estado, mac, ipv4, ipv6, contadores}, no formato que o
+    verificar_interfaces usava ao ler o 'ip addr show' (IPv4/IPv6 só de escopo global)
+    """
+    if atualizar or 'interfaces' not in _CACHE:
+        ipv6 = _ipv6_globais()
+        interfaces = []
+        for nome, contadores in _contadores().items():
+            mac = _ler(f'/sys/class/net/{nome}/address')
+            ipv4 = _ipv4(nome)
+            interfaces.append({
+                'nome': nome,
+                'estado': _estado(nome),
+                'mac': '' if mac == '00:00:00:00:00:00' else mac,
+                'ipv4': [ipv4] if ipv4 and not ipaddress.IPv4Address(ipv4).is_loopback else [],
+                'ipv6': ipv6.get(nome, []),
+                'contadores': contadores,
+            })
+        _CACHE['interfaces'] = interfaces
+    return _CACHE['interfaces']
+
+
+def rota_padrao(atualizar=False):
+    """(interface, gateway) da rota padrão de menor métrica em /proc/net/route, ou None"""
+    if atualizar or 'rota' not in _CACHE:
+        melhor = None
+        for linha in _ler('/proc/net/route').splitlines()[1:]:
+            campos = linha.split()
+            if len(campos) < 8 or campos[1] != '00000000' or campos[7] != '00000000':
+                continue
+            flags = int(campos[3], 16)
+            if not flags & RTF_UP:
+                continue
+            metrica = int(campos[6])
+            # Endereços em /proc/net/route estão em hexadecimal na ordem do host (little-endian)
+            gateway = socket.inet_ntoa(struct.pack('<I', int(campos[2], 16))) if flags & RTF_GATEWAY else None
+            if melhor is None or metrica < melhor[0]:
+                melhor = (metrica, campos[0], gateway)
+        _CACHE['rota'] = melhor[1:] if melhor else None
+    return _CACHE['rota']
+
+
+def interface_padrao(atualizar=False):
+    """Interface da rota padrão; sem rota, a primeira interface UP que não seja loopback"""
+    rota = rota_padrao(atualizar)
+    if rota:
+        return rota[0]
+    for interface in listar_interfaces(atualizar):
+        if interface['estado'] == 'UP' and interface['nome'] != 'lo':
+            return interface['nome']
+    return None
@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Leitor nativo de arquivos pcap/pcapng
+Decodifica cabeçalhos Ethernet/IPv4/TCP/UDP direto do arquivo capturado,
+sem passar pelo 'tcpdump -r' e pela conversão para texto
+"""
+
+import mmap
+import socket
+import struct
+
+# Magic numbers do formato pcap clássico (microssegundos / nanossegundos)
+PCAP_MAGIC_US = 0xa1b2c3d4
+PCAP_MAGIC_NS = 0xa1b23c4d
+
+# Tipos de bloco do pcapng
+PCAPNG_SHB = 0x0A0D0D0A
+PCAPNG_IDB = 0x00000001
+PCAPNG_SPB = 0x00000003
+PCAPNG_EPB = 0x00000006
+PCAPNG_BYTE_ORDER = 0x1A2B3C4D
+
+# Tipos de enlace suportados
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_RAW_ALT = 12
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_LINUX_SLL2 = 276
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = (0x8100, 0x88a8)
+
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+# Structs pré-compiladas para os cabeçalhos de rede (sempre big-endian)
+_U16 = struct.Struct('!H')
+_PORTAS = struct.Struct('!HH')
+_IPV4 = struct.Struct('!BxHxxHBBxx4s4s')
+
+
+def e_cabecalho_pcap(cabecalho):
+    """Verifica se os 4 primeiros bytes são o magic de um pcap ou pcapng"""
+    if len(cabecalho) < 4:
+        return False
+
+    for ordem in ('<', '>'):
+        magic = struct.unpack(ordem + 'I', cabecalho)[0]
+        if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS, PCAPNG_SHB):
+            return True
+    return False
+
+
+def e_pcap(caminho):
+    """Verifica pelos magic bytes se o arquivo é pcap ou pcapng (sem compressão)"""
+    try:
+        with open(caminho, 'rb') as f:
+            cabecalho = f.read(4)
+    except OSError:
+        return False
+    return e_cabecalho_pcap(cabecalho)
+
+
+def _offset_ip(buf, inicio, fim, linktype):
+    """Retorna o offset do cabeçalho IPv4 dentro do quadro, ou -1 se não for IPv4"""
+    if linktype == LINKTYPE_ETHERNET:
+        if fim - inicio < 14:
+            return -1
+        offset = inicio + 12
+        ethertype = _U16.unpack_from(buf, offset)[0]
+        # Pula tags VLAN (802.1Q / 802.1ad)
+        while ethertype in ETHERTYPE_VLAN and fim >= offset + 6:
+            offset += 4
+            ethertype = _U16.unpack_from(buf, offset)[0]
+        return offset + 2 if ethertype == ETHERTYPE_IPV4 else -1
+
+    if linktype in (LINKTYPE_RAW, LINKTYPE_RAW_ALT):
+        return inicio if fim > inicio and (buf[inicio] >> 4) == 4 else -1
+
+    if linktype == LINKTYPE_LINUX_SLL:
+        if fim - inicio < 16:
+            return -1
+        return inicio + 16 if _U16.unpack_from(buf, inicio + 14)[0] == ETHERTYPE_IPV4 else -1
+
+    if linktype == LINKTYPE_LINUX_SLL2:
+        if fim - inicio < 20:
+            return -1
+        return inicio + 20 if _U16.unpack_from(buf, inicio)[0] == ETHERTYPE_IPV4 else -1
+
+    if linktype == LINKTYPE_NULL:
+        # Família AF_INET = 2, em qualquer ordem de bytes
+        if fim - inicio < 4:
+            return -1
+        return inicio + 4 if buf[inicio] == 2 or buf[inicio + 3] == 2 else -1
+
+    return -1
+
+
+def decodificar_pacote(buf, inicio, fim, linktype):
+    """
+    Decodifica o quadro buf[inicio:fim] e retorna
+    (ip_origem, porta_origem, ip_destino, porta_destino, protocolo, tamanho, flags)
+    tamanho é o comprimento total do IPv4 (não depende do snaplen); flags são as do TCP (0 no UDP)
+    Retorna None para pacotes que não são IPv4 TCP/UDP (ou fragmentos sem cabeçalho L4)
+    """
+    offset = _offset_ip(buf, inicio, fim, linktype)
+    if offset < 0 or fim < offset + 20:
+        return None
+
+    versao_ihl, tamanho, fragmento, _, protocolo, origem, destino = _IPV4.unpack_from(buf, offset)
+    if versao_ihl >> 4 != 4 or protocolo not in (PROTO_TCP, PROTO_UDP):
+        return None
+
+    # Fragmentos diferentes do primeiro não carregam as portas
+    if fragmento & 0x1FFF:
+        return None
+
+    offset_l4 = offset + (versao_ihl & 0x0F) * 4
+    if fim < offset_l4 + 4:
+        return None
+
+    porta_origem, porta_destino = _PORTAS.unpack_from(buf, offset_l4)
+    flags = buf[offset_l4 + 13] if protocolo == PROTO_TCP and fim > offset_l4 + 13 else 0
+    return (socket.inet_ntoa(origem), porta_origem,
+            socket.inet_ntoa(destino), porta_destino, protocolo, tamanho, flags)
+
+
+def _registros_pcap(buf, ordem, nanossegundos, estado=None):
+    """
+    Gera (timestamp_us, linktype, inicio, fim) de cada registro de um pcap clássico
+    Com 'estado' (leitura em blocos), começa em estado['offset'] e guarda lá onde parou
+    e o linktype do cabeçalho global, que só existe no primeiro bloco
+    """
+    if estado is None or 'linktype' not in estado:
+        linktype = struct.unpack_from(ordem + 'I', buf, 20)[0] & 0x0FFFFFFF
+        offset = 24
+        if estado is not None:
+            estado['linktype'] = linktype
+    else:
+        linktype = estado['linktype']
+        offset = estado['offset']
+    registro = struct.Struct(ordem + 'IIII')
+    divisor = 1000 if nanossegundos else 1
+
+    tamanho = len(buf)
+    while offset + 16 <= tamanho:
+        ts_seg, ts_frac, capturado, _ = registro.unpack_from(buf, offset)
+        if offset + 16 + capturado > tamanho:
+            break  # Registro truncado no final do arquivo (ou do bloco)
+        offset += 16
+        yield ts_seg * 1000000 + ts_frac // divisor, linktype, offset, offset + capturado
+        offset += capturado
+    if estado is not None:
+        estado['offset'] = offset
+
+
+def _registros_pcapng(buf, estado=None):
+    """
+    Gera (timestamp_us, linktype, inicio, fim) de cada pacote de um pcapng
+    Com 'estado' (leitura em blocos), a ordem de bytes, as interfaces e o offset onde parou
+    passam de um bloco para o outro
+    """
+    tamanho = len(buf)
+    if estado is None or 'interfaces' not in estado:
+        offset = 0
+        ordem = '<'
+        interfaces = []  # (linktype, unidades de timestamp por segundo)
+    else:
+        offset = estado['offset']
+        ordem = estado['ordem']
+        interfaces = estado['interfaces']
+
+    while offset + 12 <= tamanho:
+        tipo = struct.unpack_from(ordem + 'I', buf, offset)[0]
+
+        if tipo == PCAPNG_SHB:
+            # A ordem de bytes é definida por cada Section Header Block
+            magic = struct.unpack_from('<I', buf, offset + 8)[0]
+            ordem = '<' if magic == PCAPNG_BYTE_ORDER else '>'
+            interfaces = []
+
+        tamanho_bloco = struct.unpack_from(ordem + 'I', buf, offset + 4)[0]
+        if tamanho_bloco < 12 or offset + tamanho_bloco > tamanho:
+            break
+        corpo = offset + 8
+
+        if tipo == PCAPNG_IDB:
+            linktype = struct.unpack_from(ordem + 'H', buf, corpo)[0]
+            resolucao = 10 ** 6
+            # Procura a opção if_tsresol (código 9) na lista de opções
+            pos = corpo + 8
+            fim = offset + tamanho_bloco - 4
+            while pos + 4 <= fim:
+                codigo, tam_opcao = struct.unpack_from(ordem + 'HH', buf, pos)
+                if codigo == 0:
+                    break
+                if codigo == 9 and tam_opcao >= 1:
+                    valor = buf[pos + 4]
+                    if valor & 0x80:
+                        resolucao = 2 ** (valor & 0x7F)
+                    else:
+                        resolucao = 10 ** valor
+                pos += 4 + ((tam_opcao + 3) & ~3)
+            interfaces.append((linktype, resolucao))
+
+        elif tipo == PCAPNG_EPB:
+            id_iface, ts_alto, ts_baixo, capturado, _ = struct.unpack_from(ordem + 'IIIII', buf, corpo)
+            if id_iface < len(interfaces):
+                linktype, resolucao = interfaces[id_iface]
+                inicio = corpo + 20
+                timestamp = ((ts_alto << 32) | ts_baixo) * 1000000 // resolucao
+                yield timestamp, linktype, inicio, inicio + capturado
+
+        elif tipo == PCAPNG_SPB and interfaces:
+            # Simple Packet Block não tem timestamp nem comprimento capturado
+            linktype, _ = interfaces[0]
+            original = struct.unpack_from(ordem + 'I', buf, corpo)[0]
+            inicio = corpo + 4
+            capturado = min(original, offset + tamanho_bloco - 4 - inicio)
+            yield 0, linktype, inicio, inicio + capturado
+
+        offset += tamanho_bloco
+    if estado is not None:
+        estado.update(offset=offset, ordem=ordem, interfaces=interfaces)
+
+
+def _leitor_registros(buf):
+    """Identifica o formato pelo magic number; retorna a função leitor(buf, estado=None)"""
+    for ordem in ('<', '>'):
+        magic = struct.unpack_from(ordem + 'I', buf, 0)[0]
+        if magic == PCAP_MAGIC_US:
+            return lambda b, estado=None: _registros_pcap(b, ordem, False, estado)
+        if magic == PCAP_MAGIC_NS:
+            return lambda b, estado=None: _registros_pcap(b, ordem, True, estado)
+
+    if struct.unpack_from('<I', buf, 0)[0] == PCAPNG_SHB:
+        return _registros_pcapng
+
+    raise ValueError("Formato de captura desconhecido (esperado pcap ou pcapng)")
+
+
+def _registros(buf):
+    """Identifica o formato pelo magic number e delega para o leitor correto"""
+    if len(buf) < 24:
+        return iter(())
+    return _leitor_registros(buf)(buf)
+
+
+def _evento(timestamp, pacote):
+    """Dicionário no formato de AnalisadorTrafego.parse_linha a partir da tupla de decodificar_pacote"""
+    ip_origem, porta_origem, ip_destino, porta_destino, protocolo, tamanho, flags = pacote
+    return {
+        'timestamp': timestamp,
+        'ip_origem': ip_origem,
+        'porta_origem': porta_origem,
+        'ip_destino': ip_destino,
+        'porta_destino': porta_destino,
+        'protocolo': protocolo,
+        'tamanho': tamanho,
+        'flags': flags
+    }
+
+
+def _pacotes(buf, registros, falhas):
+    """Decodifica os registros em dicionários no formato de AnalisadorTrafego.parse_linha"""
+    for timestamp, linktype, inicio, fim in registros:
+        pacote = decodificar_pacote(buf, inicio, fim, linktype)
+        if pacote is None:
+            if falhas is not None:
+                falhas['pcap_nao_ipv4_tcp_udp'] += 1
+            continue
+
+        yield _evento(timestamp, pacote)
+
+
+def ler_pacotes(caminho, falhas=None):
+    """
+    Lê um arquivo pcap/pcapng usando um buffer mapeado em memória
+    Gera dicionários no mesmo formato de AnalisadorTrafego.parse_linha (timestamp em µs)
+    Se 'falhas' (Counter) for passado, conta os pacotes que não são IPv4 TCP/UDP
+    """
+    with open(caminho, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # Arquivo vazio não pode ser mapeado
+
+    with buf:
+        yield from _pacotes(buf, _registros(buf), falhas)
+
+
+def ler_pacotes_blocos(fp, falhas=None, tamanho_bloco=1 << 22):
+    """
+    Lê um pcap/pcapng de qualquer objeto com read() (ex: arquivo sendo descomprimido) em blocos
+    de 'tamanho_bloco' bytes; o registro que cruza o fim de um bloco é completado com o próximo
+    Gera dicionários no mesmo formato de ler_pacotes
+    """
+    buf = bytearray(fp.read(tamanho_bloco))
+    if len(buf) < 24:
+        return
+    leitor = _leitor_registros(buf)
+    estado = {}
+    while True:
+        yield from _pacotes(buf, leitor(buf, estado), falhas)
+        bloco = fp.read(tamanho_bloco)
+        if not bloco:
+            return
+        # Descarta o que já foi lido e emenda o resto (registro incompleto) com o bloco novo
+        del buf[:estado['offset']]
+        estado['offset'] = 0
+        buf += bloco
+
+
+def contar_pacotes(caminho):
+    """Conta os registros do arquivo percorrendo apenas os cabeçalhos"""
+    with open(caminho, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return 0
+
+    with buf:
+        return sum(1 for _ in _registros(buf))
+
+
+def ler_pacotes_stream(fp):
+    """
+    Lê um pcap clássico de um fluxo (ex: stdout do 'tcpdump -U -w -') conforme os pacotes chegam
+    Gera dicionários no mesmo formato de ler_pacotes
+    """
+    cabecalho = fp.read(24)
+    if len(cabecalho) < 24:
+        return
+
+    for ordem in ('<', '>'):
+        magic = struct.unpack_from(ordem + 'I', cabecalho)[0]
+        if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+            break
+    else:
+        raise ValueError("Fluxo não está no formato pcap clássico")
+
+    divisor = 1000 if magic == PCAP_MAGIC_NS else 1
+    linktype = struct.unpack_from(ordem + 'I', cabecalho, 20)[0] & 0x0FFFFFFF
+    registro = struct.Struct(ordem + 'IIII')
+
+    while True:
+        cabecalho_registro = fp.read(16)
+        if len(cabecalho_registro) < 16:
+            return
+        ts_seg, ts_frac, capturado, _ = registro.unpack(cabecalho_registro)
+        dados = fp.read(capturado)
+        if len(dados) < capturado:
+            return
+
+        pacote = decodificar_pacote(dados, 0, capturado, linktype)
+        if pacote is None:
+            continue
+
+        yield _evento(ts_seg * 1000000 + ts_frac // divisor, pacote)
+
+
+def ler_lotes_stream(fp, tamanho_bloco=1 << 16):
+    """
+    Lê um pcap clássico de um fluxo (stdout do 'tcpdump -U -w -') sem decodificar os pacotes
+    Gera lotes (quantidade de registros, bytes): o cabeçalho global seguido dos registros completos
+    que chegaram, ou seja, cada lote é um pcap válido para ler_pacotes_buffer (ex: em outra thread)
+    """
+    cabecalho = fp.read(24)
+    if len(cabecalho) < 24:
+        return
+    for ordem in ('<', '>'):
+        if struct.unpack_from(ordem + 'I', cabecalho)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+            break
+    else:
+        raise ValueError("Fluxo não está no formato pcap clássico")
+    capturado = struct.Struct(ordem + 'I')
+
+    # read1 devolve o que já chegou no pipe, sem esperar o bloco inteiro
+    ler = getattr(fp, 'read1', fp.read)
+    buf = bytearray()
+    while True:
+        bloco = ler(tamanho_bloco)
+        if not bloco:
+            return
+        buf += bloco
+        offset = 0
+        quantidade = 0
+        tamanho = len(buf)
+        while offset + 16 <= tamanho:
+            fim = offset + 16 + capturado.unpack_from(buf, offset + 8)[0]
+            if fim > tamanho:
+                break
+            offset = fim
+            quantidade += 1
+        if quantidade:
+            yield quantidade, cabecalho + buf[:offset]
+            del buf[:offset]
+
+
+def ler_pacotes_buffer(buf, falhas=None):
+    """Decodifica um pcap/pcapng inteiro em memória (ex: lote de ler_lotes_stream)"""
+    yield from _pacotes(buf, _registros(buf), falhas)
+
+
+def dividir_registros(caminho, partes):
+    """
+    Divide um pcap clássico em até 'partes' intervalos de bytes alinhados ao início dos registros
+    Retorna lista de (inicio, fim); pcapng não é dividido e vira um único intervalo (None, None)
+    """
+    with open(caminho, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return []
+
+    with buf:
+        tamanho = len(buf)
+        if tamanho < 24:
+            return []
+        ordem = None
+        for candidato in ('<', '>'):
+            if struct.unpack_from(candidato + 'I', buf, 0)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+                ordem = candidato
+        if ordem is None:
+            return [(None, None)]
+
+        # Percorre só os cabeçalhos dos registros, cortando quando passa de cada alvo
+        registro = struct.Struct(ordem + 'I')
+        alvos = [24 + (tamanho - 24) * i // partes for i in range(1, partes)]
+        cortes = [24]
+        offset = 24
+        for alvo in alvos:
+            while offset + 16 <= tamanho and offset < alvo:
+                offset += 16 + registro.unpack_from(buf, offset + 8)[0]
+            if offset > cortes[-1] and offset < tamanho:
+                cortes.append(offset)
+        cortes.append(tamanho)
+
+    return list(zip(cortes[:-1], cortes[1:]))
+
+
+def ler_pacotes_intervalo(caminho, inicio, fim):
+    """Lê apenas os registros entre os bytes [inicio, fim) de um pcap clássico (ver dividir_registros)"""
+    if inicio is None:
+        yield from ler_pacotes(caminho)
+        return
+
+    with open(caminho, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+
+    with buf:
+        ordem = '<' if struct.unpack_from('<I', buf, 0)[0] in (PCAP_MAGIC_US, PCAP_MAGIC_NS) else '>'
+        divisor = 1000 if struct.unpack_from(ordem + 'I', buf, 0)[0] == PCAP_MAGIC_NS else 1
+        linktype = struct.unpack_from(ordem + 'I', buf, 20)[0] & 0x0FFFFFFF
+        registro = struct.Struct(ordem + 'IIII')
+
+        offset = inicio
+        while offset + 16 <= fim:
+            ts_seg, ts_frac, capturado, _ = registro.unpack_from(buf, offset)
+            offset += 16
+            if offset + capturado > len(buf):
+                break
+            pacote = decodificar_pacote(buf, offset, offset + capturado, linktype)
+            offset += capturado
+            if pacote is None:
+                continue
+
+            yield _evento(ts_seg * 1000000 + ts_frac // divisor, pacote)
+
+
+def ler_registros_desde(caminho, inicio=None):
+    """
+    Lê os registros completos de um pcap clássico a partir do byte 'inicio' (None = início)
+    Gera (dados ou None, offset logo após o registro); um registro ainda sendo escrito fica de fora
+    """
+    with open(caminho, 'rb') as f:
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return
+
+    with buf:
+        if len(buf) < 24:
+            return
+        ordem = None
+        for candidato in ('<', '>'):
+            magic = struct.unpack_from(candidato + 'I', buf, 0)[0]
+            if magic in (PCAP_MAGIC_US, PCAP_MAGIC_NS):
+                ordem = candidato
+                break
+        if ordem is None:
+            raise ValueError("Leitura incremental suporta apenas pcap clássico")
+
+        divisor = 1000 if magic == PCAP_MAGIC_NS else 1
+        linktype = struct.unpack_from(ordem + 'I', buf, 20)[0] & 0x0FFFFFFF
+        registro = struct.Struct(ordem + 'IIII')
+
+        offset = 24 if inicio is None else inicio
+        tamanho_buf = len(buf)
+        while offset + 16 <= tamanho_buf:
+            ts_seg, ts_frac, capturado, _ = registro.unpack_from(buf, offset)
+            fim = offset + 16 + capturado
+            if fim > tamanho_buf:
+                break
+            pacote = decodificar_pacote(buf, offset + 16, fim, linktype)
+            offset = fim
+            if pacote is None:
+                yield None, offset
+                continue
+
+            yield _evento(ts_seg * 1000000 + ts_frac // divisor, pacote), offset
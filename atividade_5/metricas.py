@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Instrumentação das etapas da análise (--profile)
+Cronômetros e contadores por etapa (conversão do tcpdump, leitura/parse, detecção nas janelas,
+escrita do CSV), falhas de parse por tipo de linha, tamanho das janelas por IP e pico de memória.
+O resultado vai para um arquivo JSON; opcionalmente grava um dump do cProfile e o top de
+alocações do tracemalloc. Desativada, cada chamada custa só um teste de atributo.
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import resource
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import nullcontext
+from datetime import datetime
+
+_NULO = nullcontext()
+
+
+class _Cronometro:
+    __slots__ = ('metricas', 'nome', 'inicio')
+
+    def __init__(self, metricas, nome):
+        self.metricas = metricas
+        self.nome = nome
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *excecao):
+        self.metricas.adicionar_tempo(self.nome, time.perf_counter() - self.inicio)
+        return False
+
+
+def _percentil(valores_ordenados, fracao):
+    indice = min(len(valores_ordenados) - 1, int(fracao * len(valores_ordenados)))
+    return valores_ordenados[indice]
+
+
+class Metricas:
+    def __init__(self, ativo=False, arquivo='metricas.json', arquivo_cprofile=None, memoria=False):
+        self.ativo = ativo
+        self.arquivo = arquivo
+        self.arquivo_cprofile = arquivo_cprofile  # dump do cProfile (pstats) do caminho quente
+        self.memoria = memoria                    # tracemalloc: pico e top de alocações
+        self._profundidade = 0
+        self._reiniciar(None, None)
+
+    def _reiniciar(self, comando, arquivo_analisado):
+        self.comando = comando
+        self.arquivo_analisado = arquivo_analisado
+        self.tempos = defaultdict(float)
+        self.chamadas = Counter()
+        self.contadores = Counter()
+        self.falhas_parse = Counter()
+        self.janelas = []
+        self._inicio = time.perf_counter()
+        self._profiler = None
+
+    def iniciar(self, comando, arquivo_analisado=None):
+        """Começa uma sessão de medição; sessões aninhadas entram na mais externa"""
+        if not self.ativo:
+            return
+        self._profundidade += 1
+        if self._profundidade > 1:
+            return
+        self._reiniciar(comando, arquivo_analisado)
+        if self.memoria:
+            tracemalloc.start()
+        if self.arquivo_cprofile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def etapa(self, nome):
+        """Context manager que soma o tempo da etapa"""
+        if not self.ativo:
+            return _NULO
+        return _Cronometro(self, nome)
+
+    def medir_iterador(self, nome, iteravel):
+        """Soma em 'nome' só o tempo gasto dentro do iterável (ex: leitura + parse do arquivo)"""
+        if not self.ativo:
+            return iteravel
+        return self._medir_iterador(nome, iteravel)
+
+    def _medir_iterador(self, nome, iteravel):
+        relogio = time.perf_counter
+        iterador = iter(iteravel)
+        total = 0.0
+        try:
+            while True:
+                inicio = relogio()
+                try:
+                    item = next(iterador)
+                except StopIteration:
+                    total += relogio() - inicio
+                    return
+                total += relogio() - inicio
+                yield item
+        finally:
+            self.adicionar_tempo(nome, total)
+
+    def adicionar_tempo(self, nome, segundos):
+        self.tempos[nome] += segundos
+        self.chamadas[nome] += 1
+
+    def descontar(self, nome, interna):
+        """Tira de 'nome' o tempo da etapa 'interna' medida dentro dela (etapas sem sobreposição)"""
+        if self.ativo:
+            self.tempos[nome] -= self.tempos.get(interna, 0.0)
+
+    def contar(self, nome, quantidade=1):
+        if self.ativo:
+            self.contadores[nome] += quantidade
+
+    def registrar_janelas(self, portas_por_ip):
+        """Máximo de portas distintas por janela de cada IP (distribuição vai para o relatório)"""
+        if self.ativo:
+            self.janelas.extend(portas_por_ip)
+
+    def _resumo(self):
+        total = time.perf_counter() - self._inicio
+        etapas = {
+            nome: {
+                'segundos': round(segundos, 6),
+                'chamadas': self.chamadas[nome],
+                'percentual': round(100 * segundos / total, 1) if total else 0.0,
+            }
+            for nome, segundos in sorted(self.tempos.items(), key=lambda x: x[1], reverse=True)
+        }
+
+        taxas = {}
+        registros = self.contadores.get('registros', 0)
+        leitura = self.tempos.get('leitura_parse')
+        if registros and leitura:
+            taxas['linhas_por_s'] = round(registros / leitura)
+        if registros:
+            taxas['registros_por_s_total'] = round(registros / total) if total else None
+            taxas['falha_parse'] = round(sum(self.falhas_parse.values()) / registros, 6)
+
+        janelas = None
+        if self.janelas:
+            valores = sorted(self.janelas)
+            janelas = {
+                'ips': len(valores),
+                'media': round(sum(valores) / len(valores), 2),
+                'p50': _percentil(valores, 0.50),
+                'p90': _percentil(valores, 0.90),
+                'p99': _percentil(valores, 0.99),
+                'max': valores[-1],
+            }
+
+        # ru_maxrss está em KB no Linux
+        memoria = {'pico_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+        if self.memoria and tracemalloc.is_tracing():
+            atual, pico = tracemalloc.get_traced_memory()
+            memoria['tracemalloc_pico_kb'] = pico // 1024
+            memoria['top_alocacoes'] = [
+                {'local': str(estatistica.traceback[0]), 'kb': estatistica.size // 1024,
+                 'blocos': estatistica.count}
+                for estatistica in tracemalloc.take_snapshot().statistics('lineno')[:10]
+            ]
+
+        return {
+            'comando': self.comando,
+            'arquivo': self.arquivo_analisado,
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'duracao_total_s': round(total, 6),
+            'etapas': etapas,
+            'contadores': dict(self.contadores),
+            'taxas': taxas,
+            'falhas_parse_por_tipo': dict(self.falhas_parse.most_common()),
+            'janelas_portas_por_ip': janelas,
+            'memoria': memoria,
+        }
+
+    def finalizar(self):
+        """Encerra a sessão: grava o JSON (e o cProfile), mostra o resumo e retorna o dict"""
+        if not self.ativo or self._profundidade == 0:
+            return None
+        self._profundidade -= 1
+        if self._profundidade:
+            return None
+
+        if self._profiler is not None:
+            self._profiler.disable()
+        resumo = self._resumo()
+        if self.memoria:
+            tracemalloc.stop()
+
+        temporario = self.arquivo + ".tmp"
+        with open(temporario, 'w') as f:
+            json.dump(resumo, f, indent=2)
+        os.replace(temporario, self.arquivo)
+
+        self.imprimir(resumo)
+        if self._profiler is not None:
+            self._profiler.dump_stats(self.arquivo_cprofile)
+            print(f"   cProfile salvo em {self.arquivo_cprofile} (funções mais caras):")
+            pstats.Stats(self._profiler).sort_stats('cumulative').print_stats(12)
+            self._profiler = None
+        return resumo
+
+    def imprimir(self, resumo):
+        print(f"⏱️  Perfil de {resumo['comando']} ({resumo['duracao_total_s']:.3f}s):")
+        for nome, etapa in resumo['etapas'].items():
+            print(f"   • {nome:<20} {etapa['segundos']:>10.3f}s  {etapa['percentual']:>5.1f}%")
+        for nome, valor in resumo['taxas'].items():
+            print(f"   • {nome:<20} {valor}")
+        if resumo['falhas_parse_por_tipo']:
+            falhas = ', '.join(f"{tipo}={total}" for tipo, total in resumo['falhas_parse_por_tipo'].items())
+            print(f"   • falhas de parse:     {falhas}")
+        janelas = resumo['janelas_portas_por_ip']
+        if janelas:
+            print(f"   • portas/janela por IP: p50={janelas['p50']} p90={janelas['p90']} "
+                  f"p99={janelas['p99']} máx={janelas['max']}")
+        memoria = resumo['memoria']
+        print(f"   • pico de memória:     {memoria['pico_rss_kb'] / 1024:.1f} MB (RSS)"
+              + (f", {memoria['tracemalloc_pico_kb'] / 1024:.1f} MB (tracemalloc)"
+                 if 'tracemalloc_pico_kb' in memoria else ""))
+        print(f"📄 Métricas salvas em {self.arquivo}")
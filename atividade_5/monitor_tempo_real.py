@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Monitor em tempo real com a captura desacoplada da análise (ver fila_captura.py)
+Uma thread drena a saída do tcpdump para uma fila limitada e os trabalhadores parseiam e analisam
+em lotes; a thread principal só cuida do prazo (cumprido mesmo sem tráfego) e redesenha a tela
+(top talkers, pacotes/s, scanners ativos, profundidade da fila e descartes da fila e do kernel)
+no máximo 'intervalo_tela' vezes por segundo em vez de um print por pacote.
+Os pacotes passam pela pipeline de detecção (pipeline_deteccao.py): port scan e os demais detectores ligados,
+e pelo agregador de tempo (agregados_tempo.py), se houver.
+"""
+
+import sys
+import time
+from datetime import datetime
+
+import fila_captura
+import ingestao
+from contagem_topk import SpaceSaving
+
+
+class MonitorTempoReal:
+    def __init__(self, pipeline, capacidade_topk=1000, intervalo_tela=1.0, top=10, agregador=None, filtro=None,
+                 capacidade_fila=fila_captura.CAPACIDADE_PADRAO, politica_fila='bloquear', trabalhadores=1):
+        self.pipeline = pipeline
+        self.agregador = agregador
+        self.filtro = filtro  # redes_cidr.FiltroRedes: permitidos descartados, origens agrupadas
+        self.topk = SpaceSaving(capacidade_topk)  # Memória fixa mesmo sem limite de pacotes
+        self.intervalo_tela = intervalo_tela
+        self.top = top
+        self.relogio = ingestao.RelogioIngestao('tt')
+        self.linhas = 0
+        self.pacotes = 0
+        self.ultimo_timestamp = None
+        self.inicio = None
+        self.prazo = None
+        self._amostra = (0.0, 0)  # (instante, pacotes) do último redesenho, para pacotes/s
+        self.pps = 0.0
+        self.capacidade_fila = capacidade_fila
+        self.politica_fila = politica_fila
+        self.trabalhadores = trabalhadores
+        self.captura = None
+
+    def analisar_eventos(self, eventos, linhas):
+        """Atualiza contadores e detectores com eventos já parseados (na ordem da captura)"""
+        converter = self.relogio.converter
+        adicionar = self.topk.adicionar
+        processar = self.pipeline.processar
+        agregar = self.agregador.adicionar if self.agregador is not None else None
+        aplicar = self.filtro.aplicar if self.filtro is not None else None
+        for dados in eventos:
+            if aplicar is not None and aplicar(dados) is None:
+                continue
+            timestamp = dados['timestamp'] = converter(dados['timestamp'])
+            adicionar(dados['ip_origem'])
+            processar(dados)
+            if agregar is not None:
+                agregar(dados)
+            self.ultimo_timestamp = timestamp
+        self.linhas += linhas
+        self.pacotes = self.topk.total
+
+    def _formatar_momento(self, timestamp):
+        return datetime.fromtimestamp(ingestao.segundos(timestamp)).strftime('%H:%M:%S')
+
+    def tela(self, final=False):
+        """Texto do painel de resumo"""
+        agora = time.monotonic()
+        instante, pacotes = self._amostra
+        if agora > instante:
+            self.pps = (self.pacotes - pacotes) / (agora - instante)
+        self._amostra = (agora, self.pacotes)
+        if self.ultimo_timestamp is not None:
+            self.pipeline.expirar(self.ultimo_timestamp)
+        portscan = self.pipeline.portscan_detectado()
+
+        decorrido = agora - self.inicio
+        restante = "" if self.prazo is None else f" / {self.prazo - self.inicio:.0f}s"
+        linhas = [
+            "=" * 60,
+            f"📡 MONITOR EM TEMPO REAL {'(final)' if final else ''}",
+            "=" * 60,
+            f"⏱️  Tempo: {decorrido:.0f}s{restante}   Pacotes: {self.pacotes}   "
+            f"Linhas: {self.linhas}   Taxa: {self.pps:,.0f} pps",
+            f"🔎 Janelas abertas: {self.pipeline.estados()}   "
+            f"Scanners detectados: {len(portscan)}",
+        ]
+        if self.captura is not None:
+            fila = self.captura.fila
+            kernel = self.captura.descartados_kernel
+            linhas.append(f"📥 Fila: {fila.profundidade}/{fila.capacidade} (máx {fila.profundidade_maxima}, "
+                          f"{fila.politica})   Descartes: fila {fila.descartados}   "
+                          f"kernel {'?' if kernel is None else kernel}")
+        if self.filtro is not None and self.filtro.permitidos is not None:
+            linhas.append(f"🛡️  Descartados (redes permitidas): {self.filtro.descartados}")
+        extras = self.pipeline.extras()
+        if extras:
+            linhas.append("🧩 " + "   ".join(f"{detector.nome}: {len(detector.detectados)}" for detector in extras))
+        linhas += [
+            "",
+            f"🏆 Top {self.top} talkers:",
+        ]
+        for ip, contagem, erro in self.topk.top(self.top):
+            marca = " 🚨" if ip in portscan else ""
+            detalhe = f" (±{erro})" if erro else ""
+            linhas.append(f"   {ip:<15} {contagem:>10}{detalhe}{marca}")
+
+        recentes = self.pipeline.alertas()[-5:]
+        if recentes:
+            linhas.append("")
+            linhas.append("🚨 Alertas mais recentes:")
+            for momento, detector, chave in reversed(recentes):
+                linhas.append(f"   [{self._formatar_momento(momento)}] {detector.descrever(chave)}")
+        return "\n".join(linhas)
+
+    def desenhar(self, final=False):
+        texto = self.tela(final)
+        if sys.stdout.isatty() and not final:
+            # Limpa a tela e redesenha no mesmo lugar
+            sys.stdout.write("\033[H\033[J" + texto + "\n")
+        else:
+            sys.stdout.write(texto + "\n")
+        sys.stdout.flush()
+
+    def executar(self, comando, duracao=None, interface=None):
+        """Roda o tcpdump até o prazo (ou até ele terminar) e retorna o código de saída"""
+        self.inicio = time.monotonic()
+        self._amostra = (self.inicio, 0)
+        self.prazo = None if duracao is None else self.inicio + duracao
+
+        captura = self.captura = fila_captura.CapturaDesacoplada(
+            comando, self.analisar_eventos, 'texto', self.capacidade_fila, self.politica_fila,
+            self.trabalhadores, interface)
+        captura.iniciar()
+        try:
+            while True:
+                espera = self.intervalo_tela
+                if self.prazo is not None:
+                    espera = min(espera, self.prazo - time.monotonic())
+                # O prazo vale mesmo que nenhuma linha chegue
+                if espera <= 0 or captura.esperar(espera):
+                    break
+                captura.solicitar_estatisticas()
+                with captura.trava:
+                    self.desenhar()
+        finally:
+            captura.parar()
+            # Processa o que o tcpdump ainda tinha no buffer
+            captura.esperar(2)
+        return captura.aguardar()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Parser das linhas de texto do tcpdump (-nn)
+Caminho rápido baseado em split para as linhas comuns e uma única regex
+pré-compilada (compilada uma vez por processo) como fallback
+"""
+
+import re
+
+# Nomes de serviço que aparecem quando o tcpdump roda sem -nn
+SERVICOS = {
+    'http': 80, 'https': 443, 'ssh': 22, 'ftp': 21,
+    'domain': 53, 'smtp': 25, 'pop3': 110, 'imap': 143
+}
+
+# Une as sete variações antigas (timestamp H:M:S ou segundos, porta numérica
+# ou nome de serviço, terminada por ':' ou por ' tcp') em um único padrão
+PADRAO_LINHA = re.compile(
+    r'^\s*(\d+(?::\d+)*\.\d+)\s+IP\s+'
+    r'(\d+\.\d+\.\d+\.\d+)\.(\w+)\s+>\s+'
+    r'(\d+\.\d+\.\d+\.\d+)\.(\w+)(?::|\s+tcp)'
+)
+
+PROTO_TCP = 6
+PROTO_UDP = 17
+
+# Letras das flags TCP no "Flags [...]" do tcpdump ('.' = ACK), como bits do cabeçalho TCP
+BITS_FLAGS = {'F': 0x01, 'S': 0x02, 'R': 0x04, 'P': 0x08, '.': 0x10, 'U': 0x20, 'E': 0x40, 'W': 0x80}
+_FLAGS_VISTAS = {}  # texto -> bits; na prática só aparecem umas poucas combinações
+
+
+def converter_flags(texto):
+    """Converte o texto das flags do tcpdump (ex: 'S.', 'P.', 'R') para os bits do cabeçalho TCP"""
+    bits = _FLAGS_VISTAS.get(texto)
+    if bits is None:
+        bits = _FLAGS_VISTAS[texto] = sum(BITS_FLAGS.get(letra, 0) for letra in set(texto))
+    return bits
+
+
+def detalhes(resto):
+    """
+    (protocolo, tamanho, flags) a partir do texto depois do '<destino>.<porta>:'
+    'Flags [..]' só aparece no TCP; com porta e sem flags, UDP. O tamanho é o 'length'
+    impresso pelo tcpdump (carga útil), 0 quando a linha não o traz (ex: DNS decodificado)
+    """
+    if resto[:7] == 'Flags [':
+        protocolo = PROTO_TCP
+        texto = resto[7:resto.find(']', 7)]
+        flags = _FLAGS_VISTAS.get(texto)
+        if flags is None:
+            flags = converter_flags(texto)
+    else:
+        protocolo = PROTO_UDP
+        flags = 0
+    _, achou, numero = resto.rpartition('length ')
+    if not achou:
+        return protocolo, 0, flags
+    numero = numero.rstrip()
+    if numero.isdigit():  # Caso comum: 'length N' no fim da linha
+        return protocolo, int(numero), flags
+    numero = numero.partition(' ')[0].rstrip(',:)')
+    return protocolo, int(numero) if numero.isdigit() else 0, flags
+
+
+def converter_porta(porta):
+    """Converte o texto da porta (número ou nome de serviço) para inteiro"""
+    if porta.isdigit():
+        return int(porta)
+    return SERVICOS.get(porta.lower(), 0)
+
+
+def converter_timestamp(texto):
+    """Converte 'H:MM:SS.ffffff' ou 'SS.ffffff' para microssegundos inteiros (sem float)"""
+    if ':' in texto:
+        h, m, resto = texto.split(':')
+        inteiro, _, fracao = resto.partition('.')
+        segundos = (int(h) * 60 + int(m)) * 60 + int(inteiro)
+    else:
+        inteiro, _, fracao = texto.partition('.')
+        segundos = int(inteiro)
+    # Frações com mais de 6 dígitos (--nano) são truncadas em microssegundos
+    return segundos * 1000000 + int((fracao + '000000')[:6])
+
+
+def _montar(resto, timestamp, ip_origem, porta_origem, ip_destino, porta_destino):
+    protocolo, tamanho, flags = detalhes(resto)
+    return {
+        'timestamp': converter_timestamp(timestamp),
+        'ip_origem': ip_origem,
+        'porta_origem': converter_porta(porta_origem),
+        'ip_destino': ip_destino,
+        'porta_destino': converter_porta(porta_destino),
+        'protocolo': protocolo,
+        'tamanho': tamanho,
+        'flags': flags
+    }
+
+
+def parse_linha(linha):
+    """
+    Parseia uma linha do tcpdump
+    Retorna dict com timestamp, ip_origem, porta_origem, ip_destino, porta_destino,
+    protocolo, tamanho e flags (ver detalhes), ou None
+    O timestamp vem como o tcpdump imprimiu, em µs; a ingestao.RelogioIngestao o torna absoluto
+    """
+    partes = linha.split(None, 5)
+
+    # Linhas que não são IPv4 (ARP, IP6, vazias...) são descartadas sem regex
+    if len(partes) < 5 or partes[1] != 'IP':
+        return None
+
+    # Caminho rápido: "<ts> IP <origem>.<porta> > <destino>.<porta>: ..."
+    if partes[3] == '>' and partes[4][-1] == ':':
+        ip_origem, _, porta_origem = partes[2].rpartition('.')
+        ip_destino, _, porta_destino = partes[4][:-1].rpartition('.')
+        if (porta_origem.isdigit() and porta_destino.isdigit()
+                and ip_origem.count('.') == 3 and ip_destino.count('.') == 3
+                and ip_origem[0].isdigit() and ip_destino[0].isdigit()):
+            try:
+                timestamp = converter_timestamp(partes[0])
+            except ValueError:
+                return None
+            protocolo, tamanho, flags = detalhes(partes[5] if len(partes) > 5 else '')
+            return {
+                'timestamp': timestamp,
+                'ip_origem': ip_origem,
+                'porta_origem': int(porta_origem),
+                'ip_destino': ip_destino,
+                'porta_destino': int(porta_destino),
+                'protocolo': protocolo,
+                'tamanho': tamanho,
+                'flags': flags
+            }
+
+    # Fallback: regex única para as variações menos comuns
+    match = PADRAO_LINHA.match(linha)
+    if not match:
+        return None
+
+    try:
+        dados = _montar(linha[match.end():].lstrip(), *match.groups())
+    except ValueError:
+        return None
+    if match.group(0).endswith('tcp'):  # Variante '<destino>.<serviço> tcp N'
+        dados['protocolo'] = PROTO_TCP
+    return dados
+
+
+def tipo_linha(linha):
+    """Classifica uma linha que o parse_linha descartou (métricas de falha por tipo de linha)"""
+    partes = linha.split(None, 2)
+    if not partes:
+        return 'vazia'
+    if len(partes) < 2 or not partes[0][:1].isdigit():
+        return 'sem_timestamp'
+    tipo = partes[1].rstrip(',')
+    if tipo == 'IP':
+        resto = partes[2] if len(partes) > 2 else ''
+        return 'ICMP' if 'ICMP' in resto else 'IP_sem_porta'
+    # ARP, IP6, STP, LLDP...; qualquer outra coisa vira 'outros'
+    return tipo if tipo.isalnum() and len(tipo) <= 8 else 'outros'
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Perfis de captura do tcpdump: filtro BPF + snaplen
+A análise de port scan só precisa de IP de origem, porta de destino e horário. O perfil
+'portscan' grava só os cabeçalhos (snaplen 96) de SYN sem ACK e UDP, deixando o kernel
+descartar o resto antes de chegar ao disco ou ao parser.
+"""
+
+# Ethernet (14) + VLAN (4) + IPv4 com opções (até 60) + portas TCP/UDP (4) = 82 bytes
+SNAPLEN_CABECALHOS = 96
+
+# Componentes do filtro; o perfil combina os escolhidos com 'or'
+FILTROS_BPF = {
+    'ip': 'ip',
+    'tcp': 'ip and tcp',
+    'syn': 'ip and tcp[tcpflags] & (tcp-syn|tcp-ack) == tcp-syn',  # abertura de conexão
+    'udp': 'ip and udp',
+    'icmp': 'ip and icmp',
+}
+
+
+class PerfilCaptura:
+    def __init__(self, nome, filtros=('ip',), snaplen=0, extra=None):
+        for filtro in filtros:
+            if filtro not in FILTROS_BPF:
+                raise ValueError(f"Filtro BPF desconhecido: {filtro} (use {', '.join(FILTROS_BPF)})")
+        self.nome = nome
+        self.filtros = tuple(filtros)
+        self.snaplen = snaplen  # 0 = padrão do tcpdump (pacote inteiro)
+        self.extra = extra      # expressão BPF livre, combinada com 'and' (ex: 'not port 22')
+
+    def expressao(self):
+        """Expressão BPF completa"""
+        if len(self.filtros) == 1:
+            expressao = FILTROS_BPF[self.filtros[0]]
+        else:
+            expressao = ' or '.join(f"({FILTROS_BPF[filtro]})" for filtro in self.filtros)
+        if self.extra:
+            expressao = f"({expressao}) and ({self.extra})"
+        return expressao
+
+    def opcoes(self):
+        """Opções do tcpdump que vêm antes do filtro"""
+        return ['-s', str(self.snaplen)] if self.snaplen else []
+
+    def descricao(self):
+        snaplen = f"snaplen {self.snaplen}" if self.snaplen else "pacote inteiro"
+        return f"{self.nome} ({snaplen}, filtro: {self.expressao()})"
+
+
+PERFIS = {
+    'completo': PerfilCaptura('completo', ('ip',)),
+    'cabecalhos': PerfilCaptura('cabecalhos', ('ip',), SNAPLEN_CABECALHOS),
+    'portscan': PerfilCaptura('portscan', ('syn', 'udp'), SNAPLEN_CABECALHOS),
+}
+
+
+def montar_perfil(nome='completo', filtros=None, snaplen=None, extra=None):
+    """Parte de um perfil pré-definido e troca filtros/snaplen/extra, se informados"""
+    if nome not in PERFIS:
+        raise ValueError(f"Perfil de captura desconhecido: {nome} (use {', '.join(PERFIS)})")
+    base = PERFIS[nome]
+    if filtros is None and snaplen is None and extra is None:
+        return base
+    return PerfilCaptura(
+        nome if filtros is None else 'personalizado',
+        base.filtros if filtros is None else filtros,
+        base.snaplen if snaplen is None else snaplen,
+        base.extra if extra is None else extra
+    )
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Pipeline de detecção em uma passada
+Todos os detectores assinam o mesmo fluxo de eventos parseados (os dicts da ingestão): uma leitura
+e um parse alimentam todos, e cada um mantém o próprio estado, limitado e expirado periodicamente.
+  portscan_vertical    -> um IP acessa mais de 'limite' portas distintas na janela
+  varredura_horizontal -> um IP acessa mais de 'limite' hosts distintos na mesma porta na janela
+  syn_flood            -> um destino (ip:porta) recebe mais de 'limite' SYNs sem ACK na janela
+  rajada_dns           -> um IP faz mais de 'limite' consultas DNS (porta 53) na janela
+Quais rodam e com que parâmetros vem da configuração (deteccao.json); janelas em segundos.
+"""
+
+import copy
+import json
+from abc import ABC, abstractmethod
+from collections import deque
+
+import ingestao
+from detector_hll import novo_detector
+
+DETECTORES = ('portscan_vertical', 'varredura_horizontal', 'syn_flood', 'rajada_dns')
+
+CONFIGURACAO_PADRAO = {
+    'portscan_vertical': {'ativo': True, 'janela': 60.0, 'limite': 10},
+    'varredura_horizontal': {'ativo': False, 'janela': 60.0, 'limite': 20},
+    'syn_flood': {'ativo': False, 'janela': 1.0, 'limite': 200},
+    'rajada_dns': {'ativo': False, 'janela': 10.0, 'limite': 100},
+}
+
+# A cada quantos eventos a pipeline descarta o estado de chaves que pararam de aparecer
+INTERVALO_EXPIRACAO = 100000
+
+FLAG_SYN = 0x02
+FLAG_ACK = 0x10
+PORTA_DNS = 53
+
+_SEM_ALERTAS = ()
+
+
+def configuracao_padrao():
+    return copy.deepcopy(CONFIGURACAO_PADRAO)
+
+
+def carregar_configuracao(caminho=None, ativos=None):
+    """
+    Configuração dos detectores: a padrão, sobreposta pelo JSON 'caminho' (só as chaves
+    informadas) e por 'ativos' (nomes a ligar; os demais são desligados)
+    Detector ou opção desconhecida, ou valor do tipo errado, gera ValueError
+    """
+    configuracao = configuracao_padrao()
+    if caminho:
+        with open(caminho, encoding='utf-8') as f:
+            dados = json.load(f)
+        if not isinstance(dados, dict):
+            raise ValueError(f"{caminho}: esperado um objeto JSON com um detector por chave")
+        for nome, opcoes in dados.items():
+            if nome not in configuracao:
+                raise ValueError(f"{caminho}: detector desconhecido '{nome}' (use {', '.join(DETECTORES)})")
+            if not isinstance(opcoes, dict):
+                raise ValueError(f"{caminho}: {nome} deve ser um objeto com as opções do detector")
+            for opcao, valor in opcoes.items():
+                if opcao not in configuracao[nome]:
+                    raise ValueError(f"{caminho}: opção desconhecida '{opcao}' em {nome}")
+                if opcao == 'ativo':
+                    if not isinstance(valor, bool):
+                        raise ValueError(f"{caminho}: {nome}.ativo deve ser true ou false")
+                elif isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    raise ValueError(f"{caminho}: {nome}.{opcao} deve ser um número")
+                configuracao[nome][opcao] = valor
+    if ativos is not None:
+        desconhecidos = set(ativos) - set(DETECTORES)
+        if desconhecidos:
+            raise ValueError(f"Detector desconhecido: {', '.join(sorted(desconhecidos))} "
+                             f"(use {', '.join(DETECTORES)})")
+        for nome in DETECTORES:
+            configuracao[nome]['ativo'] = nome in ativos
+    for nome, opcoes in configuracao.items():
+        if opcoes['janela'] <= 0 or opcoes['limite'] < 1:
+            raise ValueError(f"{nome}: janela deve ser positiva e limite pelo menos 1")
+    return configuracao
+
+
+def extras_ativos(configuracao):
+    """Detectores ativos além do port scan vertical"""
+    return [nome for nome in DETECTORES[1:] if configuracao[nome]['ativo']]
+
+
+def formatar_chave(chave):
+    """ip ou (ip, porta) -> texto"""
+    if isinstance(chave, tuple):
+        return f"{chave[0]}:{chave[1]}"
+    return chave
+
+
+class DetectorVertical:
+    """Port scan vertical: adapta o DetectorJanela/DetectorHLL (exato ou aproximado) à pipeline"""
+
+    nome = 'portscan_vertical'
+
+    def __init__(self, detector):
+        self.detector = detector
+        self._registrar = detector.registrar
+        self.detectados = detector.detectados
+        self.janela = detector.janela
+        self.limite = detector.limite
+
+    def registrar(self, dados):
+        ip = dados['ip_origem']
+        if self._registrar(ip, dados['timestamp'], dados['porta_destino']):
+            return ip
+        return None
+
+    def expirar(self, agora):
+        return self.detector.expirar(agora)
+
+    def estados(self):
+        return len(self.detector.janelas)
+
+    def descrever(self, chave):
+        return (f"Possível port scan de {chave}: mais de {self.limite} portas "
+                f"em {ingestao.segundos(self.janela):.0f}s")
+
+
+class DetectorDistintos(ABC):
+    """
+    Mais de 'limite' valores distintos para a mesma chave dentro da janela (µs)
+    Cada chave guarda [último timestamp, {valor: último timestamp}], os valores em ordem de uso
+    (o dict preserva a ordem de inserção); como a chave é marcada ao passar do limite, nunca há
+    mais de limite + 1 valores por chave
+    """
+
+    def __init__(self, janela, limite):
+        self.janela = janela
+        self.limite = limite
+        self.janelas = {}      # chave -> [último timestamp, {valor: último timestamp}]
+        self.detectados = {}   # chave -> timestamp em que o limite foi cruzado
+
+    @abstractmethod
+    def chave_valor(self, dados):
+        """(chave, valor) do evento, ou None se o evento não interessa ao detector"""
+
+    def registrar(self, dados):
+        """Processa um evento; retorna a chave somente no evento que cruza o limite"""
+        par = self.chave_valor(dados)
+        if par is None:
+            return None
+        chave, valor = par
+        timestamp = dados['timestamp']
+
+        # Chaves detectadas saem de 'janelas': só uma chave sem estado pode já ter sido marcada
+        estado = self.janelas.get(chave)
+        if estado is None:
+            if chave not in self.detectados:
+                self.janelas[chave] = [timestamp, {valor: timestamp}]
+            return None
+
+        # Timestamps fora de ordem são tratados como simultâneos ao último evento
+        if timestamp < estado[0]:
+            timestamp = estado[0]
+        estado[0] = timestamp
+        valores = estado[1]
+        if valor in valores:
+            del valores[valor]  # reinserido no fim
+        valores[valor] = timestamp
+
+        # Os valores mais antigos estão no início: sai o que passou da janela
+        # (com um valor só, ele é o deste evento)
+        if len(valores) > 1:
+            limite_janela = timestamp - self.janela
+            while True:
+                valor_antigo = next(iter(valores))
+                if valores[valor_antigo] >= limite_janela:
+                    break
+                del valores[valor_antigo]
+
+            if len(valores) > self.limite:
+                self.detectados[chave] = timestamp
+                del self.janelas[chave]
+                return chave
+        return None
+
+    def expirar(self, agora):
+        """Descarta chaves cujo último evento já saiu da janela; retorna quantas foram removidas"""
+        expirados = [chave for chave, estado in self.janelas.items() if agora - estado[0] > self.janela]
+        for chave in expirados:
+            del self.janelas[chave]
+        return len(expirados)
+
+    def estados(self):
+        return len(self.janelas)
+
+
+class DetectorTaxa(ABC):
+    """
+    Mais de 'limite' eventos para a mesma chave dentro da janela (µs), janela deslizante exata
+    Cada chave guarda só os timestamps ainda na janela e é marcada ao passar do limite,
+    então nunca há mais de limite + 1 timestamps por chave
+    """
+
+    def __init__(self, janela, limite):
+        self.janela = janela
+        self.limite = limite
+        self.janelas = {}      # chave -> deque de timestamps
+        self.detectados = {}   # chave -> timestamp em que o limite foi cruzado
+
+    @abstractmethod
+    def chave(self, dados):
+        """Chave do evento, ou None se o evento não interessa ao detector"""
+
+    def registrar(self, dados):
+        """Processa um evento; retorna a chave somente no evento que cruza o limite"""
+        chave = self.chave(dados)
+        if chave is None or chave in self.detectados:
+            return None
+
+        timestamp = dados['timestamp']
+        fila = self.janelas.get(chave)
+        if fila is None:
+            fila = self.janelas[chave] = deque()
+        elif timestamp < fila[-1]:
+            timestamp = fila[-1]
+        fila.append(timestamp)
+
+        limite_janela = timestamp - self.janela
+        while fila[0] < limite_janela:
+            fila.popleft()
+
+        if len(fila) > self.limite:
+            self.detectados[chave] = timestamp
+            del self.janelas[chave]
+            return chave
+        return None
+
+    def expirar(self, agora):
+        """Descarta chaves cujo último evento já saiu da janela; retorna quantas foram removidas"""
+        expirados = [chave for chave, fila in self.janelas.items() if agora - fila[-1] > self.janela]
+        for chave in expirados:
+            del self.janelas[chave]
+        return len(expirados)
+
+    def estados(self):
+        return len(self.janelas)
+
+
+class DetectorVarreduraHorizontal(DetectorDistintos):
+    """Um IP de origem procurando o mesmo serviço em muitos hosts: chave (ip_origem, porta), valor ip_destino"""
+
+    nome = 'varredura_horizontal'
+
+    def chave_valor(self, dados):
+        return (dados['ip_origem'], dados['porta_destino']), dados['ip_destino']
+
+    def descrever(self, chave):
+        ip, porta = chave
+        return (f"Possível varredura horizontal de {ip} na porta {porta}: mais de {self.limite} hosts "
+                f"em {ingestao.segundos(self.janela):.0f}s")
+
+
+class DetectorSynFlood(DetectorTaxa):
+    """
+    SYNs sem ACK (aberturas de conexão) por destino ip:porta; a origem não entra na chave
+    porque num flood ela costuma ser forjada. Eventos sem flags (texto sem 'Flags [...]') não contam.
+    """
+
+    nome = 'syn_flood'
+
+    def chave(self, dados):
+        flags = dados.get('flags', 0)
+        if flags & FLAG_SYN and not flags & FLAG_ACK:
+            return dados['ip_destino'], dados['porta_destino']
+        return None
+
+    def descrever(self, chave):
+        return (f"Possível SYN flood contra {formatar_chave(chave)}: mais de {self.limite} SYNs "
+                f"em {ingestao.segundos(self.janela):g}s")
+
+
+class DetectorRajadaDNS(DetectorTaxa):
+    """Consultas DNS (porta de destino 53, UDP ou TCP) por IP de origem"""
+
+    nome = 'rajada_dns'
+
+    def chave(self, dados):
+        if dados['porta_destino'] == PORTA_DNS:
+            return dados['ip_origem']
+        return None
+
+    def descrever(self, chave):
+        return (f"Possível rajada de DNS de {chave}: mais de {self.limite} consultas "
+                f"em {ingestao.segundos(self.janela):g}s")
+
+
+_CLASSES = {
+    'varredura_horizontal': DetectorVarreduraHorizontal,
+    'syn_flood': DetectorSynFlood,
+    'rajada_dns': DetectorRajadaDNS,
+}
+
+
+class PipelineDeteccao:
+    """Os detectores ativos, alimentados evento a evento na mesma passada"""
+
+    def __init__(self, detectores):
+        self.detectores = list(detectores)
+        self.vertical = next((d for d in self.detectores if d.nome == 'portscan_vertical'), None)
+        self._registrar = [detector.registrar for detector in self.detectores]
+        self.eventos = 0
+
+    def __len__(self):
+        return len(self.detectores)
+
+    def __iter__(self):
+        return iter(self.detectores)
+
+    def processar(self, dados):
+        """
+        Passa o evento por todos os detectores; retorna [(detector, chave)] dos limites
+        cruzados neste evento (quase sempre vazia)
+        """
+        alertas = _SEM_ALERTAS
+        for registrar in self._registrar:
+            chave = registrar(dados)
+            if chave is not None:
+                if not alertas:
+                    alertas = []
+                alertas.append((registrar.__self__, chave))
+        self.eventos += 1
+        if self.eventos % INTERVALO_EXPIRACAO == 0:
+            self.expirar(dados['timestamp'])
+        return alertas
+
+    def expirar(self, agora):
+        return sum(detector.expirar(agora) for detector in self.detectores)
+
+    def estados(self):
+        """Chaves com estado em memória, somando todos os detectores"""
+        return sum(detector.estados() for detector in self.detectores)
+
+    def portscan_detectado(self):
+        """ip -> momento do port scan vertical ({} se o detector estiver desligado)"""
+        return self.vertical.detectados if self.vertical is not None else {}
+
+    def extras(self):
+        return [detector for detector in self.detectores if detector is not self.vertical]
+
+    def alertas(self):
+        """[(momento, detector, chave)] de todos os detectores, em ordem de tempo"""
+        return sorted(((momento, detector, chave) for detector in self.detectores
+                       for chave, momento in detector.detectados.items()), key=lambda x: x[0])
+
+
+def montar_pipeline(configuracao, detector_vertical=None, aproximado=False, vertical=True):
+    """
+    PipelineDeteccao com os detectores ativos na configuração
+    detector_vertical: DetectorJanela/DetectorHLL já criado para o port scan vertical (o analisador
+    passa o seu); sem ele é criado com a janela/limite da configuração (HLL se 'aproximado')
+    vertical=False deixa o port scan vertical de fora (quando ele é calculado à parte)
+    """
+    detectores = []
+    opcoes = configuracao['portscan_vertical']
+    if vertical and opcoes['ativo']:
+        if detector_vertical is None:
+            detector_vertical = novo_detector(int(opcoes['janela'] * ingestao.MICROS),
+                                              int(opcoes['limite']), aproximado)
+        detectores.append(DetectorVertical(detector_vertical))
+    for nome in extras_ativos(configuracao):
+        opcoes = configuracao[nome]
+        detectores.append(_CLASSES[nome](int(opcoes['janela'] * ingestao.MICROS), int(opcoes['limite'])))
+    return PipelineDeteccao(detectores)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Listas de redes (CIDR) consultadas a cada evento, antes das janelas de detecção
+- permitidos: origens confiáveis (nossos scanners, monitoramento); o tráfego delas é descartado
+- blocos: redes nomeadas (ex: "AS15169"); as origens dentro de um bloco viram uma chave só
+- prefixo: agrupa as demais origens por sub-rede (ex: /24 -> "10.0.0.0/24")
+Os prefixos ficam como inteiros em um dicionário por comprimento: a consulta tenta do comprimento
+mais longo ao mais curto, no máximo 33 buscas (só os comprimentos presentes na lista). O resultado
+de cada IP de origem fica em cache, então o custo por pacote é um acesso a dicionário.
+"""
+
+import ipaddress
+
+from armazem_colunar import int_para_ip, ip_para_int
+
+# IPs de origem com a decisão em cache (acima disso o cache recomeça)
+MAXIMO_CACHE = 1 << 20
+
+_AUSENTE = object()
+
+
+class TabelaPrefixos:
+    """Prefixos IPv4 -> rótulo, com busca pelo prefixo mais longo"""
+
+    def __init__(self):
+        self.prefixos = {}       # comprimento -> {rede >> (32 - comprimento): rótulo}
+        self.comprimentos = ()   # comprimentos presentes, do mais longo ao mais curto
+        self.quantidade = 0
+
+    def adicionar(self, cidr, rotulo=None):
+        """Acrescenta a rede (ex: '10.0.0.0/8'; bits de host são ignorados); rótulo padrão = a própria rede"""
+        rede = ipaddress.IPv4Network(cidr, strict=False)
+        comprimento = rede.prefixlen
+        tabela = self.prefixos.setdefault(comprimento, {})
+        chave = int(rede.network_address) >> (32 - comprimento)
+        if chave not in tabela:
+            self.quantidade += 1
+        tabela[chave] = rotulo or str(rede)
+        self.comprimentos = tuple(sorted(self.prefixos, reverse=True))
+
+    def procurar(self, numero):
+        """Rótulo do prefixo mais longo que contém o IP (inteiro), ou None"""
+        prefixos = self.prefixos
+        for comprimento in self.comprimentos:
+            rotulo = prefixos[comprimento].get(numero >> (32 - comprimento))
+            if rotulo is not None:
+                return rotulo
+        return None
+
+    def __contains__(self, ip):
+        return self.procurar(ip_para_int(ip) if isinstance(ip, str) else ip) is not None
+
+    def __len__(self):
+        return self.quantidade
+
+    @classmethod
+    def carregar(cls, caminho):
+        """
+        Lê um arquivo com uma rede por linha: 'CIDR [rótulo]' (IP sem /N = /32); '#' inicia comentário
+        Levanta ValueError com o número da linha se algum CIDR for inválido
+        """
+        tabela = cls()
+        with open(caminho, encoding='utf-8') as f:
+            for numero, linha in enumerate(f, 1):
+                campos = linha.split('#', 1)[0].split(None, 1)
+                if not campos:
+                    continue
+                try:
+                    tabela.adicionar(campos[0], campos[1].strip() if len(campos) > 1 else None)
+                except ValueError as e:
+                    raise ValueError(f"{caminho}:{numero}: CIDR inválido ({e})") from None
+        return tabela
+
+
+class FiltroRedes:
+    """
+    Decide, por IP de origem, se o evento é descartado (permitidos) e sob qual chave ele é contado
+    e detectado (bloco nomeado, sub-rede /prefixo ou o próprio IP)
+    """
+
+    def __init__(self, permitidos=None, blocos=None, prefixo=None):
+        if prefixo is not None and not 0 <= prefixo <= 32:
+            raise ValueError(f"Prefixo de agrupamento inválido: /{prefixo} (use de 0 a 32)")
+        self.permitidos = permitidos
+        self.blocos = blocos
+        self.prefixo = prefixo
+        self.mascara = (0xFFFFFFFF << (32 - prefixo)) & 0xFFFFFFFF if prefixo is not None else None
+        self.descartados = 0
+        self._cache = {}
+
+    @property
+    def agrupa(self):
+        """True se as chaves deixam de ser IPs (blocos ou sub-redes)"""
+        return self.blocos is not None or self.prefixo is not None
+
+    def descricao(self):
+        partes = []
+        if self.permitidos is not None:
+            partes.append(f"{len(self.permitidos)} redes permitidas")
+        if self.blocos is not None:
+            partes.append(f"{len(self.blocos)} blocos nomeados")
+        if self.prefixo is not None:
+            partes.append(f"origens agrupadas por /{self.prefixo}")
+        return ", ".join(partes)
+
+    def _resolver(self, ip):
+        numero = ip_para_int(ip)
+        if self.permitidos is not None and self.permitidos.procurar(numero) is not None:
+            return None
+        if self.blocos is not None:
+            rotulo = self.blocos.procurar(numero)
+            if rotulo is not None:
+                return rotulo
+        if self.mascara is not None:
+            return f"{int_para_ip(numero & self.mascara)}/{self.prefixo}"
+        return ip
+
+    def chave(self, ip):
+        """Chave de contagem/detecção do IP de origem, ou None se ele está nos permitidos"""
+        chave = self._cache.get(ip, _AUSENTE)
+        if chave is _AUSENTE:
+            if len(self._cache) >= MAXIMO_CACHE:
+                self._cache.clear()
+            chave = self._cache[ip] = self._resolver(ip)
+        return chave
+
+    def aplicar(self, dados):
+        """O evento com ip_origem trocado pela chave, ou None se ele foi descartado"""
+        ip = dados['ip_origem']
+        chave = self._cache.get(ip, _AUSENTE)
+        if chave is _AUSENTE:
+            chave = self.chave(ip)
+        if chave is None:
+            self.descartados += 1
+            return None
+        if chave is not ip:
+            dados['ip_origem'] = chave
+        return dados
+
+    def filtrar(self, eventos):
+        """Aplica o filtro a um iterador de eventos (registros não parseados e descartados saem como None)"""
+        aplicar = self.aplicar
+        for dados in eventos:
+            yield aplicar(dados) if dados else dados
+
+
+def montar_filtro(permitidos=None, blocos=None, prefixo=None):
+    """FiltroRedes a partir dos arquivos de CIDR (caminhos ou None), ou None se não houver nada a aplicar"""
+    if permitidos is None and blocos is None and prefixo is None:
+        return None
+    return FiltroRedes(TabelaPrefixos.carregar(permitidos) if permitidos else None,
+                       TabelaPrefixos.carregar(blocos) if blocos else None, prefixo)
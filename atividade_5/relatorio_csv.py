@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Escrita do relatorio.csv (separador ';'), compartilhada pelo analisador e pela análise em lote,
+e do alertas.csv dos detectores da pipeline de detecção
+"""
+
+import csv
+import os
+from datetime import datetime
+
+import compressao
+import ingestao
+import pipeline_deteccao
+
+CABECALHO = ['IP', 'Total_Eventos', 'Detectado_PortScan', 'Momento_PortScan']
+
+
+def formatar_momento(timestamp):
+    """Formata o timestamp em µs (data/hora se for epoch, segundos desde o início se for relativo)"""
+    if timestamp is None:
+        return ''
+    segundos = ingestao.segundos(timestamp)
+    if segundos > 1e9:
+        return datetime.fromtimestamp(segundos).strftime('%Y-%m-%d %H:%M:%S.%f')
+    return f"{segundos:.6f}"
+
+
+def escrever_relatorio(caminho, eventos_por_ip, portscan_detectado, erros=None, fluxos=None):
+    """
+    Escreve o relatório (arquivo temporário + rename, para nunca ficar pela metade)
+    Comprimido se o nome terminar em .gz, .xz ou .zst (ver compressao.py)
+    portscan_detectado mapeia ip -> timestamp em que o limite de portas foi cruzado
+    erros (modo top-K) mapeia ip -> erro máximo da contagem e acrescenta a coluna Erro_Max
+    fluxos (análise por fluxos) mapeia ip -> [fluxos, bytes] e acrescenta as colunas Fluxos e Bytes
+    """
+    temporario = caminho + ".tmp"
+    with compressao.abrir(temporario, 'w', compressao.formato_por_extensao(caminho)) as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        cabecalho = CABECALHO + ['Erro_Max'] if erros is not None else list(CABECALHO)
+        if fluxos is not None:
+            cabecalho += ['Fluxos', 'Bytes']
+        writer.writerow(cabecalho)
+
+        for ip, total in sorted(eventos_por_ip.items(), key=lambda x: x[1], reverse=True):
+            momento = portscan_detectado.get(ip)
+            portscan = 'Sim' if momento is not None else 'Nao'
+            linha = [ip, total, portscan, formatar_momento(momento)]
+            if erros is not None:
+                linha.append(erros.get(ip, 0))
+            if fluxos is not None:
+                linha.extend(fluxos.get(ip, (0, 0)))
+            writer.writerow(linha)
+
+    os.replace(temporario, caminho)
+
+
+def escrever_alertas(caminho, alertas):
+    """
+    Escreve os alertas da pipeline de detecção (ver pipeline_deteccao.PipelineDeteccao.alertas),
+    um por linha em ordem de tempo: detector, chave (ip ou ip:porta), momento e descrição
+    """
+    temporario = caminho + ".tmp"
+    with compressao.abrir(temporario, 'w', compressao.formato_por_extensao(caminho)) as csvfile:
+        writer = csv.writer(csvfile, delimiter=';')
+        writer.writerow(['Detector', 'Chave', 'Momento', 'Descricao'])
+        for momento, detector, chave in alertas:
+            writer.writerow([detector.nome, pipeline_deteccao.formatar_chave(chave),
+                             formatar_momento(momento), detector.descrever(chave)])
+
+    os.replace(temporario, caminho)
@@ -1,39 +1,63 @@
 #!/usr/bin/env python3
 """
 Script para análise de tráfego de rede
-Analisa capturas do tcpdump e detecta possíveis port scans
+Analisa capturas do tcpdump e detecta possíveis port scans (e, se ligados, varreduras
+horizontais, SYN floods e rajadas de DNS, na mesma passada)
 """
 
-import re
+import argparse
+import os
 import csv
-from collections import defaultdict, deque
-from datetime import timedelta
+import sys
+from collections import defaultdict
+from operator import itemgetter
+
+# O parser e os detectores são compartilhados com o analisador principal (diretório pai)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import compressao
+import pipeline_deteccao
+from contagem_topk import SpaceSaving
+from ingestao import MICROS, RelogioIngestao
+from parser_tcpdump import parse_linha
+
+# Critério de port scan: mais de LIMITE_PORTAS portas distintas em JANELA_SEGUNDOS
+JANELA_SEGUNDOS = 60
+LIMITE_PORTAS = 10
+
+# Contagem por IP: None = exata; um número = top-K aproximado (Space-Saving) com essa
+# quantidade de contadores, em memória fixa
+TOPK_IPS = None
+
+# Detecção de port scan aproximada (HyperLogLog por IP, memória fixa por IP) em vez da exata;
+# taxas de falso positivo/negativo em benchmark_deteccao.py
+DETECCAO_APROXIMADA = False
+
+# Detectores ligados (ver pipeline_deteccao.DETECTORES); None = os da configuração padrão
+DETECTORES = None
 
 def parse_traffic_file(filename):
     """
     Lê e parseia o arquivo de tráfego
-    Retorna lista de tuplas (timestamp, ip_origem, porta_destino)
+    Retorna lista de eventos (dicts do parser_tcpdump: ip_origem, ip_destino, portas, flags...),
+    com o timestamp em microssegundos absolutos (deltas do -ttt são acumulados, epoch do -tt é mantido)
     """
     traffic_data = []
+    relogio = RelogioIngestao('auto')
     
-    # Regex para extrair os campos da linha do tcpdump
     # Formato esperado: "0.000000 IP 192.168.1.100.51234 > 8.8.8.8.53: ..."
-    pattern = r'^\s*(\d+\.\d+)\s+.*?(\d+\.\d+\.\d+\.\d+)\.\d+\s+>\s+\d+\.\d+\.\d+\.\d+\.(\d+).*$'
-    
+    # (o timestamp também pode vir como H:MM:SS.ffffff)
     try:
-        with open(filename, 'r') as file:
+        # trafego.txt.gz/.xz/.zst são descomprimidos durante a leitura
+        with compressao.abrir(filename, 'r') as file:
             for line_num, line in enumerate(file, 1):
                 line = line.strip()
                 if not line:
                     continue
                 
-                match = re.match(pattern, line)
-                if match:
-                    timestamp = float(match.group(1))
-                    ip_origem = match.group(2)
-                    porta_destino = int(match.group(3))
-                    
-                    traffic_data.append((timestamp, ip_origem, porta_destino))
+                dados = parse_linha(line)
+                if dados:
+                    dados['timestamp'] = relogio.converter(dados['timestamp'])
+                    traffic_data.append(dados)
                 else:
                     print(f"Aviso: Linha {line_num} não corresponde ao padrão esperado: {line}")
     
@@ -46,83 +70,130 @@ def parse_traffic_file(filename):
     
     return traffic_data
 
-def analyze_traffic(traffic_data):
+def nova_pipeline(janela=None, limite=None, configuracao=None):
+    """
+    Pipeline de detecção (pipeline_deteccao.py) com os detectores conforme 'configuracao'
+    (padrão: DETECTORES com o port scan em JANELA_SEGUNDOS/LIMITE_PORTAS)
+    janela/limite, se informados, substituem os do port scan vertical da configuração
+    """
+    if configuracao is None:
+        configuracao = pipeline_deteccao.carregar_configuracao(ativos=DETECTORES)
+        configuracao['portscan_vertical'].update(janela=JANELA_SEGUNDOS, limite=LIMITE_PORTAS)
+    if janela is not None:
+        configuracao['portscan_vertical']['janela'] = janela
+    if limite is not None:
+        configuracao['portscan_vertical']['limite'] = limite
+    return pipeline_deteccao.montar_pipeline(configuracao, aproximado=DETECCAO_APROXIMADA)
+
+def analyze_traffic(traffic_data, janela=JANELA_SEGUNDOS, limite=LIMITE_PORTAS, pipeline=None):
     """
     Analisa os dados de tráfego e detecta port scans
+    Retorna (eventos_por_ip, portscan_detectado), onde portscan_detectado mapeia
+    ip -> timestamp em que o limite de portas foi cruzado (apenas IPs detectados)
+    Os alertas dos outros detectores ligados ficam na 'pipeline' (padrão: nova_pipeline)
     """
     # Contagem total de eventos por IP
     eventos_por_ip = defaultdict(int)
     
-    # Para detecção de port scan: armazena eventos por IP com timestamps
-    eventos_detalhados = defaultdict(list)
+    # Todos os detectores recebem cada evento uma vez (timestamps em µs, mesma base de tempo
+    # da ingestão); port scan exato, ou HLL se DETECCAO_APROXIMADA
+    if pipeline is None:
+        pipeline = nova_pipeline(janela, limite)
+    processar = pipeline.processar
     
-    # Processa cada evento
-    for timestamp, ip_origem, porta_destino in traffic_data:
-        eventos_por_ip[ip_origem] += 1
-        eventos_detalhados[ip_origem].append((timestamp, porta_destino))
+    # Processa os eventos em ordem de timestamp
+    for dados in sorted(traffic_data, key=itemgetter('timestamp')):
+        eventos_por_ip[dados['ip_origem']] += 1
+        processar(dados)
     
-    # Detecta port scans
-    portscan_detectado = {}
-    
-    for ip, eventos in eventos_detalhados.items():
-        # Ordena eventos por timestamp
-        eventos.sort(key=lambda x: x[0])
-        
-        # Usa uma janela deslizante de 60 segundos
-        portas_unicas_janela = set()
-        janela = deque()
-        detectado = False
-        
-        for evento in eventos:
-            timestamp, porta = evento
-            janela.append(evento)
-            portas_unicas_janela.add(porta)
-            
-            # Remove eventos fora da janela de 60 segundos
-            while janela and timestamp - janela[0][0] > 60:
-                evento_antigo = janela.popleft()
-                # Se a porta do evento removido não aparece mais na janela, remove da contagem
-                porta_antiga = evento_antigo[1]
-                if all(evt[1] != porta_antiga for evt in janela):
-                    portas_unicas_janela.discard(porta_antiga)
-            
-            # Verifica se há port scan (mais de 10 portas distintas em 60 segundos)
-            if len(portas_unicas_janela) > 10:
-                detectado = True
-                break
-        
-        portscan_detectado[ip] = detectado
-    
-    return eventos_por_ip, portscan_detectado
+    return eventos_por_ip, pipeline.portscan_detectado()
 
-def generate_report(eventos_por_ip, portscan_detectado, output_filename="relatorio.csv"):
+def analyze_traffic_topk(traffic_data, capacidade, janela=JANELA_SEGUNDOS, limite=LIMITE_PORTAS, pipeline=None):
+    """
+    Igual ao analyze_traffic, mas com a contagem por IP aproximada em memória fixa
+    Retorna (eventos_por_ip, erros, portscan_detectado): só os IPs do top-K, cada contagem
+    com o seu erro máximo (a real está entre contagem - erro e contagem)
+    """
+    topk = SpaceSaving(capacidade)
+    if pipeline is None:
+        pipeline = nova_pipeline(janela, limite)
+    processar = pipeline.processar
+    
+    for dados in sorted(traffic_data, key=itemgetter('timestamp')):
+        topk.adicionar(dados['ip_origem'])
+        processar(dados)
+    
+    portscan_detectado = pipeline.portscan_detectado()
+    eventos_por_ip = topk.contagens()
+    erros = topk.erros()
+    # IPs com port scan que ficaram fora do top-K: contagem limitada pelo menor contador
+    for ip in portscan_detectado:
+        if ip not in eventos_por_ip:
+            eventos_por_ip[ip] = erros[ip] = topk.erro_maximo()
+    
+    return eventos_por_ip, erros, portscan_detectado
+
+def generate_report(eventos_por_ip, portscan_detectado, output_filename="relatorio.csv", erros=None):
     """
     Gera o arquivo CSV com o relatório
+    Com 'erros' (modo top-K), acrescenta a coluna Erro_Max
     """
     try:
-        with open(output_filename, 'w', newline='') as csvfile:
+        with compressao.abrir(output_filename, 'w') as csvfile:  # .gz/.xz/.zst: CSV comprimido
             writer = csv.writer(csvfile)
             
             # Cabeçalho
-            writer.writerow(['IP', 'Total_Eventos', 'Detectado_PortScan'])
+            cabecalho = ['IP', 'Total_Eventos', 'Detectado_PortScan', 'Momento_PortScan']
+            if erros is not None:
+                cabecalho.append('Erro_Max')
+            writer.writerow(cabecalho)
             
             # Dados
             for ip in sorted(eventos_por_ip.keys()):
                 total_eventos = eventos_por_ip[ip]
-                detectado = "Sim" if portscan_detectado.get(ip, False) else "Não"
-                writer.writerow([ip, total_eventos, detectado])
+                momento = portscan_detectado.get(ip)
+                if momento is None:
+                    linha = [ip, total_eventos, "Não", ""]
+                else:
+                    linha = [ip, total_eventos, "Sim", f"{momento / MICROS:.6f}"]
+                if erros is not None:
+                    linha.append(erros.get(ip, 0))
+                writer.writerow(linha)
         
         print(f"Relatório gerado com sucesso: {output_filename}")
         
     except Exception as e:
         print(f"Erro ao gerar relatório: {e}")
 
-def main():
+def main(argv=None):
     """
     Função principal
+    Retorna 0 em caso de sucesso e 1 se o arquivo não puder ser lido ou não tiver dados válidos
     """
-    input_file = "trafego.txt"
-    output_file = "relatorio.csv"
+    parser = argparse.ArgumentParser(description="Análise de tráfego (texto do tcpdump) com detecção de port scan")
+    parser.add_argument('entrada', nargs='?', default="trafego.txt", help="arquivo de entrada (padrão: trafego.txt)")
+    parser.add_argument('-o', '--saida', default="relatorio.csv", help="relatório CSV (padrão: relatorio.csv)")
+    parser.add_argument('--janela', type=float, default=None,
+                        help=f"janela do port scan em segundos (padrão: a do --deteccao ou {JANELA_SEGUNDOS})")
+    parser.add_argument('--limite', type=int, default=None,
+                        help=f"portas distintas na janela (padrão: o do --deteccao ou {LIMITE_PORTAS})")
+    parser.add_argument('--topk', type=int, default=TOPK_IPS, metavar='K', help="contagem aproximada: só os K maiores IPs")
+    parser.add_argument('--deteccao', default=None, metavar='ARQUIVO', help="configuração JSON dos detectores")
+    parser.add_argument('--detectores', default=None, metavar='D1,D2',
+                        help=f"detectores ligados ({','.join(pipeline_deteccao.DETECTORES)})")
+    args = parser.parse_args(argv)
+    
+    try:
+        configuracao = pipeline_deteccao.carregar_configuracao(
+            args.deteccao, args.detectores.split(',') if args.detectores else DETECTORES)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not args.deteccao:
+        # Sem arquivo vale o critério deste script; --janela/--limite sobrepõem os dois casos
+        configuracao['portscan_vertical'].update(janela=JANELA_SEGUNDOS, limite=LIMITE_PORTAS)
+    
+    input_file = args.entrada
+    output_file = args.saida
     
     print("=== Análise de Tráfego de Rede ===")
     print(f"Lendo arquivo: {input_file}")
@@ -132,29 +203,50 @@ def main():
     
     if not traffic_data:
         print("Nenhum dado válido encontrado ou erro ao ler o arquivo.")
-        return
+        return 1
     
     print(f"Total de eventos processados: {len(traffic_data)}")
     
     # Passo 2: Analisar tráfego
     print("Analisando tráfego...")
-    eventos_por_ip, portscan_detectado = analyze_traffic(traffic_data)
+    erros = None
+    pipeline = nova_pipeline(args.janela, args.limite, configuracao)
+    if args.topk:
+        eventos_por_ip, erros, portscan_detectado = analyze_traffic_topk(
+            traffic_data, args.topk, args.janela, args.limite, pipeline)
+    else:
+        eventos_por_ip, portscan_detectado = analyze_traffic(traffic_data, args.janela, args.limite, pipeline)
     
     # Passo 3: Gerar relatório
     print("Gerando relatório...")
-    generate_report(eventos_por_ip, portscan_detectado, output_file)
+    generate_report(eventos_por_ip, portscan_detectado, output_file, erros)
     
     # Estatísticas
     print(f"\n=== Estatísticas ===")
-    print(f"IPs únicos encontrados: {len(eventos_por_ip)}")
-    print(f"IPs com port scan detectado: {sum(1 for ip in portscan_detectado if portscan_detectado[ip])}")
+    if erros is not None:
+        print(f"IPs no top-{args.topk} (contagem aproximada): {len(eventos_por_ip)}")
+    else:
+        print(f"IPs únicos encontrados: {len(eventos_por_ip)}")
+    print(f"IPs com port scan detectado: {len(portscan_detectado)}")
     
     # Mostra os top 5 IPs por número de eventos
     print(f"\nTop 5 IPs por número de eventos:")
     top_ips = sorted(eventos_por_ip.items(), key=lambda x: x[1], reverse=True)[:5]
     for ip, count in top_ips:
-        portscan = "SIM" if portscan_detectado.get(ip, False) else "não"
-        print(f"  {ip}: {count} eventos (port scan: {portscan})")
+        if ip in portscan_detectado:
+            portscan = f"SIM em {portscan_detectado[ip] / MICROS:.6f}s"
+        else:
+            portscan = "não"
+        erro = f" ±{erros[ip]}" if erros and erros.get(ip) else ""
+        print(f"  {ip}: {count}{erro} eventos (port scan: {portscan})")
+    
+    # Alertas dos outros detectores ligados
+    for detector in pipeline.extras():
+        print(f"\n{detector.nome}: {len(detector.detectados)} alerta(s)")
+        for chave, momento in sorted(detector.detectados.items(), key=lambda x: x[1]):
+            print(f"  {momento / MICROS:.6f}s {detector.descrever(chave)}")
+    
+    return 0
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Agregação de pacotes em fluxos no estilo NetFlow
+Cada fluxo é a 5-tupla (origem, porta de origem, destino, porta de destino, protocolo) com
+primeiro/último pacote, pacotes, bytes e o OU das flags TCP. A tabela é um dict em ordem de
+último uso (LRU) e o fluxo é exportado quando:
+  - fica timeout_inativo sem pacotes ('inativo');
+  - dura mais que timeout_ativo (o fluxo longo é fatiado e continua num registro novo) ('ativo');
+  - a tabela passa da capacidade e ele é o menos usado ('lru');
+  - a análise termina ('fim'), ou o TCP termina com FIN/RST ('tcp_fim').
+Um download longo vira um registro por timeout_ativo em vez de um evento por pacote.
+Os bytes são o comprimento IPv4 no pcap e o 'length' (carga útil) no texto do tcpdump.
+"""
+
+from collections import OrderedDict
+
+# Padrões do NetFlow (Cisco): 15 s de inatividade, 30 min de duração e 64K fluxos em memória
+TIMEOUT_INATIVO_US = 15_000_000
+TIMEOUT_ATIVO_US = 1_800_000_000
+CAPACIDADE_PADRAO = 65536
+
+# Resolução da ordem LRU e da varredura de inativos: um fluxo só volta para o fim da fila uma vez
+# por segundo de tráfego (mover a cada pacote custaria mais que o resto da contagem), então o
+# timeout de inatividade vale com até 1 s de atraso
+RESOLUCAO_US = 1_000_000
+
+FLAGS_FIN_RST = 0x01 | 0x04
+
+MOTIVOS = ('inativo', 'ativo', 'lru', 'tcp_fim', 'fim')
+
+
+class Fluxo:
+    """Registro de um fluxo (o mesmo objeto continua na tabela até ser exportado)"""
+
+    __slots__ = ('ip_origem', 'porta_origem', 'ip_destino', 'porta_destino', 'protocolo',
+                 'primeiro', 'ultimo', 'pacotes', 'bytes', 'flags', 'toque')
+
+    def __init__(self, ip_origem, porta_origem, ip_destino, porta_destino, protocolo, timestamp):
+        self.ip_origem = ip_origem
+        self.porta_origem = porta_origem
+        self.ip_destino = ip_destino
+        self.porta_destino = porta_destino
+        self.protocolo = protocolo
+        self.primeiro = timestamp
+        self.ultimo = timestamp
+        self.pacotes = 0
+        self.bytes = 0
+        self.flags = 0
+        self.toque = timestamp  # última vez que o fluxo foi para o fim da ordem LRU
+
+    def duracao(self):
+        return self.ultimo - self.primeiro
+
+    def __repr__(self):
+        return (f"Fluxo({self.ip_origem}:{self.porta_origem} > {self.ip_destino}:{self.porta_destino} "
+                f"proto={self.protocolo} pacotes={self.pacotes} bytes={self.bytes})")
+
+
+class TabelaFluxos:
+    """
+    Tabela de fluxos ativos; ao_exportar(fluxo, motivo) recebe cada fluxo encerrado
+    adicionar() retorna o fluxo quando o pacote abriu um registro novo (para quem só quer
+    processar cada fluxo uma vez, como o detector de port scan), senão None
+    """
+
+    def __init__(self, ao_exportar, timeout_inativo_us=TIMEOUT_INATIVO_US,
+                 timeout_ativo_us=TIMEOUT_ATIVO_US, capacidade=CAPACIDADE_PADRAO):
+        if capacidade < 1:
+            raise ValueError("A capacidade da tabela de fluxos deve ser pelo menos 1")
+        self.ao_exportar = ao_exportar
+        self.timeout_inativo_us = timeout_inativo_us
+        self.timeout_ativo_us = timeout_ativo_us
+        self.capacidade = capacidade
+        self.fluxos = OrderedDict()  # 5-tupla -> Fluxo, do menos para o mais recentemente usado
+        self.pacotes = 0  # pacotes dos fluxos já exportados
+        self.criados = 0
+        self.exportados = dict.fromkeys(MOTIVOS, 0)
+        self.maximo_ativos = 0
+        # A varredura de inativos roda no máximo uma vez por segundo de tráfego
+        self._proxima_varredura = -1
+
+    def __len__(self):
+        return len(self.fluxos)
+
+    def adicionar(self, dados):
+        """Conta um pacote (dict da ingestão) no seu fluxo; O(1) amortizado"""
+        timestamp = dados['timestamp']
+        chave = (dados['ip_origem'], dados['porta_origem'], dados['ip_destino'],
+                 dados['porta_destino'], dados['protocolo'])
+
+        if timestamp >= self._proxima_varredura:
+            self.expirar(timestamp)
+            self._proxima_varredura = timestamp + RESOLUCAO_US
+
+        fluxos = self.fluxos
+        fluxo = fluxos.get(chave)
+        novo = None
+        if fluxo is None or timestamp - fluxo.primeiro >= self.timeout_ativo_us:
+            if fluxo is not None:
+                del fluxos[chave]
+                self._exportar(fluxo, 'ativo')
+            fluxo = novo = fluxos[chave] = Fluxo(*chave, timestamp)
+            self.criados += 1
+            if len(fluxos) > self.capacidade:
+                self._exportar(fluxos.popitem(last=False)[1], 'lru')
+            elif len(fluxos) > self.maximo_ativos:
+                self.maximo_ativos = len(fluxos)
+        elif timestamp > fluxo.ultimo:
+            fluxo.ultimo = timestamp
+            if timestamp - fluxo.toque >= RESOLUCAO_US:
+                fluxo.toque = timestamp
+                fluxos.move_to_end(chave)
+
+        fluxo.pacotes += 1
+        fluxo.bytes += dados['tamanho']
+        flags = dados['flags']
+        if flags:
+            fluxo.flags |= flags
+            # A conexão TCP terminou: não há por que esperar o timeout de inatividade
+            if flags & FLAGS_FIN_RST:
+                del fluxos[chave]
+                self._exportar(fluxo, 'tcp_fim')
+        return novo
+
+    def expirar(self, agora):
+        """Exporta os fluxos sem pacotes há timeout_inativo; retorna quantos"""
+        limite = agora - self.timeout_inativo_us
+        fluxos = self.fluxos
+        expirados = 0
+        # Em ordem de último uso (com RESOLUCAO_US): o primeiro ainda ativo encerra a varredura
+        while fluxos:
+            chave, fluxo = next(iter(fluxos.items()))
+            if fluxo.ultimo > limite:
+                break
+            del fluxos[chave]
+            self._exportar(fluxo, 'inativo')
+            expirados += 1
+        return expirados
+
+    def esvaziar(self):
+        """Exporta todos os fluxos ainda abertos (fim da análise)"""
+        while self.fluxos:
+            self._exportar(self.fluxos.popitem(last=False)[1], 'fim')
+
+    def _exportar(self, fluxo, motivo):
+        self.pacotes += fluxo.pacotes
+        self.exportados[motivo] += 1
+        self.ao_exportar(fluxo, motivo)
+
+    def resumo(self):
+        return {
+            'pacotes': self.pacotes,
+            'fluxos': self.criados,
+            'pacotes_por_fluxo': self.pacotes / self.criados if self.criados else 0.0,
+            'maximo_ativos': self.maximo_ativos,
+            'exportados': dict(self.exportados),
+        }
+
+
+class AnaliseFluxos:
+    """
+    Análise do arquivo por fluxos: a pipeline de detecção (pipeline_deteccao) recebe o primeiro
+    pacote de cada fluxo novo (não todos os pacotes) e as contagens por IP são somadas dos
+    fluxos exportados
+    Com 'topk' (SpaceSaving) a contagem de pacotes por IP fica em memória fixa e
+    fluxos_por_ip não é mantido
+    """
+
+    def __init__(self, pipeline, topk=None, timeout_inativo_us=TIMEOUT_INATIVO_US,
+                 timeout_ativo_us=TIMEOUT_ATIVO_US, capacidade=CAPACIDADE_PADRAO):
+        self.pipeline = pipeline
+        self.topk = topk
+        self.eventos_por_ip = {}
+        self.fluxos_por_ip = {}  # ip -> [fluxos, bytes]
+        self.tabela = TabelaFluxos(self._exportado, timeout_inativo_us, timeout_ativo_us, capacidade)
+        self.registros = 0
+        self.eventos = 0
+
+    def processar(self, eventos):
+        """Consome os eventos da ingestão (dicts ou None) e exporta os fluxos que sobrarem"""
+        adicionar = self.tabela.adicionar
+        processar = self.pipeline.processar
+        registros = parseados = 0
+        for dados in eventos:
+            registros += 1
+            if not dados:
+                continue
+            parseados += 1
+            novo = adicionar(dados)
+            if novo is not None:
+                processar(dados)
+        self.registros += registros
+        self.eventos += parseados
+        self.tabela.esvaziar()
+
+    def _exportado(self, fluxo, motivo):
+        ip = fluxo.ip_origem
+        if self.topk is not None:
+            self.topk.adicionar(ip, fluxo.pacotes)
+            return
+        self.eventos_por_ip[ip] = self.eventos_por_ip.get(ip, 0) + fluxo.pacotes
+        totais = self.fluxos_por_ip.get(ip)
+        if totais is None:
+            self.fluxos_por_ip[ip] = [1, fluxo.bytes]
+        else:
+            totais[0] += 1
+            totais[1] += fluxo.bytes